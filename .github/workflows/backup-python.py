@@ -1,12 +1,125 @@
+import argparse
 import json
+import os
 import sys
 
-def json_to_markdown_table(json_file):
+from findings_index import add_index_argument, index_report
+from kubescape_findings import group_control_results, iter_control_results, iter_sections, load_report, na
+from markdown_table import TableSpool, format_row
+from report_cache import CACHE_DIR_ENV
+from report_diff import diff_kubescape_reports, write_kubescape_diff
+from report_metrics import add_arguments, configure, finish, metrics
+from report_rollup import DEFAULT_TOP, rollup_report, write_rollup
+from step_summary import BudgetedSummary, tool_shard_dir
+
+SHARD_DIR = tool_shard_dir("kubescape")
+SUMMARY_HEADERS = ["Control ID", "Control Name", "Status", "Compliance Score"]
+RESOURCE_HEADERS = ["Resource ID", "Kind", "Namespace", "Name"]
+FRAMEWORK_HEADERS = ["Framework Name", "Status", "Compliance Score"]
+RESULT_HEADERS = ["Resource ID", "Control ID", "Control Name", "Status", "Message", "Severity", "Category", "Remediation", "Namespace", "Name"]
+GROUPED_RESULT_HEADERS = ["Control ID", "Control Name", "Status", "Message", "Severity", "Category", "Remediation", "Resources", "Affected Resources"]
+CONTROL_REPORT_HEADERS = ["Control ID", "Control Name", "Failed Resources", "Total Resources"]
+
+TABLE_HEADERS = {
+    "Summary Details": SUMMARY_HEADERS,
+    "Resources": RESOURCE_HEADERS,
+    "Frameworks": FRAMEWORK_HEADERS,
+    "Results": RESULT_HEADERS,
+    "Control Reports": CONTROL_REPORT_HEADERS,
+}
+# Tables are always emitted in this order, whatever the key order of the report.
+TABLE_ORDER = list(TABLE_HEADERS)
+
+
+def summary_rows(controls):
+    """Yields the Summary Details rows for the report's summary controls."""
+    for control in controls:
+        control_name = control.name or control.control_name or control.control_id or "N/A"
+        yield [control.control_id, control_name, na(control.status), str(na(control.compliance_score))]
+
+
+def resource_rows(resources):
+    """Yields the Resources rows."""
+    for resource in resources:
+        yield [na(resource.resource_id), na(resource.kind), na(resource.namespace), na(resource.name)]
+
+
+def framework_rows(frameworks):
+    """Yields the Frameworks rows."""
+    for framework in frameworks:
+        yield [na(framework.name), na(framework.status), str(na(framework.compliance_score))]
+
+
+def result_rows(results):
+    """Yields one Results row per control evaluated against each resource."""
+    for finding in iter_control_results(results):
+        yield [na(value) for value in finding]
+
+
+def grouped_result_rows(results):
+    """Yields one Results by Control row per control outcome, listing the resources it applies to."""
+    for key, resources in group_control_results(results).items():
+        count = sum(len(names) for names in resources.values())
+        affected = "; ".join(f"{na(namespace)}/{na(kind)}: {', '.join(names)}"
+                             for (namespace, kind), names in resources.items())
+        yield [na(value) for value in key] + [str(count), affected]
+
+
+def control_report_rows(control_reports):
+    """Yields the Control Reports rows."""
+    for report in control_reports:
+        yield [na(report.control_id), na(report.name), str(na(report.failed_resources)), str(na(report.total_resources))]
+
+
+# Report sections feeding each table, and the function producing the table's rows.
+TABLE_SOURCES = {
+    "Summary Details": ("controls", summary_rows),
+    "Resources": ("resources", resource_rows),
+    "Frameworks": ("frameworks", framework_rows),
+    "Results": ("results", result_rows),
+    "Control Reports": ("control_reports", control_report_rows),
+}
+SECTION_TABLES = {section: table_name for table_name, (section, _) in TABLE_SOURCES.items()}
+# --group-by-control replaces the Results table, one row per (resource, control), with
+# this one: a row per control outcome and the resources sharing it.
+GROUPED_RESULTS_TABLE = "Results by Control"
+# Column holding the namespace, for the tables that have one.
+NAMESPACE_COLUMNS = {"Resources": 2, "Results": 8}
+
+
+def report_tables(report, group_by_control=False):
+    """
+    Renders the tables of a normalized report.
+
+    Args:
+        report (KubescapeReport): The report, as returned by kubescape_findings.load_report.
+        group_by_control (bool): Render the Results table grouped by control (GROUPED_RESULTS_TABLE).
+
+    Returns:
+        dict: Table names to Markdown table strings, for the sections the report has.
+    """
+    tables = {}
+    with metrics.stage("render"):
+        for table_name, (section, rows) in TABLE_SOURCES.items():
+            records = getattr(report, section)
+            if records is not None:
+                headers = TABLE_HEADERS[table_name]
+                if group_by_control and table_name == "Results":
+                    table_name, headers, rows = GROUPED_RESULTS_TABLE, GROUPED_RESULT_HEADERS, grouped_result_rows
+                table_rows = list(rows(records))
+                metrics.count("rows", len(table_rows))
+                tables[table_name] = format_markdown_table(headers, table_rows)
+    return tables
+
+
+def json_to_markdown_table(json_file, cache_dir=None, group_by_control=False):
     """
     Converts Kubescape JSON output to multiple Markdown tables.
 
     Args:
         json_file (str): Path to the JSON file.
+        cache_dir (str): Optional parsed-report cache directory (see report_cache.load_cached).
+        group_by_control (bool): Group the Results rows by control (see report_tables).
 
     Returns:
         dict: A dictionary of Markdown tables, where keys are table names
@@ -14,117 +127,84 @@ def json_to_markdown_table(json_file):
               Returns an empty dictionary if there's an error.
     """
     try:
-        with open(json_file, 'r') as f:
-            data = json.load(f)
+        report = load_report(json_file, cache_dir)
     except (FileNotFoundError, json.JSONDecodeError) as e:
         print(f"Error: Could not read or parse JSON file: {e}")
         return {}
 
-    # Save the raw JSON data to a file for inspection
-    try:
-        with open("kubescape_output.json", "w") as outfile:
-            json.dump(data, outfile, indent=4)  # Pretty print for readability
-        print("Raw JSON output saved to kubescape_output.json")
-    except Exception as e:
-        print(f"Error saving raw JSON: {e}")
+    return report_tables(report, group_by_control)
 
-    tables = {}
 
-    # 1. Summary Details Table
-    if "summaryDetails" in data and "controls" in data["summaryDetails"]:
-        controls = data["summaryDetails"]["controls"]
-        headers = ["Control ID", "Control Name", "Status", "Compliance Score"]
-        rows = []
-        for control_id, control_data in controls.items():
-            control_name = control_data.get("name") or control_data.get("controlName") or control_id or "N/A"
-            status = control_data.get("statusInfo", {}).get("status", "N/A")
-            compliance_score = control_data.get("complianceScore", "N/A")
-            rows.append([control_id, control_name, status, str(compliance_score)])
-        tables["Summary Details"] = format_markdown_table(headers, rows)
-
-    # 2. Resources Table
-    if "resources" in data and isinstance(data["resources"], list):
-        headers = ["Resource ID", "Kind", "Namespace", "Name"]
-        rows = []
-        for resource in data["resources"]:
-            if isinstance(resource, dict) and "object" in resource and isinstance(resource["object"], dict):
-                resource_id = resource.get("resourceID", "N/A")
-                kind = resource["object"].get("kind", "N/A")
-                namespace = resource["object"].get("namespace", "N/A")
-                name = resource["object"].get("name", "N/A")
-                rows.append([resource_id, kind, namespace, name])
-        tables["Resources"] = format_markdown_table(headers, rows)
-
-    # 3.  Frameworks Table
-    if "frameworks" in data and isinstance(data["frameworks"], list):
-        headers = ["Framework Name", "Status", "Compliance Score"]
-        rows = []
-        for framework in data["frameworks"]:
-            if isinstance(framework, dict):
-                name = framework.get("name", "N/A")
-                status = framework.get("status", "N/A")
-                compliance_score = framework.get("complianceScore", "N/A")
-                rows.append([name, status, str(compliance_score)])
-        tables["Frameworks"] = format_markdown_table(headers, rows)
-
-    # 4. Results Table
-    if "results" in data:
-        results = data["results"]
-        headers = ["Resource ID", "Control ID", "Control Name", "Status", "Message", "Severity", "Category", "Remediation", "Namespace", "Name"]
-        rows = []
-        if isinstance(results, list):
-            for result in results:
-                # Print the entire result object for debugging
-                # print(f"Debugging result: {result}")
-
-                if isinstance(result, dict):
-                    resource_id = result.get("resourceID", "N/A")
-                    controls_data = result.get("controls", [])
-
-                    # Ensure controls_data is a list before iterating
-                    if isinstance(controls_data, list):
-                        for control_data in controls_data:
-                            control_id = control_data.get("controlID", "N/A")
-                            control_name = control_data.get("name") or control_data.get("controlName") or "N/A"
-                            status_info = control_data.get("status", {})
-                            status = status_info.get("status", "N/A")
-                            message = status_info.get("info", "N/A")
-                            severity = result.get("severity", "N/A")
-                            category = result.get("category", "N/A")
-                            remediation = result.get("remediation", "N/A")
-                            namespace = result.get("namespace") if "namespace" in result else "N/A"
-                            name = result.get("name") if "name" in result else "N/A"
-                            rows.append([resource_id, control_id, control_name, status, message, severity, category, remediation, namespace, name])
-                    else:
-                        print(f"Warning: 'controls' is not a list for resourceID: {resource_id}, skipping")
+def write_markdown_tables(json_file, out):
+    """
+    Streams the tables of json_to_markdown_table to a file handle in bounded memory.
+
+    The report is parsed one element of the resources, results and controlReports
+    arrays at a time and each row goes straight to a per-table spool file, so peak
+    memory does not depend on the size of the report. The output is identical to
+    printing the tables returned by json_to_markdown_table.
+
+    Args:
+        json_file (str): Path to the JSON file.
+        out (file): Text file handle the Markdown is written to.
+
+    Returns:
+        int: The number of tables written, 0 if the file could not be read or parsed.
+    """
+    spools = {}
+    try:
+        for section, records in metrics.timed("parse", iter_sections(json_file)):
+            table_name = SECTION_TABLES.get(section)
+            if table_name:
+                spools[table_name] = spool = TableSpool(TABLE_HEADERS[table_name])
+                with metrics.stage("render"):
+                    spool.extend(TABLE_SOURCES[table_name][1](metrics.timed("parse", records)))
+                metrics.count("rows", spool.rows)
+
+        for table_name in TABLE_ORDER:
+            if table_name in spools:
+                out.write(f"\n## {table_name}\n\n")
+                if spools[table_name].rows:
+                    spools[table_name].write_to(out)
+                    out.write("\n")
                 else:
-                    print(f"Unexpected result item type: {type(result)}, skipping")
-        else:
-            print(f"Unexpected results type: {type(results)}, skipping")
-        tables["Results"] = format_markdown_table(headers, rows)
-
-    # 5. Control Reports Table (if available)
-    if "controlReports" in data:
-        control_reports = data["controlReports"]
-        headers = ["Control ID", "Control Name", "Failed Resources", "Total Resources"]
-        rows = []
-        if isinstance(control_reports, list):
-            for report in control_reports:
-                control_id = report.get("controlID", "N/A")
-                control_name = report.get("name", "N/A")
-                failed_resources = report.get("failedResources", "N/A")
-                total_resources = report.get("totalResources", "N/A")
-                rows.append([control_id, control_name, str(failed_resources), str(total_resources)])
-            tables["Control Reports"] = format_markdown_table(headers, rows)
-        elif isinstance(control_reports, dict):
-            for control_id, report_data in control_reports.items():
-                control_name = report_data.get("name", "N/A")
-                failed_resources = report_data.get("failedResources", "N/A")
-                total_resources = report_data.get("totalResources", "N/A")
-                rows.append([control_id, control_name, str(failed_resources), str(total_resources)])
-            tables["Control Reports"] = format_markdown_table(headers, rows)
+                    out.write("No data found for this table.\n")
+        return len(spools)
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        print(f"Error: Could not read or parse JSON file: {e}")
+        return 0
+    finally:
+        for spool in spools.values():
+            spool.close()
+
+
+def write_budgeted_tables(report, summary):
+    """
+    Writes the tables of a normalized report row by row through a BudgetedSummary.
+
+    Rows past the budget land in the shard file of their namespace, preceded by the
+    table's heading and header rows.
+
+    Args:
+        report (KubescapeReport): The report, as returned by kubescape_findings.load_report.
+        summary (BudgetedSummary): The budgeted output.
+    """
+    for table_name, (section, rows) in TABLE_SOURCES.items():
+        records = getattr(report, section)
+        if records is None:
+            continue
+        heading = f"\n## {table_name}\n\n"
+        header = heading + format_row(TABLE_HEADERS[table_name]) + format_row(["---"] * len(TABLE_HEADERS[table_name]))
+        namespace_column = NAMESPACE_COLUMNS.get(table_name)
+        empty = True
+        for row in rows(records):
+            namespace = row[namespace_column] if namespace_column is not None else None
+            summary.write(format_row(row), namespace=namespace, header=header)
+            metrics.count("rows")
+            empty = False
+        if empty:
+            summary.write("No data found for this table.\n", header=heading)
 
-    return tables
 
 def format_markdown_table(headers, rows):
     """Formats a list of headers and rows into a Markdown table."""
@@ -137,17 +217,100 @@ def format_markdown_table(headers, rows):
     return table
 
 
-if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python kubescape_to_markdown.py <path_to_results.json>")
-        sys.exit(1)
-
-    json_file = sys.argv[1]
-    markdown_tables = json_to_markdown_table(json_file)
+def write_tables(json_file, out, cache_dir=None, group_by_control=False):
+    """Writes every table of json_to_markdown_table under its heading, as the script prints them."""
+    markdown_tables = json_to_markdown_table(json_file, cache_dir, group_by_control)
 
     if markdown_tables:
         for table_name, table_content in markdown_tables.items():
-            print(f"\n## {table_name}\n")
-            print(table_content)
+            out.write(f"\n## {table_name}\n\n")
+            out.write(f"{table_content}\n")
     else:
-        print("No tables generated.")
+        out.write("No tables generated.\n")
+
+
+def main(args):
+    """Writes the tables selected by the command-line arguments to stdout; returns the exit status."""
+    out = metrics.writer(sys.stdout)
+    if args.baseline:
+        try:
+            baseline_report = load_report(args.baseline, args.cache_dir)
+            report = load_report(args.json_file, args.cache_dir)
+        except (FileNotFoundError, json.JSONDecodeError) as e:
+            print(f"Error: Could not read or parse JSON file: {e}")
+            return 1
+        with metrics.stage("render"):
+            write_kubescape_diff(diff_kubescape_reports(baseline_report, report), out)
+        return 0
+
+    if args.summary_budget is not None:
+        try:
+            report = load_report(args.json_file, args.cache_dir)
+        except (FileNotFoundError, json.JSONDecodeError) as e:
+            print(f"Error: Could not read or parse JSON file: {e}")
+            print("No tables generated.")
+            return 0
+        summary = BudgetedSummary(out, args.summary_budget, args.shard_dir)
+        with metrics.stage("render"):
+            write_budgeted_tables(report, summary)
+            summary.close()
+        if summary.overflowed:
+            metrics.count("shard_bytes_written", summary.shard_bytes)
+        return 0
+
+    if args.summary_only:
+        try:
+            rollup = rollup_report(args.json_file, args.top)
+        except (FileNotFoundError, json.JSONDecodeError) as e:
+            print(f"Error: Could not read or parse JSON file: {e}")
+            print("No tables generated.")
+            return 0
+        with metrics.stage("render"):
+            write_rollup(rollup, out)
+        return 0
+
+    if args.stream:
+        if not write_markdown_tables(args.json_file, out):
+            print("No tables generated.")
+        return 0
+
+    write_tables(args.json_file, out, args.cache_dir, args.group_by_control)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert Kubescape JSON output to Markdown tables.")
+    parser.add_argument("json_file", help="Path to the Kubescape results.json")
+    parser.add_argument("--stream", action="store_true",
+                        help="Parse the report incrementally and write rows as they are read (bounded memory)")
+    parser.add_argument("--summary-only", action="store_true",
+                        help="Print failure counts per namespace, control, severity, category and kind and the worst "
+                             "resources instead of the per-finding tables; aggregated while streaming the report")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP,
+                        help=f"Worst resources listed with --summary-only (default: {DEFAULT_TOP})")
+    parser.add_argument("--group-by-control", action="store_true",
+                        help=f"Replace the Results table with {GROUPED_RESULTS_TABLE}: one row per control outcome "
+                             "listing the affected resources")
+    parser.add_argument("--summary-budget", type=int,
+                        help="Stop printing rows after this many bytes and write the rest to per-namespace shard files")
+    parser.add_argument("--shard-dir", default=SHARD_DIR,
+                        help="Directory for the shard files written once --summary-budget is reached")
+    parser.add_argument("--baseline",
+                        help="Earlier report of the same cluster; print only the Results rows that are new, resolved or changed")
+    parser.add_argument("--cache-dir", default=os.environ.get(CACHE_DIR_ENV),
+                        help=f"Reuse parsed reports from this directory (default: ${CACHE_DIR_ENV}, off if unset)")
+    add_index_argument(parser)
+    add_arguments(parser)
+    args = parser.parse_args()
+    if args.stream and (args.summary_budget is not None or args.baseline):
+        parser.error("--stream cannot be combined with --summary-budget or --baseline")
+    if args.group_by_control and (args.stream or args.summary_budget is not None or args.baseline or args.summary_only):
+        parser.error("--group-by-control cannot be combined with --stream, --summary-budget, --baseline or --summary-only")
+    if args.summary_only and (args.stream or args.summary_budget is not None or args.baseline):
+        parser.error("--summary-only cannot be combined with --stream, --summary-budget or --baseline")
+    configure(args)
+    status = main(args)
+    if args.index:
+        index_report(args.index, args.json_file, args.cluster)
+    finish(args, "backup-python")
+    sys.exit(status)
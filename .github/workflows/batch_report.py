@@ -0,0 +1,249 @@
+import argparse
+import contextlib
+import glob
+import importlib.util
+import io
+import json
+import logging
+import os
+import re
+import sys
+
+from kubescape_findings import load_report
+from parallel_jobs import default_jobs
+from report_cache import CACHE_DIR_ENV
+from step_summary import BudgetedSummary, tool_shard_dir
+
+SHARD_DIR = tool_shard_dir("batch")
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+KUBESCAPE = "kubescape"
+TRIVY = "trivy"
+REPORT_PATTERNS = ("*.json", "*.txt")
+# Top-level keys of `trivy k8s --format json` output; Kubescape's are camelCase.
+TRIVY_JSON_KEYS = ("ClusterName", "Resources", "Misconfigurations", "Vulnerabilities")
+
+logger = logging.getLogger("batch_report")
+
+_scripts = {}
+
+
+def load_script(file_name, module_name):
+    """Imports one of the workflow scripts by file name, e.g. backup-python.py."""
+    if module_name in _scripts:
+        return _scripts[module_name]
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(SCRIPT_DIR, file_name))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    _scripts[module_name] = module
+    return module
+
+
+def expand_inputs(inputs):
+    """
+    Resolves directories and glob patterns to a sorted list of report files.
+
+    Args:
+        inputs (list): File paths, directories (searched recursively for *.json and *.txt)
+                       or glob patterns.
+
+    Returns:
+        list: Unique file paths in sorted order, so batch output does not depend on
+              the order the inputs were listed or scheduled in.
+    """
+    paths = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            for pattern in REPORT_PATTERNS:
+                paths.update(glob.glob(os.path.join(item, "**", pattern), recursive=True))
+        elif glob.has_magic(item):
+            paths.update(path for path in glob.glob(item, recursive=True) if os.path.isfile(path))
+        else:
+            paths.add(item)
+    return sorted(paths)
+
+
+def detect_tool(path):
+    """Returns TRIVY for Trivy text or JSON output and KUBESCAPE for other JSON reports."""
+    with open(path, 'r') as f:
+        head = f.read(1024).lstrip()
+    if not head.startswith("{") or any(f'"{key}"' in head for key in TRIVY_JSON_KEYS):
+        return TRIVY
+    return KUBESCAPE
+
+
+def demote_headings(markdown, levels=1):
+    """Pushes every Markdown heading outside code fences down by the given number of levels."""
+    lines = markdown.splitlines(keepends=True)
+    in_fence = False
+    for i, line in enumerate(lines):
+        if line.startswith("```"):
+            in_fence = not in_fence
+        elif not in_fence and re.match(r"#{1,5} ", line):
+            lines[i] = "#" * levels + line
+    return "".join(lines)
+
+
+def render_kubescape(path, kubescape_format, cache_dir):
+    return render_kubescape_report(load_report(path, cache_dir), kubescape_format)
+
+
+def render_kubescape_report(report, kubescape_format):
+    """Renders a normalized Kubescape report; returns (failed controls, Markdown)."""
+    findings = sum(1 for result in report.results or () for control in result.controls if control.status == "failed")
+    out = io.StringIO()
+    if kubescape_format == "tables":
+        backup = load_script("backup-python.py", "backup_python")
+        for table_name, table_content in backup.report_tables(report).items():
+            out.write(f"\n## {table_name}\n\n{table_content}\n")
+    else:
+        kubescape_to_markdown = load_script("kubescape_to_markdown.py", "kubescape_to_markdown")
+        error = kubescape_to_markdown.write_normalized_markdown(report, out)
+        if error:
+            out.write(f"{error}\n")
+    return findings, out.getvalue()
+
+
+def render_trivy(path):
+    from scripts.trivy_summary import iter_findings
+
+    with open(path, 'r') as f:
+        return render_trivy_findings(iter_findings(f))
+
+
+def render_trivy_findings(findings):
+    """Renders TrivyFinding records; returns (findings, Markdown)."""
+    from scripts.trivy_summary import format_finding
+
+    out = io.StringIO()
+    count = 0
+    for finding in findings:
+        out.write(format_finding(finding))
+        count += 1
+    if not count:
+        out.write("No misconfigurations found.\n")
+    return count, out.getvalue()
+
+
+def failed_result(path, message, tool="?"):
+    """Returns the render_file result of a file that could not be rendered: an error row in the index."""
+    return {"path": path, "tool": tool, "findings": None, "markdown": f"Error: {message}\n"}
+
+
+def render_file(task):
+    """
+    Renders one report file to Markdown; runs in a worker process.
+
+    Args:
+        task (tuple): (path, kubescape_format, cache_dir).
+
+    Returns:
+        dict: path, tool, findings (None on error) and markdown.
+    """
+    path, kubescape_format, cache_dir = task
+    tool = "?"
+    # Keep the renderers' diagnostics out of the merged report when it goes to stdout.
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            tool = detect_tool(path)
+            if tool == KUBESCAPE:
+                findings, markdown = render_kubescape(path, kubescape_format, cache_dir)
+            else:
+                findings, markdown = render_trivy(path)
+        except (OSError, UnicodeDecodeError, json.JSONDecodeError) as e:
+            return failed_result(path, f"Could not read or parse {path}: {e}")
+        except Exception as e:
+            # Valid JSON of an unexpected shape fails its own section, not the whole batch.
+            logger.exception("Could not render %s", path)
+            return failed_result(path, f"Could not render {path}: {type(e).__name__}: {e}", tool)
+    return {"path": path, "tool": tool, "findings": findings, "markdown": markdown}
+
+
+def cluster_names(paths):
+    """Names each report after its file, adding the parent directory where names collide."""
+    stems = [os.path.splitext(os.path.basename(path))[0] for path in paths]
+    names = []
+    for path, stem in zip(paths, stems):
+        if stems.count(stem) > 1:
+            stem = f"{os.path.basename(os.path.dirname(os.path.abspath(path)))}/{stem}"
+        names.append(stem)
+    return names
+
+
+def write_batch_report(results, out, budget=None, shard_dir=SHARD_DIR, headings_demoted=False):
+    """
+    Merges per-file results into one indexed Markdown report.
+
+    Args:
+        results (list): render_file results, in the order they should appear.
+        out (file): Text file handle to write to.
+        budget (int): Optional byte budget; clusters past it go to shard files.
+        shard_dir (str): Directory for the shard files.
+        headings_demoted (bool): The results' Markdown already went through demote_headings.
+    """
+    names = cluster_names([result["path"] for result in results])
+    index = ["# Cluster Scan Report\n\n", "| # | Cluster | Tool | Findings | Source |\n", "| --- | --- | --- | --- | --- |\n"]
+    for number, (name, result) in enumerate(zip(names, results), 1):
+        findings = "error" if result["findings"] is None else result["findings"]
+        index.append(f"| {number} | [{name}](#cluster-{number}) | {result['tool']} | {findings} | {result['path']} |\n")
+
+    summary = BudgetedSummary(out, budget, shard_dir)
+    summary.write("".join(index))
+    for number, (name, result) in enumerate(zip(names, results), 1):
+        markdown = result["markdown"] if headings_demoted else demote_headings(result["markdown"])
+        section = f"\n<a id=\"cluster-{number}\"></a>\n\n## {name} ({result['tool']})\n\n{markdown}"
+        summary.write(section, namespace=name)
+    summary.close()
+
+
+def run_batch(inputs, out, jobs=None, kubescape_format="md", cache_dir=None, budget=None, shard_dir=SHARD_DIR):
+    """
+    Renders many Kubescape and Trivy reports in parallel and merges them into one report.
+
+    Args:
+        inputs (list): Files, directories or glob patterns (see expand_inputs).
+        out (file): Text file handle for the merged report.
+        jobs (int): Worker processes; defaults to the available cores.
+        kubescape_format (str): "md" (kubescape_to_markdown.py) or "tables" (backup-python.py).
+        cache_dir (str): Optional parsed-report cache directory.
+        budget (int): Optional byte budget for out.
+        shard_dir (str): Directory for the shard files.
+
+    Returns:
+        int: The number of reports processed.
+    """
+    paths = expand_inputs(inputs)
+    if not paths:
+        return 0
+    tasks = [(path, kubescape_format, cache_dir) for path in paths]
+    jobs = min(jobs or default_jobs(), len(tasks))
+    if jobs == 1:
+        results = [render_file(task) for task in tasks]
+    else:
+        # Imported here: it is the slowest import of the module and a single job never needs it.
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            # map() yields in submission order, whatever order the workers finish in.
+            results = list(executor.map(render_file, tasks))
+    write_batch_report(results, out, budget, shard_dir)
+    return len(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render many Kubescape JSON and Trivy text or JSON reports into one indexed Markdown report.")
+    parser.add_argument("inputs", nargs="+", help="Report files, directories or glob patterns")
+    parser.add_argument("-o", "--output", help="Write the merged report here instead of stdout")
+    parser.add_argument("-j", "--jobs", type=int, help="Worker processes (default: available cores)")
+    parser.add_argument("--kubescape-format", choices=["md", "tables"], default="md",
+                        help="Render Kubescape reports like kubescape_to_markdown.py (md) or backup-python.py (tables)")
+    parser.add_argument("--summary-budget", type=int, help="Byte budget for the merged report; see step_summary.py")
+    parser.add_argument("--shard-dir", default=SHARD_DIR, help="Directory for clusters past the budget")
+    parser.add_argument("--cache-dir", default=os.environ.get(CACHE_DIR_ENV),
+                        help=f"Reuse parsed reports from this directory (default: ${CACHE_DIR_ENV}, off if unset)")
+    args = parser.parse_args()
+
+    with (open(args.output, "w") if args.output else contextlib.nullcontext(sys.stdout)) as out:
+        count = run_batch(args.inputs, out, args.jobs, args.kubescape_format, args.cache_dir, args.summary_budget, args.shard_dir)
+    if not count:
+        print("No reports found.", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,74 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+WORKFLOWS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, WORKFLOWS_DIR)
+
+from synthetic_reports import write_kubescape_report, write_trivy_report
+
+DEFAULT_REPEAT = 10
+# Small enough that the runs measure interpreter start and imports rather than rendering.
+RESOURCES = 5
+
+
+def _commands(kubescape, trivy, tmp):
+    """Returns (name, argv, stdin path) for every measured command."""
+    cli = os.path.join(WORKFLOWS_DIR, "cli.py")
+    pdf = os.path.join(tmp, "report.pdf")
+    return [
+        ("python", ["-c", "pass"], None),
+        ("cli --help", [cli, "--help"], None),
+        ("cli kubescape md", [cli, "kubescape", "md", kubescape], None),
+        ("cli kubescape tables", [cli, "kubescape", "tables", kubescape], None),
+        ("cli kubescape pdf", [cli, "kubescape", "pdf", kubescape, "--pdf-output", pdf], None),
+        ("cli kubescape md tables pdf", [cli, "kubescape", "md", "tables", "pdf", kubescape, "--pdf-output", pdf], None),
+        ("cli trivy summary", [cli, "trivy", "summary", "--input", trivy], None),
+        ("kubescape_to_markdown.py", [os.path.join(WORKFLOWS_DIR, "kubescape_to_markdown.py"), kubescape], None),
+        ("backup-python.py", [os.path.join(WORKFLOWS_DIR, "backup-python.py"), kubescape], None),
+        ("generate_pdf_report.py", [os.path.join(WORKFLOWS_DIR, "generate_pdf_report.py"), kubescape, pdf], None),
+        ("trivy_summary.py", [os.path.join(WORKFLOWS_DIR, "scripts", "trivy_summary.py")], trivy),
+    ]
+
+
+def _run(argv, stdin_path, env):
+    with open(stdin_path or os.devnull, "r") as stdin:
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + argv, stdin=stdin, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                       env=env, check=True)
+        return time.perf_counter() - start
+
+
+def bench_startup(repeat=DEFAULT_REPEAT):
+    """
+    Times fresh interpreter runs of each CLI subcommand and of the standalone scripts on tiny reports.
+
+    Returns:
+        list: One dict per command with the fastest and median wall time in milliseconds.
+    """
+    env = dict(os.environ)
+    env.pop("GITHUB_STEP_SUMMARY", None)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        kubescape = os.path.join(tmp, "results.json")
+        trivy = os.path.join(tmp, "trivy.txt")
+        write_kubescape_report(kubescape, RESOURCES)
+        write_trivy_report(trivy, RESOURCES)
+        for name, argv, stdin_path in _commands(kubescape, trivy, tmp):
+            _run(argv, stdin_path, env)  # Warms the OS file cache and writes bytecode.
+            runs = sorted(_run(argv, stdin_path, env) for _ in range(repeat))
+            results.append({"command": name, "min_ms": round(runs[0] * 1000, 1),
+                            "median_ms": round(runs[len(runs) // 2] * 1000, 1)})
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the cold-start time of each CLI subcommand.")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Runs per command")
+    args = parser.parse_args()
+    for result in bench_startup(args.repeat):
+        print(json.dumps(result))
@@ -0,0 +1,92 @@
+import argparse
+import contextlib
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import kubescape_findings
+from batch_report import load_script
+from scripts.trivy_summary import write_trivy_summary
+from synthetic_reports import write_kubescape_report, write_trivy_report
+
+DEFAULT_SIZES = [10000, 50000]
+
+backup_python = load_script("backup-python.py", "backup_python")
+
+
+class _CountingWriter:
+    def __init__(self):
+        self.bytes = 0
+
+    def write(self, text):
+        self.bytes += len(text.encode("utf-8"))
+
+
+def _kubescape(path, out, grouped):
+    backup_python.write_tables(path, out, group_by_control=grouped)
+
+
+def _trivy(path, out, grouped):
+    with open(path, "r") as f:
+        write_trivy_summary(f, out, group_by_check=grouped)
+
+
+def measure(render, path, grouped):
+    """
+    Renders a report once for timing and output size and once under tracemalloc for peak memory.
+
+    Returns:
+        dict: output_bytes, seconds and peak_bytes.
+    """
+    results = {}
+    for traced in (False, True):
+        kubescape_findings.clear_loaded()
+        gc.collect()
+        out = _CountingWriter()
+        if traced:
+            tracemalloc.start()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(out):
+            render(path, out, grouped)
+        if traced:
+            results["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        else:
+            results["seconds"] = round(time.perf_counter() - start, 3)
+            results["output_bytes"] = out.bytes
+    return results
+
+
+def bench_grouped(resources):
+    """
+    Compares per-finding and grouped rendering of synthetic Kubescape and Trivy scans.
+
+    Returns:
+        list: One dict per (tool, mode) with output bytes, time and peak Python heap.
+    """
+    cases = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for tool, render, generate in (("kubescape", _kubescape, write_kubescape_report),
+                                       ("trivy", _trivy, write_trivy_report)):
+            path = os.path.join(tmp, tool)
+            generate(path, resources)
+            for grouped in (False, True):
+                case = {"tool": tool, "resources": resources, "grouped": grouped}
+                case.update(measure(render, path, grouped))
+                cases.append(case)
+    return cases
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure output size and peak memory of grouped vs per-finding rendering.")
+    parser.add_argument("sizes", nargs="*", type=int, default=DEFAULT_SIZES, help="Resource counts to benchmark")
+    args = parser.parse_args()
+    for size in args.sizes:
+        for case in bench_grouped(size):
+            print(json.dumps(case))
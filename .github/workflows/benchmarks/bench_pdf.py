@@ -0,0 +1,53 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+WORKFLOWS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, WORKFLOWS_DIR)
+
+from synthetic_reports import write_kubescape_report
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+
+def bench_pdf(resources, jobs=None, workdir=None):
+    """
+    Times generate_pdf_report.py --tables on a synthetic report.
+
+    Each size runs in a fresh process, so its peak RSS (from the script's metrics file,
+    see report_metrics) is not inflated by earlier, larger runs. Worker processes are
+    not included.
+
+    Returns:
+        dict: resources, pages, seconds, pages_per_second and peak_rss_bytes.
+    """
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        json_file = os.path.join(tmp, "report.json")
+        pdf_file = os.path.join(tmp, "report.pdf")
+        metrics_file = os.path.join(tmp, "metrics.json")
+        write_kubescape_report(json_file, resources)
+        command = [sys.executable, os.path.join(WORKFLOWS_DIR, "generate_pdf_report.py"), "--tables", json_file,
+                   pdf_file, "--metrics-file", metrics_file]
+        if jobs:
+            command += ["--jobs", str(jobs)]
+        start = time.perf_counter()
+        subprocess.run(command, check=True)
+        seconds = time.perf_counter() - start
+        with open(metrics_file, 'r') as f:
+            metrics = json.load(f)
+    pages = metrics["counters"]["pages"]
+    return {"resources": resources, "jobs": jobs, "pages": pages, "seconds": round(seconds, 3),
+            "pages_per_second": round(pages / seconds, 1), "peak_rss_bytes": metrics["peak_rss_bytes"]}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure PDF pages per second and peak memory of generate_pdf_report.py --tables.")
+    parser.add_argument("sizes", nargs="*", type=int, default=DEFAULT_SIZES, help="Resource counts to benchmark")
+    parser.add_argument("-j", "--jobs", type=int, help="Worker processes (default: one per core)")
+    args = parser.parse_args()
+    for size in args.sizes:
+        print(json.dumps(bench_pdf(size, args.jobs)))
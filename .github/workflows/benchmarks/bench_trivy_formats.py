@@ -0,0 +1,53 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.trivy_summary import JSON, TEXT, write_trivy_summary
+from synthetic_reports import write_trivy_json_report, write_trivy_report
+
+DEFAULT_SIZES = [1000, 10000, 50000]
+DEFAULT_REPEAT = 3
+
+
+def _summarize(path, input_format):
+    with open(path, 'r') as f, open(os.devnull, "w") as out:
+        start = time.perf_counter()
+        write_trivy_summary(f, out, input_format=input_format)
+        return time.perf_counter() - start
+
+
+def bench_formats(resources, repeat=DEFAULT_REPEAT):
+    """
+    Summarizes the same synthetic cluster scan from Trivy text and from Trivy JSON.
+
+    Returns:
+        list: One dict per format with input size, fastest time, MB/s and findings/s.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for input_format, write in ((TEXT, write_trivy_report), (JSON, write_trivy_json_report)):
+            path = os.path.join(tmp, f"scan.{input_format}")
+            findings = write(path, resources)
+            seconds = min(_summarize(path, input_format) for _ in range(repeat))
+            size = os.path.getsize(path)
+            results.append({"format": input_format, "resources": resources, "findings": findings, "input_bytes": size,
+                            "seconds": round(seconds, 4), "mb_per_second": round(size / seconds / 1e6, 1),
+                            "findings_per_second": round(findings / seconds)})
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare Trivy text and JSON summarization throughput on the same scan.")
+    parser.add_argument("sizes", nargs="*", type=int, default=DEFAULT_SIZES, help="Resource counts to benchmark")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Runs per case; the fastest is reported")
+    args = parser.parse_args()
+    for size in args.sizes:
+        text, json_ = bench_formats(size, args.repeat)
+        print(json.dumps(text))
+        print(json.dumps(json_))
+        print(f"{size} resources: JSON is {text['seconds'] / json_['seconds']:.2f}x the speed of text", file=sys.stderr)
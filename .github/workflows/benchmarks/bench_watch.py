@@ -0,0 +1,72 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from report_watch import ReportWatcher
+from synthetic_reports import write_kubescape_report, write_trivy_report
+
+DEFAULT_CLUSTERS = 300
+DEFAULT_RESOURCES = 200
+
+
+def _timed_poll(watcher):
+    start = time.perf_counter()
+    changed, removed = watcher.poll()
+    return {"changed": len(changed), "removed": len(removed), "ms": round((time.perf_counter() - start) * 1000, 1)}
+
+
+def bench_watch(clusters=DEFAULT_CLUSTERS, resources=DEFAULT_RESOURCES):
+    """
+    Measures the turnaround of ReportWatcher.poll on a directory of synthetic cluster reports.
+
+    Two thirds of the clusters have a Kubescape report and one third a Trivy report.
+    After the cold first poll, one Kubescape report is replaced by a new scan, then
+    touched without changes, then restored to its previous contents.
+
+    Returns:
+        dict: Milliseconds and changed file counts per step.
+    """
+    results = {"clusters": clusters, "resources": resources}
+    with tempfile.TemporaryDirectory() as tmp:
+        reports = os.path.join(tmp, "reports")
+        os.makedirs(reports)
+        for number in range(clusters):
+            if number % 3 == 2:
+                write_trivy_report(os.path.join(reports, f"cluster-{number}.txt"), resources // 2, seed=number)
+            else:
+                write_kubescape_report(os.path.join(reports, f"cluster-{number}.json"), resources, seed=number)
+        watcher = ReportWatcher([reports], os.path.join(tmp, "report.md"))
+        results["cold"] = _timed_poll(watcher)
+        results["idle"] = _timed_poll(watcher)
+
+        target = os.path.join(reports, "cluster-0.json")
+        previous = os.path.join(tmp, "previous.json")
+        shutil.copy(target, previous)
+        # New scans are dropped in with an atomic rename, as the watcher expects.
+        staged = os.path.join(tmp, "staged.json")
+        write_kubescape_report(staged, resources, seed=clusters + 1)
+        os.replace(staged, target)
+        results["new_scan"] = _timed_poll(watcher)
+
+        os.utime(target, ns=(time.time_ns(), time.time_ns()))
+        results["touched"] = _timed_poll(watcher)
+
+        shutil.copy(previous, staged)
+        os.replace(staged, target)
+        results["restored"] = _timed_poll(watcher)
+        results["report_bytes"] = os.path.getsize(os.path.join(tmp, "report.md"))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the report turnaround of the watch mode.")
+    parser.add_argument("--clusters", type=int, default=DEFAULT_CLUSTERS, help="Report files in the watched directory")
+    parser.add_argument("--resources", type=int, default=DEFAULT_RESOURCES, help="Resources per Kubescape report")
+    args = parser.parse_args()
+    print(json.dumps(bench_watch(args.clusters, args.resources)))
@@ -0,0 +1,39 @@
+import argparse
+import sys
+import time
+
+DEFAULT_CHUNK_BYTES = 4096
+
+
+def emit(path, out, startup_delay=0.0, chunk_bytes=DEFAULT_CHUNK_BYTES, chunk_delay=0.0):
+    """
+    Copies canned scanner output to out in chunks, pausing like a scanner that is still working.
+
+    Args:
+        path (str): File holding the output to replay, e.g. a saved `trivy k8s` report.
+        out (file): Binary file handle, e.g. sys.stdout.buffer.
+        startup_delay (float): Seconds to wait before the first byte.
+        chunk_bytes (int): Bytes written at a time.
+        chunk_delay (float): Seconds to wait after each chunk.
+    """
+    time.sleep(startup_delay)
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_bytes)
+            if not chunk:
+                return
+            out.write(chunk)
+            out.flush()
+            time.sleep(chunk_delay)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stand-in for kubescape or trivy: replays canned output with delays.")
+    parser.add_argument("output", help="File whose contents are written to stdout")
+    parser.add_argument("--startup-delay", type=float, default=0.0, help="Seconds before any output")
+    parser.add_argument("--chunk-bytes", type=int, default=DEFAULT_CHUNK_BYTES, help="Bytes written at a time")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="Seconds between chunks")
+    parser.add_argument("--exit-code", type=int, default=0, help="Exit status once the output is written")
+    args = parser.parse_args()
+    emit(args.output, sys.stdout.buffer, args.startup_delay, args.chunk_bytes, args.chunk_delay)
+    sys.exit(args.exit_code)
@@ -0,0 +1,274 @@
+import argparse
+import contextlib
+import datetime
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+WORKFLOWS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, WORKFLOWS_DIR)
+
+import kubescape_findings
+from batch_report import load_script
+from generate_pdf_report import generate_pdf
+from report_watch import ReportWatcher
+from scripts.trivy_summary import JSON, process_trivy_results, write_trivy_summary
+from synthetic_reports import write_kubescape_report, write_trivy_json_report, write_trivy_report
+
+DEFAULT_SIZES = [100, 1000, 10000]
+DEFAULT_REPEAT = 3
+# A run slower than the baseline by more than this factor is reported as a regression.
+DEFAULT_TOLERANCE = 1.2
+# Cluster reports in the directory the watch mode target polls; the resources are split among them.
+WATCH_CLUSTERS = 10
+# Returned by a script run whose interpreter could not measure its peak RSS (see report_metrics.peak_rss_bytes).
+UNMEASURED = object()
+
+
+backup_python = load_script("backup-python.py", "backup_python")
+kubescape_to_markdown = load_script("kubescape_to_markdown.py", "kubescape_to_markdown")
+
+
+def _backup(json_file, tmp):
+    backup_python.json_to_markdown_table(json_file)
+
+
+def _summary_only(json_file, tmp):
+    backup_python.write_rollup(backup_python.rollup_report(json_file), sys.stdout)
+
+
+def _kubescape_md(json_file, tmp):
+    kubescape_to_markdown.convert_kubescape_json_to_markdown(json_file)
+
+
+def _trivy(text_file, tmp):
+    with open(text_file, 'r') as f:
+        process_trivy_results(f.read())
+
+
+def _pdf(json_file, tmp):
+    generate_pdf(json_file, os.path.join(tmp, "report.pdf"))
+
+
+def _pdf_tables(json_file, tmp):
+    return _run_script(tmp, "generate_pdf_report.py", "--tables", json_file, os.path.join(tmp, "report.pdf"))
+
+
+def _trivy_summary(text_file, tmp, input_format="text", group_by_check=False):
+    with open(text_file, 'r') as f, open(os.devnull, "w") as out:
+        write_trivy_summary(f, out, input_format=input_format, group_by_check=group_by_check)
+
+
+def _trivy_json(json_file, tmp):
+    _trivy_summary(json_file, tmp, JSON)
+
+
+def _trivy_grouped(text_file, tmp):
+    _trivy_summary(text_file, tmp, group_by_check=True)
+
+
+def _backup_grouped(json_file, tmp):
+    backup_python.write_tables(json_file, sys.stdout, group_by_control=True)
+
+
+def _cli_kubescape(json_file, tmp):
+    return _run_script(tmp, "cli.py", "kubescape", "md", "tables", json_file)
+
+
+def _cli_trivy(text_file, tmp):
+    return _run_script(tmp, "cli.py", "trivy", "summary", "--input", text_file)
+
+
+def _write_cluster_reports(path, resources):
+    """Writes a directory of WATCH_CLUSTERS reports, two Kubescape reports for each Trivy one."""
+    os.makedirs(path)
+    for number in range(WATCH_CLUSTERS):
+        if number % 3 == 2:
+            write_trivy_report(os.path.join(path, f"cluster-{number}.txt"), resources // WATCH_CLUSTERS, seed=number)
+        else:
+            write_kubescape_report(os.path.join(path, f"cluster-{number}.json"), resources // WATCH_CLUSTERS, seed=number)
+
+
+def _watch(directory, tmp):
+    # A cold poll: every report is parsed and rendered, and the combined report written.
+    ReportWatcher([directory], os.path.join(tmp, "report.md")).poll()
+
+
+# name -> (function benchmarked, input generator). Functions that run a script in a
+# fresh interpreter, startup included, return its peak RSS (see _run_script).
+TARGETS = {
+    "json_to_markdown_table": (_backup, write_kubescape_report),
+    "group_by_control": (_backup_grouped, write_kubescape_report),
+    "summary_only": (_summary_only, write_kubescape_report),
+    "convert_kubescape_json_to_markdown": (_kubescape_md, write_kubescape_report),
+    "process_trivy_results": (_trivy, write_trivy_report),
+    "trivy_summary_json": (_trivy_json, write_trivy_json_report),
+    "group_by_check": (_trivy_grouped, write_trivy_report),
+    "generate_pdf": (_pdf, write_kubescape_report),
+    "generate_pdf_tables": (_pdf_tables, write_kubescape_report),
+    "cli_kubescape_md_tables": (_cli_kubescape, write_kubescape_report),
+    "cli_trivy_summary": (_cli_trivy, write_trivy_report),
+    "report_watch_poll": (_watch, _write_cluster_reports),
+}
+
+
+def _run_script(tmp, script, *args):
+    """Runs one of the workflow scripts in a fresh interpreter; returns its peak RSS from its metrics file."""
+    metrics_file = os.path.join(tmp, "metrics.json")
+    env = dict(os.environ)
+    env.pop("GITHUB_STEP_SUMMARY", None)
+    subprocess.run([sys.executable, os.path.join(WORKFLOWS_DIR, script), *args, "--metrics-file", metrics_file],
+                   stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env, check=True)
+    with open(metrics_file, 'r') as f:
+        peak = json.load(f)["peak_rss_bytes"]
+    return UNMEASURED if peak is None else peak
+
+
+def _run_once(function, input_file, tmp):
+    # Each run parses from scratch rather than reusing the previous run's report.
+    kubescape_findings.clear_loaded()
+    gc.collect()
+    # The scripts print diagnostics; their cost is part of the measurement, the output is not.
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        peak = function(input_file, tmp)
+        return time.perf_counter() - start, peak
+
+
+def measure(function, input_file, tmp, repeat=DEFAULT_REPEAT):
+    """
+    Times a benchmark function and measures its peak Python heap usage.
+
+    Timing and memory are measured in separate runs, as tracemalloc slows the code
+    it traces down considerably. Functions that run a child process report its peak
+    RSS instead, which needs no extra run; where the child cannot measure it,
+    peak_bytes is None.
+
+    Args:
+        function (callable): Called as function(input_file, tmp).
+        input_file (str): Synthetic input report.
+        tmp (str): Scratch directory for output files.
+        repeat (int): Number of timed runs.
+
+    Returns:
+        dict: seconds (fastest run), runs (every run) and peak_bytes.
+    """
+    runs, peaks = zip(*(_run_once(function, input_file, tmp) for _ in range(repeat)))
+    if UNMEASURED in peaks:
+        peak = None
+    elif peaks[0] is not None:
+        peak = max(peaks)
+    else:
+        tracemalloc.start()
+        try:
+            _run_once(function, input_file, tmp)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return {"seconds": round(min(runs), 4), "runs": [round(run, 4) for run in runs], "peak_bytes": peak}
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=WORKFLOWS_DIR, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _megabytes(peak):
+    return "n/a" if peak is None else f"{peak / 1e6:.1f} MB"
+
+
+def run_benchmarks(targets, sizes, repeat=DEFAULT_REPEAT):
+    """
+    Runs every target at every size on freshly generated synthetic reports.
+
+    Args:
+        targets (list): Names from TARGETS.
+        sizes (list): Resource counts of the synthetic reports.
+        repeat (int): Timed runs per case.
+
+    Returns:
+        dict: Environment details and one result per (target, size).
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            inputs = {}
+            for name in targets:
+                function, generate = TARGETS[name]
+                if generate not in inputs:
+                    path = os.path.join(tmp, f"{generate.__name__}-{size}")
+                    generate(path, size)
+                    inputs[generate] = path
+                input_file = inputs[generate]
+                result = {"target": name, "resources": size, "input_bytes": os.path.getsize(input_file)}
+                result.update(measure(function, input_file, tmp, repeat))
+                print(f"{name} {size}: {result['seconds']:.3f}s, peak {_megabytes(result['peak_bytes'])}", file=sys.stderr)
+                results.append(result)
+    return {
+        "commit": _commit(),
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(baseline, current, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compares two benchmark result documents case by case.
+
+    Peak memory is compared only where both documents measured it; it is "n/a" otherwise.
+
+    Returns:
+        list: Lines describing each case present in both, regressions marked.
+    """
+    previous = {(result["target"], result["resources"]): result for result in baseline["results"]}
+    lines = []
+    for result in current["results"]:
+        old = previous.get((result["target"], result["resources"]))
+        if old is None:
+            continue
+        time_ratio = result["seconds"] / old["seconds"] if old["seconds"] else float("inf")
+        if result["peak_bytes"] is None or old["peak_bytes"] is None:
+            memory_ratio = None
+        else:
+            memory_ratio = result["peak_bytes"] / old["peak_bytes"] if old["peak_bytes"] else float("inf")
+        memory = "n/a" if memory_ratio is None else f"x{memory_ratio:.2f}"
+        regressed = time_ratio > tolerance or (memory_ratio is not None and memory_ratio > tolerance)
+        flag = " REGRESSION" if regressed else ""
+        lines.append(f"{result['target']} {result['resources']}: time x{time_ratio:.2f}, peak memory {memory}{flag}")
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time and memory-profile the report scripts on synthetic inputs.")
+    parser.add_argument("-o", "--output", default="benchmark-results.json", help="Where to write the JSON results")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Resource counts to benchmark")
+    parser.add_argument("--targets", nargs="+", choices=list(TARGETS), default=list(TARGETS), help="Functions to benchmark")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Timed runs per case; the fastest is reported")
+    parser.add_argument("--compare", help="Results JSON of an earlier commit to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Slowdown or memory growth factor reported as a regression")
+    args = parser.parse_args()
+
+    document = run_benchmarks(args.targets, args.sizes, args.repeat)
+    with open(args.output, "w") as f:
+        json.dump(document, f, indent=2)
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            lines = compare(json.load(f), document, args.tolerance)
+        print("\n".join(lines))
+        if any(line.endswith("REGRESSION") for line in lines):
+            sys.exit(1)
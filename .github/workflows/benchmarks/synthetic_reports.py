@@ -0,0 +1,244 @@
+import json
+import random
+
+SEVERITIES = ["Low", "Medium", "High", "Critical"]
+CATEGORIES = ["Workload", "Network", "Access control", "Secrets", "Node escape"]
+KINDS = ["Deployment", "StatefulSet", "DaemonSet", "Pod", "Service", "ServiceAccount", "Role", "ConfigMap"]
+
+
+def _control_id(number):
+    return f"C-{number:04d}"
+
+
+def write_kubescape_report(path, resources, controls=60, namespaces=20, controls_per_resource=8, failure_rate=0.3, seed=0):
+    """
+    Writes a synthetic Kubescape JSON report shaped like `kubescape scan framework nsa --format json`.
+
+    The report is written element by element, so generating a very large one does not
+    need the whole document in memory.
+
+    Args:
+        path (str): Output file path.
+        resources (int): Number of resources (one results entry each).
+        controls (int): Number of distinct controls.
+        namespaces (int): Number of namespaces the resources are spread over.
+        controls_per_resource (int): Controls evaluated against each resource.
+        failure_rate (float): Probability that a control fails on a resource.
+        seed (int): Random seed; the same arguments always produce the same file.
+
+    Returns:
+        int: The number of failed (resource, control) pairs in the report.
+    """
+    rng = random.Random(seed)
+    control_meta = [
+        {
+            "name": f"Control {number} checks a security setting",
+            "severity": rng.choice(SEVERITIES),
+            "category": rng.choice(CATEGORIES),
+            "remediation": f"Set the field required by control {number} in the workload spec.",
+        }
+        for number in range(controls)
+    ]
+    failed_by_control = [0] * controls
+    fix_paths = [[] for _ in range(controls)]
+    failures = 0
+
+    with open(path, "w") as f:
+        f.write('{"clusterAPIServerInfo": ')
+        json.dump({"major": "1", "minor": "28", "gitVersion": "v1.28.3", "gitCommit": "a8a1abc25cad87333840cd7d54be2efaf31a3177",
+                   "gitTreeState": "clean", "buildDate": "2023-10-18T11:33:18Z", "goVersion": "go1.20.10",
+                   "compiler": "gc", "platform": "linux/amd64"}, f)
+
+        f.write(', "resources": [')
+        for number in range(resources):
+            kind = KINDS[number % len(KINDS)]
+            namespace = f"namespace-{number % namespaces}"
+            name = f"{kind.lower()}-{number}"
+            resource_id = f"apps/v1/{namespace}/{kind}/{name}"
+            if number:
+                f.write(", ")
+            json.dump({"resourceID": resource_id, "object": {"apiVersion": "apps/v1", "kind": kind, "namespace": namespace, "name": name}}, f)
+
+        f.write('], "results": [')
+        for number in range(resources):
+            kind = KINDS[number % len(KINDS)]
+            namespace = f"namespace-{number % namespaces}"
+            name = f"{kind.lower()}-{number}"
+            resource_id = f"apps/v1/{namespace}/{kind}/{name}"
+            result_controls = []
+            failed_details = []
+            for control in rng.sample(range(controls), min(controls_per_resource, controls)):
+                meta = control_meta[control]
+                failed = rng.random() < failure_rate
+                result_controls.append({
+                    "controlID": _control_id(control),
+                    "name": meta["name"],
+                    "status": {"status": "failed" if failed else "passed", "info": "" if not failed else "Field is not set"},
+                })
+                if failed:
+                    failures += 1
+                    failed_by_control[control] += 1
+                    failed_details.append({"severity": meta["severity"], "controlName": meta["name"],
+                                           "docsUrl": f"https://hub.armosec.io/docs/{_control_id(control).lower()}",
+                                           "remediation": meta["remediation"]})
+                    fix_paths[control].append({"resourceID": resource_id,
+                                               "fixPath": {"path": "spec.template.spec.containers[0].securityContext.runAsNonRoot", "value": "true"}})
+            if number:
+                f.write(", ")
+            json.dump({"resourceID": resource_id, "kind": kind, "namespace": namespace, "name": name,
+                       "severity": rng.choice(SEVERITIES), "category": rng.choice(CATEGORIES),
+                       "remediation": "See the failed controls", "controls": result_controls,
+                       "failedControlsDetails": failed_details}, f)
+
+        f.write('], "summaryDetails": {"controls": ')
+        summary_controls = {}
+        for control, meta in enumerate(control_meta):
+            exceptions = []
+            if control % 10 == 0:
+                exceptions.append({"name": f"exception-{control}", "guid": f"00000000-0000-0000-0000-{control:012d}",
+                                   "attributes": {"systemException": control % 20 == 0}, "policyType": "postureExceptionPolicy"})
+            summary_controls[_control_id(control)] = {
+                "name": meta["name"],
+                "statusInfo": {"status": "failed" if failed_by_control[control] else "passed"},
+                "complianceScore": round(100.0 * (1 - failed_by_control[control] / max(resources, 1)), 2),
+                "category": {"name": meta["category"]},
+                "results": fix_paths[control],
+                "exception": exceptions,
+            }
+        json.dump(summary_controls, f)
+
+        f.write('}, "frameworks": ')
+        json.dump([{"name": "NSA", "status": "failed" if failures else "passed",
+                    "complianceScore": round(100.0 * (1 - failures / max(resources * controls_per_resource, 1)), 2)}], f)
+        f.write(', "controlReports": ')
+        json.dump([{"controlID": _control_id(control), "name": meta["name"], "failedResources": failed_by_control[control],
+                    "totalResources": resources} for control, meta in enumerate(control_meta)], f)
+        f.write(', "metadata": ')
+        json.dump({"clusterMetadata": {"cloudProvider": "minikube", "numberOfWorkerNodes": 3},
+                   "scanMetadata": {"targetType": "Framework", "kubescapeVersion": "v3.0.3", "formatVersion": "v2",
+                                    "formats": ["json"], "targetNames": ["nsa"], "failThreshold": 100}}, f)
+        f.write("}\n")
+    return failures
+
+
+TRIVY_SEVERITIES = ["LOW", "MEDIUM", "HIGH", "CRITICAL"]
+TRIVY_CHECKS = [
+    ("Process can elevate its own privileges", "allowPrivilegeEscalation: true"),
+    ("Runs as root user", "runAsNonRoot: false"),
+    ("Default capabilities not dropped", "capabilities: {}"),
+    ("CPU not limited", "resources: {}"),
+    ("Image tag ':latest' used", "image: nginx:latest"),
+    ("Root file system is not read-only", "readOnlyRootFilesystem: false"),
+]
+
+
+def _trivy_resources(resources, namespaces, findings_per_resource, seed):
+    # The scan shared by the text and JSON writers: (namespace, kind, name, checks).
+    rng = random.Random(seed)
+    for number in range(resources):
+        kind = KINDS[number % 4]
+        name = f"{kind.lower()}-{number}"
+        checks = []
+        for finding in range(findings_per_resource):
+            check = rng.randrange(1, 120)
+            title, setting = TRIVY_CHECKS[check % len(TRIVY_CHECKS)]
+            first = 10 + 6 * finding
+            checks.append({
+                "check": check,
+                "severity": rng.choice(TRIVY_SEVERITIES),
+                "title": title,
+                "message": f"Container '{name}' of {kind.lower()} '{name}': {title}",
+                "file": f"{kind.lower()}-{name}.yaml",
+                "lines": [
+                    (first, f"      - image: registry.example.com/{name}:1.0"),
+                    (first + 1, f"        name: {name}"),
+                    (first + 2, "        securityContext:"),
+                    (first + 3, f"          {setting}"),
+                ],
+            })
+        yield f"namespace-{number % namespaces}", kind, name, checks
+
+
+def write_trivy_report(path, resources, namespaces=20, findings_per_resource=3, seed=0):
+    """
+    Writes synthetic `trivy k8s --report all` text output.
+
+    Each resource gets a block headed by its namespace line, followed by
+    findings_per_resource AVD-KSV- checks with a description, a link and a code snippet.
+
+    Args:
+        path (str): Output file path.
+        resources (int): Number of resource blocks.
+        namespaces (int): Number of namespaces the resources are spread over.
+        findings_per_resource (int): AVD checks per resource.
+        seed (int): Random seed; the same arguments always produce the same file.
+
+    Returns:
+        int: The number of findings in the report.
+    """
+    with open(path, "w") as f:
+        for number, (namespace, kind, name, checks) in enumerate(_trivy_resources(resources, namespaces, findings_per_resource, seed)):
+            kind = kind.lower()
+            f.write(f"namespace: {namespace}, {kind}/{name} (kubernetes): 1-{20 + number % 40}\n")
+            f.write("=" * 60 + "\n")
+            f.write(f"Tests: 110 (SUCCESSES: {110 - findings_per_resource}, FAILURES: {findings_per_resource})\n")
+            f.write(f"Failures: {findings_per_resource} (LOW: 0, MEDIUM: 0, HIGH: 0, CRITICAL: 0)\n\n")
+            for check in checks:
+                lines = check["lines"]
+                f.write(f"AVD-KSV-{check['check']:04d} ({check['severity']}): {check['message']}\n")
+                f.write("═" * 60 + "\n")
+                f.write(f"{check['title']}; the {kind} {name} in {namespace} should not be deployed like this.\n\n")
+                f.write(f"See https://avd.aquasec.com/misconfig/ksv{check['check']:03d}\n")
+                f.write("─" * 60 + "\n")
+                f.write(f" {check['file']}:{lines[0][0]}-{lines[-1][0]}\n")
+                f.write("─" * 60 + "\n")
+                for position, (line_number, content) in enumerate(lines):
+                    marker = "┌" if position == 0 else "└" if position == len(lines) - 1 else "│"
+                    f.write(f" {line_number} {marker} {content}\n")
+                f.write("─" * 60 + "\n\n\n")
+    return resources * findings_per_resource
+
+
+def write_trivy_json_report(path, resources, namespaces=20, findings_per_resource=3, seed=0):
+    """
+    Writes the scan of write_trivy_report as `trivy k8s --format json --report all` output.
+
+    Takes the same arguments and, for the same arguments, describes the same findings.
+    """
+    with open(path, "w") as f:
+        f.write('{"ClusterName": "synthetic", "Resources": [')
+        for number, (namespace, kind, name, checks) in enumerate(_trivy_resources(resources, namespaces, findings_per_resource, seed)):
+            misconfigurations = []
+            for check in checks:
+                lines = check["lines"]
+                misconfigurations.append({
+                    "Type": "Kubernetes Security Check",
+                    "ID": f"KSV{check['check']:03d}",
+                    "AVDID": f"AVD-KSV-{check['check']:04d}",
+                    "Title": check["title"],
+                    "Description": f"{check['title']}; the {kind.lower()} {name} in {namespace} should not be deployed like this.",
+                    "Message": check["message"],
+                    "Resolution": "Change the setting in the workload spec.",
+                    "Severity": check["severity"],
+                    "PrimaryURL": f"https://avd.aquasec.com/misconfig/ksv{check['check']:03d}",
+                    "Status": "FAIL",
+                    "CauseMetadata": {
+                        "Provider": "Kubernetes",
+                        "StartLine": lines[0][0],
+                        "EndLine": lines[-1][0],
+                        "Code": {"Lines": [
+                            {"Number": line_number, "Content": content, "IsCause": True,
+                             "FirstCause": position == 0, "LastCause": position == len(lines) - 1}
+                            for position, (line_number, content) in enumerate(lines)
+                        ]},
+                    },
+                })
+            if number:
+                f.write(", ")
+            json.dump({"Namespace": namespace, "Kind": kind, "Name": name, "Results": [{
+                "Target": f"{kind}/{name}", "Class": "config", "Type": "kubernetes",
+                "MisconfSummary": {"Successes": 110 - findings_per_resource, "Failures": findings_per_resource},
+                "Misconfigurations": misconfigurations,
+            }]}, f)
+        f.write("]}\n")
+    return resources * findings_per_resource
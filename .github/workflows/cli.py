@@ -0,0 +1,215 @@
+import argparse
+import json
+import os
+import sys
+
+from report_metrics import add_arguments, configure, finish
+
+KUBESCAPE_FORMATS = ["md", "tables", "summary", "pdf"]
+PDF_LAYOUTS = ["lines", "tables"]
+DEFAULT_PDF_OUTPUT = "kubescape_report.pdf"
+STDOUT = "-"
+
+
+def _open_output(path):
+    if path == STDOUT:
+        return sys.stdout
+    return open(path, "w")
+
+
+def _close_output(out):
+    if out is not sys.stdout:
+        out.close()
+
+
+def write_kubescape_md(args, out):
+    """Writes the output of kubescape_to_markdown.py."""
+    import kubescape_to_markdown
+
+    error = kubescape_to_markdown.write_kubescape_markdown(args.json_file, out, args.cache_dir)
+    out.write((error or "") + "\n")
+
+
+def write_kubescape_tables(args, out):
+    """Writes the output of backup-python.py run without options."""
+    from batch_report import load_script
+
+    load_script("backup-python.py", "backup_python").write_tables(args.json_file, out, args.cache_dir,
+                                                                  args.group_by_control)
+
+
+def write_kubescape_summary(args, out):
+    """Writes the output of backup-python.py --summary-only."""
+    from report_rollup import Rollup, rollup_report, write_rollup
+
+    try:
+        if len(args.formats) == 1:
+            rollup = rollup_report(args.json_file, args.top)
+        else:
+            # Other formats parse the whole report anyway; aggregate the shared copy.
+            from kubescape_findings import load_report
+
+            rollup = Rollup(args.top)
+            rollup.add_results(load_report(args.json_file, args.cache_dir).results or ())
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        out.write(f"Error: Could not read or parse JSON file: {e}\nNo tables generated.\n")
+        return
+    write_rollup(rollup, out)
+
+
+def write_kubescape_pdf(args):
+    """Writes the PDF of generate_pdf_report.py in the chosen layout."""
+    import generate_pdf_report
+
+    if args.pdf_layout == "tables":
+        generate_pdf_report.generate_pdf_tables(args.json_file, args.pdf_output, args.jobs, args.cache_dir)
+    else:
+        generate_pdf_report.generate_pdf(args.json_file, args.pdf_output, args.cache_dir)
+
+
+def run_kubescape(args):
+    """
+    Renders one Kubescape report in every requested format.
+
+    The report is parsed once: kubescape_findings.load_report hands the same parsed
+    report to each renderer.
+
+    Returns:
+        int: The exit status.
+    """
+    from report_metrics import metrics
+
+    for kubescape_format in dict.fromkeys(args.formats):
+        if kubescape_format == "pdf":
+            write_kubescape_pdf(args)
+            continue
+        path, write = {
+            "md": (args.md_output, write_kubescape_md),
+            "tables": (args.tables_output, write_kubescape_tables),
+            "summary": (args.summary_output, write_kubescape_summary),
+        }[kubescape_format]
+        out = _open_output(path)
+        try:
+            write(args, metrics.writer(out))
+        finally:
+            _close_output(out)
+
+    if args.index:
+        from findings_index import index_report
+
+        index_report(args.index, args.json_file, args.cluster)
+    return 0
+
+
+def run_trivy(args):
+    """
+    Summarizes Trivy output like scripts/trivy_summary.py.
+
+    Returns:
+        int: The exit status.
+    """
+    from scripts.trivy_summary import ISSUES_ANNOTATION, summarize
+
+    summary_file_path = args.output or os.environ.get("GITHUB_STEP_SUMMARY")
+    if args.input == STDOUT:
+        has_issues = summarize(args, sys.stdin, summary_file_path)
+    else:
+        try:
+            f = open(args.input, "r")
+        except OSError as e:
+            print(f"Error: Could not read Trivy output: {e}", file=sys.stderr)
+            return 1
+        with f:
+            has_issues = summarize(args, f, summary_file_path)
+    if has_issues:
+        print(ISSUES_ANNOTATION)
+    return 1 if has_issues is None else 0
+
+
+def add_kubescape_arguments(kubescape):
+    """Adds the options of the kubescape subcommand, defined by the modules that read them."""
+    from findings_index import add_index_argument
+    from report_cache import CACHE_DIR_ENV
+    from report_rollup import DEFAULT_TOP
+
+    kubescape.add_argument("formats", nargs="+", choices=KUBESCAPE_FORMATS, metavar="FORMAT",
+                           help="md (kubescape_to_markdown.py), tables (backup-python.py), "
+                                "summary (backup-python.py --summary-only) or pdf (generate_pdf_report.py)")
+    kubescape.add_argument("json_file", help="Path to the Kubescape results.json")
+    kubescape.add_argument("--md-output", default=STDOUT, help="Where to write the md format (default: stdout)")
+    kubescape.add_argument("--tables-output", default=STDOUT, help="Where to write the tables format (default: stdout)")
+    kubescape.add_argument("--group-by-control", action="store_true",
+                           help="tables: one Results row per control outcome listing the affected resources")
+    kubescape.add_argument("--summary-output", default=STDOUT,
+                           help="Where to write the summary format (default: stdout)")
+    kubescape.add_argument("--top", type=int, default=DEFAULT_TOP,
+                           help=f"Worst resources listed by the summary format (default: {DEFAULT_TOP})")
+    kubescape.add_argument("--pdf-output", default=DEFAULT_PDF_OUTPUT,
+                           help=f"Where to write the pdf format (default: {DEFAULT_PDF_OUTPUT})")
+    kubescape.add_argument("--pdf-layout", choices=PDF_LAYOUTS, default="lines",
+                           help="lines: one line per field; tables: paginated tables rendered in parallel")
+    kubescape.add_argument("-j", "--jobs", type=int, help="Worker processes for --pdf-layout tables (default: one per core)")
+    kubescape.add_argument("--cache-dir", default=os.environ.get(CACHE_DIR_ENV),
+                           help=f"Reuse parsed reports from this directory (default: ${CACHE_DIR_ENV}, off if unset)")
+    add_index_argument(kubescape)
+    add_arguments(kubescape)
+
+
+def add_trivy_arguments(trivy):
+    """Adds the options of the trivy subcommand, defined by scripts/trivy_summary.py."""
+    from scripts.trivy_summary import add_summary_arguments
+
+    trivy.add_argument("action", choices=["summary"], help="summary (scripts/trivy_summary.py)")
+    trivy.add_argument("--input", default=STDOUT, help="Trivy output to read (default: stdin)")
+    trivy.add_argument("-o", "--output",
+                       help="Append the budgeted summary here (default: $GITHUB_STEP_SUMMARY, else print it in full)")
+    add_summary_arguments(trivy)
+    add_arguments(trivy)
+
+
+def build_parser(tool=None):
+    """
+    Returns the argument parser of the command line.
+
+    The options of each subcommand are defined by the scripts' own modules, so they
+    cannot drift apart. Those modules are only imported for the subcommand that runs:
+    given a tool, the other subcommands are listed without their options, so `--help`
+    imports none of them and `trivy summary` never loads the Kubescape parser. The
+    renderers are only imported once a subcommand runs.
+
+    Args:
+        tool (str): The subcommand about to be parsed; None adds the options of all of them.
+    """
+    parser = argparse.ArgumentParser(description="Render Kubescape and Trivy reports.")
+    tools = parser.add_subparsers(dest="tool", metavar="TOOL")
+    tools.required = True
+
+    kubescape = tools.add_parser("kubescape", help="Render a Kubescape results.json",
+                                 description="Render a Kubescape results.json in one or more formats, parsing it once.")
+    if tool in (None, "kubescape"):
+        add_kubescape_arguments(kubescape)
+    kubescape.set_defaults(run=run_kubescape)
+
+    trivy = tools.add_parser("trivy", help="Summarize `trivy k8s` output",
+                             description="Summarize `trivy k8s --report all` text or `--format json` output.")
+    if tool in (None, "trivy"):
+        add_trivy_arguments(trivy)
+    trivy.set_defaults(run=run_trivy)
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    # The subcommand is the first positional argument; the top-level parser has no other options.
+    parser = build_parser(next((arg for arg in argv if not arg.startswith("-")), ""))
+    args = parser.parse_args(argv)
+    if args.tool == "trivy" and args.group_by_check and args.baseline:
+        parser.error("--group-by-check cannot be combined with --baseline")
+    configure(args)
+    status = args.run(args)
+    finish(args, f"cli {args.tool}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
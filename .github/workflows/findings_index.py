@@ -0,0 +1,348 @@
+import argparse
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import sys
+
+from markdown_table import write_table
+
+INDEX_ENV = "FINDINGS_INDEX"
+DEFAULT_INDEX = "findings.sqlite"
+# Findings inserted per executemany call; a scan is still committed as one transaction.
+BATCH_ROWS = 5000
+DEFAULT_LIMIT = 1000
+TRIVY_CHECK_PREFIX = "AVD-KSV-"
+
+logger = logging.getLogger("findings_index")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    scan_id INTEGER PRIMARY KEY,
+    cluster TEXT NOT NULL,
+    tool TEXT NOT NULL,
+    scanned_at TEXT NOT NULL,
+    source TEXT,
+    digest TEXT UNIQUE
+);
+CREATE TABLE IF NOT EXISTS findings (
+    scan_id INTEGER NOT NULL REFERENCES scans(scan_id) ON DELETE CASCADE,
+    check_id TEXT,
+    severity TEXT,
+    namespace TEXT,
+    kind TEXT,
+    name TEXT,
+    status TEXT
+);
+CREATE INDEX IF NOT EXISTS scans_by_cluster ON scans (cluster, scanned_at);
+CREATE INDEX IF NOT EXISTS findings_by_scan ON findings (scan_id);
+CREATE INDEX IF NOT EXISTS findings_by_check ON findings (check_id, status, namespace);
+CREATE INDEX IF NOT EXISTS findings_by_namespace ON findings (namespace, status);
+"""
+
+# Columns --group-by can aggregate findings on.
+GROUP_COLUMNS = {
+    "namespace": ("f.namespace", "Namespace"),
+    "check": ("f.check_id", "Check"),
+    "severity": ("f.severity", "Severity"),
+    "kind": ("f.kind", "Kind"),
+    "cluster": ("s.cluster", "Cluster"),
+    "scan": ("s.scanned_at || ' ' || s.cluster", "Scan"),
+}
+FINDING_HEADERS = ["Scanned At", "Cluster", "Tool", "Check", "Severity", "Namespace", "Kind", "Name", "Status"]
+SCAN_HEADERS = ["Scan ID", "Scanned At", "Cluster", "Tool", "Findings", "Source"]
+
+
+def utc_timestamp(seconds=None):
+    """Formats a POSIX time (default: now) as a sortable ISO 8601 UTC timestamp."""
+    moment = datetime.datetime.fromtimestamp(seconds, datetime.timezone.utc) if seconds is not None \
+        else datetime.datetime.now(datetime.timezone.utc)
+    return moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def kubescape_rows(report):
+    """
+    Yields one index row per control evaluated against each resource of a normalized report.
+
+    Returns:
+        iterable: (check_id, severity, namespace, kind, name, status) tuples.
+    """
+    for result in report.results or ():
+        # Severity is reported per failed control; passed controls fall back to the resource's.
+        severities = {control.control_name: control.severity for control in result.failed_controls}
+        for control in result.controls:
+            yield (control.control_id, severities.get(control.name, result.severity), result.namespace,
+                   result.kind, result.name, control.status)
+
+
+def trivy_row(finding):
+    """Returns the index row of a TrivyFinding."""
+    kind, _, name = finding.resource.rpartition("/")
+    check_id = finding.avd_id if not finding.avd_id.isdigit() else TRIVY_CHECK_PREFIX + finding.avd_id
+    return (check_id, finding.severity, finding.namespace, kind or None, name, "failed")
+
+
+class ScanWriter:
+    """Adds the findings of one scan to the index in batches; commits them all on close."""
+
+    def __init__(self, connection, scan_id):
+        self.connection = connection
+        self.scan_id = scan_id
+        self.count = 0
+        self._batch = []
+
+    def add(self, row):
+        self._batch.append((self.scan_id,) + tuple(row))
+        if len(self._batch) >= BATCH_ROWS:
+            self._flush()
+
+    def extend(self, rows):
+        for row in rows:
+            self.add(row)
+
+    def _flush(self):
+        self.connection.executemany("INSERT INTO findings VALUES (?, ?, ?, ?, ?, ?, ?)", self._batch)
+        self.count += len(self._batch)
+        self._batch = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self._flush()
+            self.connection.commit()
+        else:
+            self.connection.rollback()
+
+
+class FindingsIndex:
+    """
+    SQLite store of normalized Kubescape and Trivy findings across scans.
+
+    Every scan is one row in scans (cluster, tool, time, source file and its digest)
+    and its findings reference it. Ingesting a file whose digest is already indexed
+    is a no-op, so archives can be re-ingested safely.
+    """
+
+    def __init__(self, path=DEFAULT_INDEX):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def begin_scan(self, cluster, tool, scanned_at=None, source=None, digest=None):
+        """
+        Registers a scan and returns a ScanWriter for its findings.
+
+        Returns:
+            ScanWriter: Use as a context manager; None if a scan with this digest is already indexed.
+        """
+        try:
+            cursor = self.connection.execute(
+                "INSERT INTO scans (cluster, tool, scanned_at, source, digest) VALUES (?, ?, ?, ?, ?)",
+                (cluster, tool, scanned_at or utc_timestamp(), source, digest))
+        except sqlite3.IntegrityError:
+            self.connection.rollback()
+            return None
+        return ScanWriter(self.connection, cursor.lastrowid)
+
+    def ingest_file(self, path, cluster, scanned_at=None):
+        """
+        Indexes a Kubescape JSON report or a Trivy text or JSON report.
+
+        Args:
+            path (str): The report file.
+            cluster (str): Cluster the report belongs to.
+            scanned_at (str): ISO 8601 UTC time of the scan; defaults to the file's mtime.
+
+        Returns:
+            int: The number of findings indexed, or None if the file was indexed before.
+        """
+        # Imported here so the report scripts can offer --index without loading every parser.
+        from batch_report import KUBESCAPE, detect_tool
+        from kubescape_findings import load_report
+        from report_cache import file_digest
+        from scripts.trivy_summary import iter_findings
+
+        tool = detect_tool(path)
+        scan = self.begin_scan(cluster, tool, scanned_at or utc_timestamp(os.path.getmtime(path)),
+                               os.path.abspath(path), file_digest(path))
+        if scan is None:
+            return None
+        with scan:
+            if tool == KUBESCAPE:
+                scan.extend(kubescape_rows(load_report(path)))
+            else:
+                with open(path, 'r') as f:
+                    scan.extend(trivy_row(finding) for finding in iter_findings(f))
+        return scan.count
+
+    def _scope(self, cluster=None, tool=None, last=None):
+        # SQL condition and parameters restricting scans, used by both queries.
+        conditions, params = [], []
+        if cluster:
+            conditions.append("s.cluster = ?")
+            params.append(cluster)
+        if tool:
+            conditions.append("s.tool = ?")
+            params.append(tool)
+        if last:
+            inner = " AND ".join(c.replace("s.", "") for c in conditions) or "1"
+            conditions.append(f"s.scan_id IN (SELECT scan_id FROM scans WHERE {inner} ORDER BY scanned_at DESC LIMIT ?)")
+            params = params + params + [last]
+        return conditions, params
+
+    def query_findings(self, group_by=None, check=None, namespace=None, severity=None, status="failed",
+                       cluster=None, tool=None, last=None, limit=DEFAULT_LIMIT):
+        """
+        Looks up indexed findings.
+
+        Args:
+            group_by (str): A key of GROUP_COLUMNS to aggregate on, or None for individual findings.
+            check (str): Control or AVD id, e.g. C-0017 or AVD-KSV-0017.
+            namespace, severity, status (str): Optional filters; status defaults to "failed".
+            cluster, tool (str): Only scans of this cluster / tool.
+            last (int): Only the most recent scans, after the cluster and tool filters.
+            limit (int): Maximum number of rows.
+
+        Returns:
+            tuple: (headers, rows) ready for markdown_table.write_table.
+        """
+        conditions, params = self._scope(cluster, tool, last)
+        for column, value in (("f.check_id", check), ("f.namespace", namespace), ("f.status", status)):
+            if value:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if severity:
+            conditions.append("UPPER(f.severity) = ?")
+            params.append(severity.upper())
+        where = " AND ".join(conditions) or "1"
+        if group_by:
+            column, title = GROUP_COLUMNS[group_by]
+            sql = (f"SELECT {column} AS key, COUNT(DISTINCT s.scan_id), COUNT(*), MIN(s.scanned_at), MAX(s.scanned_at) "
+                   f"FROM findings f JOIN scans s USING (scan_id) WHERE {where} "
+                   f"GROUP BY key ORDER BY COUNT(*) DESC, key LIMIT ?")
+            headers = [title, "Scans", "Findings", "First Seen", "Last Seen"]
+        else:
+            sql = ("SELECT s.scanned_at, s.cluster, s.tool, f.check_id, f.severity, f.namespace, f.kind, f.name, f.status "
+                   f"FROM findings f JOIN scans s USING (scan_id) WHERE {where} "
+                   "ORDER BY s.scanned_at DESC, f.namespace, f.check_id LIMIT ?")
+            headers = FINDING_HEADERS
+        rows = self.connection.execute(sql, params + [limit]).fetchall()
+        return headers, [["N/A" if value is None else value for value in row] for row in rows]
+
+    def query_scans(self, cluster=None, tool=None, last=None, limit=DEFAULT_LIMIT):
+        """Lists the indexed scans, newest first, with their finding counts."""
+        conditions, params = self._scope(cluster, tool, last)
+        where = " AND ".join(conditions) or "1"
+        rows = self.connection.execute(
+            "SELECT s.scan_id, s.scanned_at, s.cluster, s.tool, "
+            "(SELECT COUNT(*) FROM findings f WHERE f.scan_id = s.scan_id), s.source "
+            f"FROM scans s WHERE {where} ORDER BY s.scanned_at DESC LIMIT ?", params + [limit]).fetchall()
+        return SCAN_HEADERS, [["N/A" if value is None else value for value in row] for row in rows]
+
+
+def write_query(out, headers, rows):
+    """Writes query results as a Markdown table, or a note when nothing matched."""
+    if rows:
+        write_table(out, headers, rows)
+    else:
+        out.write("No matching findings.\n")
+
+
+def index_report(index_path, json_file, cluster=None):
+    """
+    Adds a report a script has just rendered to the index.
+
+    Kubescape reports are not parsed again: load_report returns the copy the script
+    already loaded.
+
+    Returns:
+        int: The number of findings indexed, or None if the file was indexed before or
+             could not be indexed; indexing never fails the rendering that preceded it.
+    """
+    cluster = cluster or os.path.splitext(os.path.basename(json_file))[0]
+    try:
+        with FindingsIndex(index_path) as index:
+            count = index.ingest_file(json_file, cluster)
+    except (OSError, UnicodeDecodeError, json.JSONDecodeError, sqlite3.Error) as e:
+        logger.warning("Could not index %s in %s: %s", json_file, index_path, e)
+        return None
+    if count is None:
+        logger.info("%s is already in %s", json_file, index_path)
+    else:
+        logger.info("Indexed %d findings of %s in %s", count, json_file, index_path)
+    return count
+
+
+def add_index_argument(parser):
+    """Adds the --index option the report scripts use to ingest what they parsed."""
+    parser.add_argument("--index", default=os.environ.get(INDEX_ENV),
+                        help=f"Also add the findings to this SQLite index (default: ${INDEX_ENV}, off if unset)")
+    parser.add_argument("--cluster", help="Cluster name recorded in the index (default: the input file name)")
+
+
+if __name__ == "__main__":
+    from batch_report import KUBESCAPE, TRIVY, cluster_names, expand_inputs
+
+    parser = argparse.ArgumentParser(description="Index Kubescape and Trivy findings in SQLite and query them across scans.")
+    parser.add_argument("--index", default=os.environ.get(INDEX_ENV, DEFAULT_INDEX),
+                        help=f"SQLite index file (default: ${INDEX_ENV} or {DEFAULT_INDEX})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", help="Add report files to the index")
+    ingest.add_argument("inputs", nargs="+", help="Report files, directories or glob patterns")
+    ingest.add_argument("--cluster", help="Cluster of every input (default: derived from each file name)")
+    ingest.add_argument("--scanned-at", help="ISO 8601 UTC scan time (default: each file's modification time)")
+
+    query = commands.add_parser("query", help="Render indexed findings as a Markdown table")
+    query.add_argument("--group-by", choices=list(GROUP_COLUMNS), help="Aggregate instead of listing findings")
+    query.add_argument("--check", help="Control or AVD id, e.g. C-0017 or AVD-KSV-0017")
+    query.add_argument("--namespace")
+    query.add_argument("--severity")
+    query.add_argument("--status", default="failed", help="Finding status (default: failed; 'any' for all)")
+    query.add_argument("--cluster")
+    query.add_argument("--tool", choices=[KUBESCAPE, TRIVY])
+    query.add_argument("--last", type=int, help="Only the N most recent matching scans")
+    query.add_argument("--limit", type=int, default=DEFAULT_LIMIT)
+
+    scans = commands.add_parser("scans", help="List the indexed scans")
+    scans.add_argument("--cluster")
+    scans.add_argument("--tool", choices=[KUBESCAPE, TRIVY])
+    scans.add_argument("--last", type=int)
+    scans.add_argument("--limit", type=int, default=DEFAULT_LIMIT)
+    args = parser.parse_args()
+
+    with FindingsIndex(args.index) as index:
+        if args.command == "ingest":
+            paths = expand_inputs(args.inputs)
+            if not paths:
+                print("No reports found.", file=sys.stderr)
+                sys.exit(1)
+            names = [args.cluster] * len(paths) if args.cluster else cluster_names(paths)
+            for path, cluster in zip(paths, names):
+                try:
+                    count = index.ingest_file(path, cluster, args.scanned_at)
+                except (OSError, UnicodeDecodeError, json.JSONDecodeError) as e:
+                    print(f"Error: Could not read or parse {path}: {e}", file=sys.stderr)
+                    continue
+                print(f"{path}: " + ("already indexed" if count is None else f"{count} findings indexed"))
+        elif args.command == "query":
+            status = None if args.status == "any" else args.status
+            write_query(sys.stdout, *index.query_findings(args.group_by, args.check, args.namespace, args.severity, status,
+                                                          args.cluster, args.tool, args.last, args.limit))
+        else:
+            write_query(sys.stdout, *index.query_scans(args.cluster, args.tool, args.last, args.limit))
@@ -1,39 +1,57 @@
+import argparse
 import json
-from fpdf import FPDF
-import sys
+import os
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from fpdf import FPDF, FPDF_VERSION
 
-def generate_pdf(json_file, pdf_file):
+from kubescape_findings import iter_sections, load_report, na
+from parallel_jobs import default_jobs
+from report_cache import CACHE_DIR_ENV
+from report_metrics import add_arguments, configure, finish, metrics
+
+
+def _write_pdf(pdf, pdf_file):
+    with metrics.stage("write"):
+        pdf.output(pdf_file, "F")
+    metrics.count("pages", pdf.page)
+    metrics.count("bytes_written", os.path.getsize(pdf_file))
+
+
+def generate_pdf(json_file, pdf_file, cache_dir=None):
     pdf = FPDF()
     pdf.add_page()
     pdf.set_font("Arial", size=10)
 
     try:
-        with open(json_file, 'r') as f:
-            data = json.load(f)
+        results = load_report(json_file, cache_dir).results
 
         pdf.cell(200, 10, txt="Kubescape Scan Report", ln=1, align="C")
         pdf.ln(5)
 
-        if 'results' in data:
-            for result in data['results']:
-                resource_info = f"Resource: {result.get('kind', 'N/A')} - {result.get('name', 'N/A')} (Namespace: {result.get('namespace', 'N/A')})"
-                pdf.cell(200, 10, txt=resource_info, ln=1)
-
-                if 'failedControlsDetails' in result and result['failedControlsDetails']:
-                    pdf.cell(200, 10, txt="  Failed Controls:", ln=1)
-                    for control in result['failedControlsDetails']:
-                        pdf.cell(200, 8, txt=f"    - Severity: {control.get('severity', 'N/A')}", ln=1)
-                        pdf.cell(200, 8, txt=f"      Control Name: {control.get('controlName', 'N/A')}", ln=1)
-                        pdf.cell(200, 8, txt=f"      Docs: {control.get('docsUrl', 'N/A')}", ln=1)
-                        pdf.cell(200, 8, txt=f"      Remediation: {control.get('remediation', 'N/A')}", ln=1)
-                        pdf.ln(2)
-                else:
-                    pdf.cell(200, 8, txt="  No failed controls for this resource.", ln=1)
-                pdf.ln(5)
+        if results is not None:
+            with metrics.stage("render"):
+                for result in results:
+                    resource_info = f"Resource: {na(result.kind)} - {na(result.name)} (Namespace: {na(result.namespace)})"
+                    pdf.cell(200, 10, txt=resource_info, ln=1)
+
+                    if result.failed_controls:
+                        pdf.cell(200, 10, txt="  Failed Controls:", ln=1)
+                        for control in result.failed_controls:
+                            pdf.cell(200, 8, txt=f"    - Severity: {na(control.severity)}", ln=1)
+                            pdf.cell(200, 8, txt=f"      Control Name: {na(control.control_name)}", ln=1)
+                            pdf.cell(200, 8, txt=f"      Docs: {na(control.docs_url)}", ln=1)
+                            pdf.cell(200, 8, txt=f"      Remediation: {na(control.remediation)}", ln=1)
+                            pdf.ln(2)
+                    else:
+                        pdf.cell(200, 8, txt="  No failed controls for this resource.", ln=1)
+                    pdf.ln(5)
+            metrics.count("resources", len(results))
         else:
             pdf.cell(200, 10, txt="No scan results found in JSON.", ln=1)
 
-        pdf.output(pdf_file, "F")
+        _write_pdf(pdf, pdf_file)
 
     except FileNotFoundError:
         pdf.cell(200, 10, txt=f"Error: JSON file '{json_file}' not found.", ln=1)
@@ -45,10 +63,439 @@ def generate_pdf(json_file, pdf_file):
         pdf.cell(200, 10, txt=f"An error occurred: {e}", ln=1)
         pdf.output(pdf_file, "F")
 
+# Scalable table layout: (header, width in mm) per column; widths fill an A4 page
+# between the default 10 mm margins.
+TABLE_COLUMNS = [("Severity", 16), ("Control", 52), ("Resource", 56), ("Namespace", 28), ("Remediation", 28), ("Docs", 10)]
+ROW_HEIGHT = 5
+# Table rows rendered per worker task.
+DEFAULT_CHUNK_ROWS = 5000
+PAGE_NUMBER_ALIAS = "{pg}"
+PAGE_COUNT_ALIAS = "{nb}"
+# Stands in for the totals on the first page until every row has been read.
+TOTALS_ALIAS = "{totals}"
+
+
+def _latin1(text):
+    # The core PDF fonts only cover Latin-1.
+    return str(text).encode("latin-1", "replace").decode("latin-1")
+
+
+def _fit(pdf, text, width):
+    """Truncates text with an ellipsis so it fits a column of the given width."""
+    text = _latin1(text)
+    width -= 2 * pdf.c_margin
+    if pdf.get_string_width(text) <= width:
+        return text
+    while text and pdf.get_string_width(text + "...") > width:
+        # Drop characters in proportion to the overflow rather than one at a time.
+        overflow = pdf.get_string_width(text + "...") - width
+        text = text[:-max(1, int(len(text) * overflow / max(pdf.get_string_width(text), 1)))]
+    return text + "..."
+
+
+class _PDFBuffer:
+    """
+    Drop-in for FPDF's str output buffer that appends to a temporary file.
+
+    FPDF builds the document with buffer += line, which copies everything written so
+    far on each line and makes output() quadratic in the page count; it also keeps the
+    whole document in memory until it is written.
+    """
+
+    def __init__(self):
+        self.file = tempfile.TemporaryFile()
+        self.length = 0
+
+    def __iadd__(self, text):
+        self.file.write(text.encode("latin-1"))
+        self.length += len(text)
+        return self
+
+    def __len__(self):
+        return self.length
+
+    def copy_to(self, f):
+        self.file.seek(0)
+        while True:
+            data = self.file.read(1024 * 1024)
+            if not data:
+                break
+            f.write(data)
+
+    def close(self):
+        self.file.close()
+
+
+class _PageSpool:
+    """
+    Drop-in for FPDF's pages dict that keeps only the page being written in memory.
+
+    A page is appended to a temporary file as soon as another one is started, together
+    with its links (see _SpooledLinks), and read back one page at a time when the
+    document is output. Once the page count is set, the page number placeholders are
+    filled in as pages are read, so numbering does not rewrite every page.
+    """
+
+    def __init__(self):
+        self.file = tempfile.TemporaryFile()
+        self.spilled = {}  # page -> (offset, content bytes, links bytes)
+        self.page = None   # the page in memory, with its content and links
+        self.content = ""
+        self.page_links = []
+        self.count = None
+
+    def _spill(self):
+        if self.page is None:
+            return
+        content = self.content.encode("latin-1")
+        links = json.dumps(self.page_links).encode("ascii") if self.page_links else b""
+        self.file.seek(0, os.SEEK_END)
+        self.spilled[self.page] = (self.file.tell(), len(content), len(links))
+        self.file.write(content + links)
+        self.page, self.content, self.page_links = None, "", []
+
+    def read(self, page):
+        """Returns (content, links) of a page as it was written."""
+        if page == self.page:
+            return self.content, self.page_links
+        offset, content_length, links_length = self.spilled[page]
+        self.file.seek(offset)
+        data = self.file.read(content_length + links_length)
+        links = json.loads(data[content_length:]) if links_length else []
+        return data[:content_length].decode("latin-1"), links
+
+    def add(self, page, content, links):
+        """Appends a finished page, e.g. one rendered by render_table_pages."""
+        self._spill()
+        self.page, self.content, self.page_links = page, content, list(links)
+        self._spill()
+
+    def __contains__(self, page):
+        return page == self.page or page in self.spilled
+
+    def __getitem__(self, page):
+        content = self.read(page)[0]
+        if self.count is not None:
+            content = content.replace(PAGE_NUMBER_ALIAS, str(page)).replace(PAGE_COUNT_ALIAS, str(self.count))
+        return content
+
+    def __setitem__(self, page, content):
+        if page != self.page:
+            # A page written earlier is rewritten at the end of the file.
+            links = self.read(page)[1] if page in self.spilled else []
+            self._spill()
+            self.page, self.page_links = page, links
+        self.content = content
+
+    def close(self):
+        self.file.close()
+
+
+class _SpooledLinks:
+    """Drop-in for FPDF's page_links dict over the links kept by a _PageSpool."""
+
+    def __init__(self, spool):
+        self.spool = spool
+
+    def __contains__(self, page):
+        return page in self.spool and bool(self.spool.read(page)[1])
+
+    def __getitem__(self, page):
+        if page not in self.spool:
+            raise KeyError(page)
+        return self.spool.read(page)[1]
+
+    def __setitem__(self, page, links):
+        if page != self.spool.page:
+            self.spool[page] = self.spool.read(page)[0]
+        self.spool.page_links = links
+
+    def get(self, page, default=None):
+        return self[page] if page in self else default
+
+
+class TablePDF(FPDF):
+    """
+    FPDF document with a repeating table header and a page-numbered footer.
+
+    Pages and output are spooled to temporary files (see _PageSpool), which relies on
+    the internals of PyFPDF 1.7, pinned in requirements.txt; fpdf2 is a different library
+    under the same import name.
+    """
+
+    def __init__(self):
+        if not FPDF_VERSION.startswith("1.7."):
+            raise RuntimeError(f"TablePDF needs PyFPDF 1.7 (pip install 'fpdf==1.7.*'), found fpdf {FPDF_VERSION}")
+        super().__init__()
+        self.buffer = _PDFBuffer()
+        self.pages = _PageSpool()
+        self.page_links = _SpooledLinks(self.pages)
+        # Cells repeat the same severities, control names and namespaces; each is fitted once.
+        self._fitted = {}
+
+    def output(self, name, dest="F"):
+        """Closes the document and writes it to the file name."""
+        if self.state < 3:
+            self.close()
+        with open(name, "wb") as f:
+            self.buffer.copy_to(f)
+        self.discard()
+
+    def register_fonts(self):
+        # Fonts are registered in a fixed order so page content rendered by one
+        # TablePDF refers to the same font resources (/F1, /F2) in any other.
+        self.set_font("Arial", "B", 8)
+        self.set_font("Arial", "", 8)
+
+    def header(self):
+        if not getattr(self, "table_started", False):
+            return
+        self.set_font("Arial", "B", 8)
+        self.set_fill_color(230, 230, 230)
+        for title, width in TABLE_COLUMNS:
+            self.cell(width, ROW_HEIGHT + 1, txt=title, border=1, ln=0, fill=1)
+        self.ln()
+        self.set_font("Arial", "", 8)
+
+    def footer(self):
+        if getattr(self, "finished_page", 0) == self.page:
+            return
+        self.set_y(-12)
+        self.set_font("Arial", "", 8)
+        self.cell(0, 8, txt=f"Page {PAGE_NUMBER_ALIAS} of {PAGE_COUNT_ALIAS}", ln=0, align="C")
+
+    def start_table(self):
+        self.table_started = True
+        self.add_page()
+
+    def add_row(self, row):
+        docs_url = row[-1]
+        for (_, width), value in zip(TABLE_COLUMNS[:-1], row[:-1]):
+            text = self._fitted.get((value, width))
+            if text is None:
+                text = self._fitted[value, width] = _fit(self, value, width)
+            self.cell(width, ROW_HEIGHT, txt=text, border=1, ln=0)
+        self.cell(TABLE_COLUMNS[-1][1], ROW_HEIGHT, txt="link" if docs_url else "", border=1, ln=1,
+                  link=docs_url if docs_url else "")
+
+    def finish_page(self):
+        """Runs the footer of the current page without closing the document."""
+        self.in_footer = 1
+        self.footer()
+        self.in_footer = 0
+        self.finished_page = self.page
+
+    def discard(self):
+        """Deletes the temporary files of a document that will not be output."""
+        self.buffer.close()
+        self.pages.close()
+
+    def number_pages(self):
+        """Fills in the page number and page count placeholders of every page; call before output."""
+        self.pages.count = self.page
+
+
+def table_rows(results):
+    """Yields one table row per failed control, and one per resource without failures."""
+    for result in results:
+        resource = f"{na(result.kind)}/{na(result.name)}"
+        namespace = na(result.namespace)
+        if result.failed_controls:
+            for control in result.failed_controls:
+                yield (na(control.severity), na(control.control_name), resource, namespace, na(control.remediation),
+                       control.docs_url or "")
+        else:
+            yield ("-", "No failed controls", resource, namespace, "", "")
+
+
+def render_table_pages(rows):
+    """
+    Lays out a chunk of table rows on fresh pages; runs in a worker process.
+
+    Args:
+        rows (list): Rows as produced by table_rows.
+
+    Returns:
+        list: (content, links) per page, ready to be spliced into another TablePDF.
+    """
+    pdf = TablePDF()
+    pdf.register_fonts()
+    pdf.start_table()
+    for row in rows:
+        pdf.add_row(row)
+    pdf.finish_page()
+    pages = [pdf.pages.read(n) for n in range(1, pdf.page + 1)]
+    pdf.discard()
+    return pages
+
+
+def _splice_pages(pdf, pages):
+    """Appends pages rendered by render_table_pages to pdf."""
+    for content, links in pages:
+        pdf.page += 1
+        pdf.pages.add(pdf.page, content, links)
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _render_chunks(chunks, jobs):
+    """
+    Yields the pages of each chunk of rows in order, rendered by jobs worker processes.
+
+    At most two chunks per worker are in flight, so the rows read ahead and the pages
+    waiting to be spliced stay bounded however long the report is.
+    """
+    jobs = jobs or default_jobs()
+    if jobs == 1:
+        yield from map(render_table_pages, chunks)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(render_table_pages, chunk))
+            if len(pending) >= 2 * jobs:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _counted(results, totals):
+    for result in results:
+        totals[0] += 1
+        totals[1] += len(result.failed_controls)
+        yield result
+
+
+def _title_page():
+    pdf = TablePDF()
+    pdf.register_fonts()
+    pdf.set_compression(True)
+    pdf.add_page()
+    pdf.set_font("Arial", "B", 12)
+    pdf.cell(0, 10, txt="Kubescape Scan Report", ln=1, align="C")
+    pdf.set_font("Arial", "", 9)
+    return pdf
+
+
+def _finish_pdf(pdf, pdf_file):
+    pdf.finish_page()
+    pdf.number_pages()
+    _write_pdf(pdf, pdf_file)
+    return pdf.page
+
+
+def report_sections(report):
+    """Returns the sections of a parsed KubescapeReport that write_table_pdf renders."""
+    return [] if report.results is None else [("results", report.results)]
+
+
+def write_table_pdf(sections, pdf_file, jobs=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Renders Kubescape results as a paginated table PDF, using several processes.
+
+    Failed controls are laid out one table row each, with the header repeated on every
+    page. Chunks of rows are rendered to page content in worker processes and the
+    pages are concatenated in order into one document, which is spooled to disk as it
+    grows: memory stays flat in the number of pages when the results are streamed.
+
+    Args:
+        sections (iterable): (section, records) pairs as yielded by
+                             kubescape_findings.iter_sections or report_sections; only
+                             the results are rendered.
+        pdf_file (str): Path of the PDF to write.
+        jobs (int): Worker processes; 1 renders in this process. Defaults to one per core.
+        chunk_rows (int): Table rows per worker task.
+
+    Returns:
+        int: The number of pages written.
+
+    Raises:
+        FileNotFoundError, json.JSONDecodeError: As raised by iter_sections; no PDF is written.
+    """
+    pdf = _title_page()
+    pdf.cell(0, 6, txt=TOTALS_ALIAS, ln=1)
+    pdf.finish_page()
+    totals = None
+    try:
+        for section, results in sections:
+            if section != "results":
+                continue
+            totals = [0, 0]
+            chunks = _chunks(table_rows(_counted(results, totals)), chunk_rows)
+            # With workers this is the time spent waiting for their pages.
+            with metrics.stage("render"):
+                for chunk_pages in _render_chunks(chunks, jobs):
+                    _splice_pages(pdf, chunk_pages)
+            # Every spliced page already has its footer.
+            pdf.finished_page = pdf.page
+    except BaseException:
+        pdf.discard()
+        raise
+
+    if totals is None:
+        text = "No scan results found in JSON."
+    else:
+        text = f"Resources: {totals[0]}    Failed controls: {totals[1]}"
+        metrics.count("resources", totals[0])
+    pdf.pages[1] = pdf.pages[1].replace(TOTALS_ALIAS, text, 1)
+    return _finish_pdf(pdf, pdf_file)
+
+
+def generate_pdf_tables(json_file, pdf_file, jobs=None, cache_dir=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Renders a Kubescape report as a paginated table PDF; see write_table_pdf.
+
+    The results are streamed from json_file unless cache_dir is given, in which case
+    the whole report is parsed (or loaded from the cache) first.
+
+    Args:
+        json_file (str): Path to the Kubescape JSON output file.
+        pdf_file (str): Path of the PDF to write.
+        jobs (int): Worker processes; 1 renders in this process.
+        cache_dir (str): Optional parsed-report cache directory (see report_cache.load_cached).
+        chunk_rows (int): Table rows per worker task.
+
+    Returns:
+        int: The number of pages written.
+    """
+    try:
+        if cache_dir:
+            sections = report_sections(load_report(json_file, cache_dir))
+        else:
+            sections = iter_sections(json_file, keys=("results",))
+        return write_table_pdf(sections, pdf_file, jobs, chunk_rows)
+    except FileNotFoundError:
+        message = f"Error: JSON file '{json_file}' not found."
+    except json.JSONDecodeError:
+        message = f"Error: Could not decode JSON from '{json_file}'."
+    pdf = _title_page()
+    pdf.cell(0, 8, txt=message, ln=1)
+    return _finish_pdf(pdf, pdf_file)
+
+
 if __name__ == "__main__":
-    if len(sys.argv) == 3:
-        json_input_file = sys.argv[1]
-        pdf_output_file = sys.argv[2]
-        generate_pdf(json_input_file, pdf_output_file)
+    parser = argparse.ArgumentParser(description="Render a Kubescape JSON report as a PDF.")
+    parser.add_argument("json_input_file", help="Path to the Kubescape results.json")
+    parser.add_argument("pdf_output_file", help="Path of the PDF to write")
+    parser.add_argument("--cache-dir", default=os.environ.get(CACHE_DIR_ENV),
+                        help=f"Reuse parsed reports from this directory (default: ${CACHE_DIR_ENV}, off if unset)")
+    parser.add_argument("--tables", action="store_true",
+                        help="Scalable layout: paginated tables rendered in parallel (see generate_pdf_tables)")
+    parser.add_argument("-j", "--jobs", type=int, help="Worker processes for --tables (default: one per core)")
+    add_arguments(parser)
+    args = parser.parse_args()
+    configure(args)
+    if args.tables:
+        generate_pdf_tables(args.json_input_file, args.pdf_output_file, args.jobs, args.cache_dir)
     else:
-        print("Usage: python generate_pdf_report.py <input_json_file> <output_pdf_file>")
\ No newline at end of file
+        generate_pdf(args.json_input_file, args.pdf_output_file, args.cache_dir)
+    finish(args, "generate_pdf_report")
@@ -0,0 +1,161 @@
+import json
+from collections.abc import Iterator
+
+CHUNK_SIZE = 1 << 16
+_WHITESPACE = " \t\n\r"
+_DECODER = json.JSONDecoder()
+# Checks a value for well-formedness without keeping it: each object is dropped as soon
+# as it is decoded, so memory stays proportional to the value's nesting, not its size.
+_SKIP_DECODER = json.JSONDecoder(object_pairs_hook=lambda pairs: None)
+# Key of an iter_members objects spec that applies to every member not named in it.
+ANY_KEY = None
+
+
+class _Reader:
+    """Buffered cursor over a text file that decodes one JSON value at a time."""
+
+    def __init__(self, fp, chunk_size=CHUNK_SIZE, prefix=""):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buf = prefix
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size):
+        data = self.fp.read(size)
+        if not data:
+            self.eof = True
+            return False
+        # Drop everything already consumed so the buffer never outgrows one value.
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Skips whitespace and returns the next character, or '' at the end of the input."""
+        while True:
+            buf, pos = self.buf, self.pos
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < len(buf):
+                return buf[pos]
+            if not self._fill(self.chunk_size):
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise json.JSONDecodeError(f"Expecting '{char}'", self.buf, self.pos)
+        self.pos += 1
+
+    def value(self, decoder=_DECODER):
+        """Decodes the next complete JSON value, reading more input until it is whole."""
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buf, self.pos)
+                # A number that ends exactly at the buffer end may continue in the next chunk.
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill(size)
+            size *= 2
+
+
+def _iter_array(reader, decoder=_DECODER):
+    reader.expect("[")
+    if reader.peek() == "]":
+        reader.pos += 1
+        return
+    while True:
+        yield reader.value(decoder)
+        if reader.peek() == ",":
+            reader.pos += 1
+        else:
+            reader.expect("]")
+            return
+
+
+def _skip_value(reader):
+    # Checks the next value for well-formedness without building it. Arrays and objects
+    # go element by element, so a skipped value is never buffered whole.
+    char = reader.peek()
+    if char == "[":
+        for _ in _iter_array(reader, _SKIP_DECODER):
+            pass
+    elif char == "{":
+        for _ in _iter_object(reader, only=()):
+            pass
+    else:
+        reader.value(_SKIP_DECODER)
+
+
+def _iter_object(reader, stream_keys=frozenset(), only=None, objects=None):
+    reader.expect("{")
+    if reader.peek() == "}":
+        reader.pos += 1
+        return
+    while True:
+        key = reader.value()
+        reader.expect(":")
+        spec = objects.get(key, objects.get(ANY_KEY)) if objects else None
+        if only is not None and key not in only:
+            _skip_value(reader)
+        elif spec is not None and reader.peek() == "{":
+            if isinstance(spec, dict):
+                members = _iter_object(reader, objects=spec)
+                yield key, members
+                for _ in members:
+                    pass
+            else:
+                yield key, dict(_iter_object(reader, only=spec))
+        elif key in stream_keys and reader.peek() == "[":
+            elements = _iter_array(reader)
+            yield key, elements
+            for _ in elements:
+                pass
+        else:
+            yield key, reader.value()
+        if reader.peek() == ",":
+            reader.pos += 1
+        else:
+            reader.expect("}")
+            return
+
+
+def iter_members(fp, stream_keys=(), chunk_size=CHUNK_SIZE, prefix="", only=None, objects=None):
+    """
+    Iterates over the members of the top-level JSON object in a file without loading it whole.
+
+    Args:
+        fp (file): Text file positioned at the start of a JSON object.
+        stream_keys (iterable): Keys whose array values should be streamed element by element.
+        chunk_size (int): Number of characters read from fp at a time.
+        prefix (str): Input already read from fp, e.g. while sniffing its format.
+        only (iterable): If given, the keys to yield; other members are only checked for
+                         well-formedness, without building their values.
+        objects (dict): Keys whose object values should be streamed member by member, each
+                        mapped to how to read those members: a dict of the same form, with
+                        ANY_KEY matching every member, or a set of the member keys to decode,
+                        the others being skipped like those left out of only.
+
+    Yields:
+        tuple: (key, value). For a key in stream_keys whose value is an array, value is an
+               iterator over the decoded elements; for a key in objects mapped to a dict, an
+               iterator over the (key, value) members. Either is drained automatically if the
+               caller moves on before exhausting it. Every other value is fully decoded.
+
+    Raises:
+        json.JSONDecodeError: If the input is not a well-formed JSON object.
+    """
+    yield from _iter_object(_Reader(fp, chunk_size, prefix), frozenset(stream_keys),
+                            frozenset(only) if only is not None else None, objects)
+
+
+def is_stream(value):
+    """Returns True if value is a streamed array or object produced by iter_members."""
+    return isinstance(value, Iterator)
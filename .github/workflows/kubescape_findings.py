@@ -0,0 +1,514 @@
+import itertools
+import logging
+import os
+import sys
+from collections import namedtuple
+
+from json_stream import ANY_KEY, is_stream, iter_members
+from report_cache import load_cached
+from report_metrics import metrics
+
+# Top-level arrays that can hold one entry per resource and are therefore streamed.
+STREAM_KEYS = ("resources", "results", "controlReports")
+# summaryDetails.controls lists, per control, every failing resource's fix path; it grows
+# with the cluster like the arrays above. iter_sections streams it a control at a time
+# and leaves those lists and the exceptions out.
+SUMMARY_CONTROL_FIELDS = frozenset(["name", "controlName", "statusInfo", "complianceScore", "category"])
+STREAM_OBJECTS = {"summaryDetails": {"controls": {ANY_KEY: SUMMARY_CONTROL_FIELDS}}}
+
+logger = logging.getLogger("kubescape_findings")
+
+
+def na(value):
+    """Returns value, or "N/A" for a field that was missing from the report."""
+    return "N/A" if value is None else value
+
+
+def _intern(value):
+    # Control IDs, severities, namespaces, kinds and the like repeat across thousands of
+    # records; interning keeps a single copy of each.
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class _Record:
+    """
+    Base for the compact report records: fixed fields, no per-instance __dict__.
+
+    Records are built by the hundred thousand, so each type spells out an __init__
+    assigning its fields by name; that runs about three times faster than a generic
+    setattr loop over __slots__.
+    """
+
+    __slots__ = ()
+
+    def _values(self):
+        return tuple(getattr(self, field) for field in self.__slots__)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self._values() == other._values()
+
+    def __repr__(self):
+        fields = ", ".join(f"{field}={getattr(self, field)!r}" for field in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class FixPath(_Record):
+    __slots__ = ("resource_id", "path", "value")
+
+    def __init__(self, resource_id, path, value):
+        self.resource_id = resource_id
+        self.path = path
+        self.value = value
+
+
+class ControlException(_Record):
+    __slots__ = ("guid", "name", "system_exception", "policy_type")
+
+    def __init__(self, guid, name, system_exception, policy_type):
+        self.guid = guid
+        self.name = name
+        self.system_exception = system_exception
+        self.policy_type = policy_type
+
+
+class Control(_Record):
+    """An entry of summaryDetails.controls."""
+
+    __slots__ = ("control_id", "name", "control_name", "status", "compliance_score", "category", "fix_paths", "exceptions")
+
+    def __init__(self, control_id, name, control_name, status, compliance_score, category, fix_paths, exceptions):
+        self.control_id = control_id
+        self.name = name
+        self.control_name = control_name
+        self.status = status
+        self.compliance_score = compliance_score
+        self.category = category
+        self.fix_paths = fix_paths
+        self.exceptions = exceptions
+
+
+class Resource(_Record):
+    """An entry of the resources array."""
+
+    __slots__ = ("resource_id", "kind", "namespace", "name")
+
+    def __init__(self, resource_id, kind, namespace, name):
+        self.resource_id = resource_id
+        self.kind = kind
+        self.namespace = namespace
+        self.name = name
+
+
+class Framework(_Record):
+    __slots__ = ("name", "status", "compliance_score")
+
+    def __init__(self, name, status, compliance_score):
+        self.name = name
+        self.status = status
+        self.compliance_score = compliance_score
+
+
+class ResultControl(_Record):
+    """A control evaluated against the resource of a Result."""
+
+    __slots__ = ("control_id", "name", "status", "message")
+
+    def __init__(self, control_id, name, status, message):
+        self.control_id = control_id
+        self.name = name
+        self.status = status
+        self.message = message
+
+
+class FailedControl(_Record):
+    """An entry of a result's failedControlsDetails."""
+
+    __slots__ = ("severity", "control_name", "docs_url", "remediation")
+
+    def __init__(self, severity, control_name, docs_url, remediation):
+        self.severity = severity
+        self.control_name = control_name
+        self.docs_url = docs_url
+        self.remediation = remediation
+
+
+class Result(_Record):
+    """An entry of the results array: one resource and the controls evaluated against it."""
+
+    __slots__ = ("resource_id", "kind", "namespace", "name", "severity", "category", "remediation", "controls", "failed_controls")
+
+    def __init__(self, resource_id, kind, namespace, name, severity, category, remediation, controls, failed_controls):
+        self.resource_id = resource_id
+        self.kind = kind
+        self.namespace = namespace
+        self.name = name
+        self.severity = severity
+        self.category = category
+        self.remediation = remediation
+        self.controls = controls
+        self.failed_controls = failed_controls
+
+
+class ControlReport(_Record):
+    __slots__ = ("control_id", "name", "failed_resources", "total_resources")
+
+    def __init__(self, control_id, name, failed_resources, total_resources):
+        self.control_id = control_id
+        self.name = name
+        self.failed_resources = failed_resources
+        self.total_resources = total_resources
+
+
+class KubescapeReport(_Record):
+    """
+    A Kubescape report normalized for rendering.
+
+    Each section is None when the report does not have it, so renderers can tell an
+    absent table from an empty one.
+    """
+
+    __slots__ = ("empty", "api_info", "controls", "resources", "frameworks", "results", "control_reports",
+                 "cluster_metadata", "scan_metadata")
+
+    def __init__(self):
+        self.empty = True
+        self.api_info = None
+        self.controls = None
+        self.resources = None
+        self.frameworks = None
+        self.results = None
+        self.control_reports = None
+        self.cluster_metadata = None
+        self.scan_metadata = None
+
+
+# Record types held in tuple fields of other records, and in the list sections of a
+# KubescapeReport; used to rebuild reports from the plain data of report_cache entries.
+_NESTED_RECORDS = {
+    Control: {"fix_paths": FixPath, "exceptions": ControlException},
+    Result: {"controls": ResultControl, "failed_controls": FailedControl},
+}
+_SECTION_RECORDS = {"controls": Control, "resources": Resource, "frameworks": Framework, "results": Result,
+                    "control_reports": ControlReport}
+
+
+def _columns(record_type, records):
+    # Records are stored a column per field, each as its distinct values and an index into
+    # them per record: the values repeat heavily, and rebuilding then interns each once.
+    nested = _NESTED_RECORDS.get(record_type, {})
+    columns = []
+    for field in record_type.__slots__:
+        values = [getattr(record, field) for record in records]
+        if field in nested:
+            columns.append([[len(value) for value in values], _columns(nested[field], [item for value in values for item in value])])
+            continue
+        distinct, indices, positions = [], [], {}
+        for value in values:
+            # Keyed on the type too, so that 1, 1.0 and True stay apart.
+            key = value if value.__class__ is str else (value.__class__, value)
+            try:
+                index = positions.setdefault(key, len(distinct))
+            except TypeError:  # A list or object where the report should have had a scalar.
+                index = len(distinct)
+            if index == len(distinct):
+                distinct.append(value)
+            indices.append(index)
+        columns.append([distinct, indices])
+    return columns
+
+
+def _records(record_type, columns):
+    nested = _NESTED_RECORDS.get(record_type, {})
+    if len(columns) != len(record_type.__slots__):
+        raise ValueError(f"Expected {len(record_type.__slots__)} {record_type.__name__} columns, got {len(columns)}")
+    fields = []
+    for field, column in zip(record_type.__slots__, columns):
+        if field in nested:
+            lengths, items = column
+            items = iter(_records(nested[field], items))
+            fields.append([tuple(itertools.islice(items, length)) for length in lengths])
+            if next(items, None) is not None:
+                raise ValueError(f"{record_type.__name__}.{field} holds more records than its lengths add up to")
+        else:
+            distinct, indices = column
+            distinct = [_intern(value) for value in distinct]
+            fields.append([distinct[index] for index in indices])
+    if len({len(values) for values in fields}) > 1:
+        raise ValueError(f"{record_type.__name__} columns differ in length")
+    return list(map(record_type, *fields))
+
+
+def report_to_data(report):
+    """Returns a KubescapeReport as plain JSON-serializable lists, for report_cache."""
+    return [_columns(_SECTION_RECORDS[field], value) if field in _SECTION_RECORDS and value is not None else value
+            for field, value in zip(report.__slots__, report._values())]
+
+
+def report_from_data(data):
+    """
+    Rebuilds a KubescapeReport from the data of report_to_data.
+
+    Raises:
+        ValueError, TypeError, IndexError: If data does not have the shape report_to_data gives.
+    """
+    report = KubescapeReport()
+    if len(data) != len(report.__slots__):
+        raise ValueError(f"Expected {len(report.__slots__)} report fields, got {len(data)}")
+    for field, value in zip(report.__slots__, data):
+        if field in _SECTION_RECORDS and value is not None:
+            value = _records(_SECTION_RECORDS[field], value)
+        setattr(report, field, value)
+    return report
+
+
+# One row of the Results table: a control evaluated against one resource.
+ControlResult = namedtuple(
+    "ControlResult",
+    ["resource_id", "control_id", "control_name", "status", "message", "severity", "category", "remediation", "namespace", "name"],
+)
+
+
+def iter_control_results(results):
+    """Flattens Result records into one ControlResult per (resource, control) pair."""
+    for result in results:
+        for control in result.controls:
+            yield ControlResult(result.resource_id, control.control_id, control.name, control.status, control.message,
+                                result.severity, result.category, result.remediation, result.namespace, result.name)
+
+
+def group_control_results(results):
+    """
+    Groups the ControlResult rows of Result records by everything but their resource.
+
+    Args:
+        results (iterable): Result records.
+
+    Returns:
+        dict: (control_id, control_name, status, message, severity, category, remediation),
+              in order of first appearance, to a dict of (namespace, kind) to the names of the
+              resources with that outcome. Only references to the interned strings are kept.
+    """
+    groups = {}
+    for result in results:
+        location = (result.namespace, result.kind)
+        name = na(result.name)
+        for control in result.controls:
+            key = (control.control_id, control.name, control.status, control.message,
+                   result.severity, result.category, result.remediation)
+            resources = groups.get(key)
+            if resources is None:
+                resources = groups[key] = {}
+            names = resources.get(location)
+            if names is None:
+                names = resources[location] = []
+            names.append(name)
+    return groups
+
+
+def _control(control_id, control_data):
+    fix_paths = []
+    for result in control_data.get("results") or []:
+        if "fixPath" in result:
+            fix_path = result["fixPath"]
+            fix_paths.append(FixPath(_intern(result.get("resourceID")), fix_path.get("path"), fix_path.get("value")))
+    exceptions = []
+    for exception_data in control_data.get("exception") or []:
+        attributes = exception_data.get("attributes", {})
+        exceptions.append(ControlException(exception_data.get("guid"), _intern(exception_data.get("name")),
+                                           attributes.get("systemException"), _intern(exception_data.get("policyType"))))
+    return Control(
+        _intern(control_id),
+        _intern(control_data.get("name")),
+        _intern(control_data.get("controlName")),
+        _intern(control_data.get("statusInfo", {}).get("status")),
+        control_data.get("complianceScore"),
+        _intern((control_data.get("category") or {}).get("name")),
+        tuple(fix_paths),
+        tuple(exceptions),
+    )
+
+
+def _resources(resources):
+    for resource in resources:
+        if isinstance(resource, dict) and "object" in resource and isinstance(resource["object"], dict):
+            obj = resource["object"]
+            yield Resource(_intern(resource.get("resourceID")), _intern(obj.get("kind")),
+                           _intern(obj.get("namespace")), _intern(obj.get("name")))
+
+
+def _frameworks(frameworks):
+    for framework in frameworks:
+        if isinstance(framework, dict):
+            yield Framework(_intern(framework.get("name")), _intern(framework.get("status")), framework.get("complianceScore"))
+
+
+def _results(results):
+    skipped = 0
+    for result in results:
+        if not isinstance(result, dict):
+            logger.debug("Unexpected result item type: %s, skipping", type(result))
+            skipped += 1
+            continue
+        resource_id = result.get("resourceID")
+        controls_data = result.get("controls", [])
+        # Ensure controls_data is a list before iterating
+        if isinstance(controls_data, list):
+            controls = tuple(
+                ResultControl(
+                    _intern(control_data.get("controlID")),
+                    _intern(control_data.get("name") or control_data.get("controlName")),
+                    _intern(control_data.get("status", {}).get("status")),
+                    _intern(control_data.get("status", {}).get("info")),
+                )
+                for control_data in controls_data
+            )
+        else:
+            logger.debug("'controls' is not a list for resourceID: %s, skipping", na(resource_id))
+            skipped += 1
+            controls = ()
+        failed_controls = tuple(
+            FailedControl(_intern(control.get("severity")), _intern(control.get("controlName")),
+                          _intern(control.get("docsUrl")), _intern(control.get("remediation")))
+            for control in result.get("failedControlsDetails") or []
+        )
+        yield Result(
+            _intern(resource_id),
+            _intern(result.get("kind")),
+            _intern(result.get("namespace")),
+            _intern(result.get("name")),
+            _intern(result.get("severity")),
+            _intern(result.get("category")),
+            _intern(result.get("remediation")),
+            controls,
+            failed_controls,
+        )
+    if skipped:
+        # One line for the whole report; the individual items are logged at DEBUG.
+        logger.warning("Skipped %d malformed results entries", skipped)
+        metrics.count("skipped_results", skipped)
+
+
+def _control_reports(reports):
+    for report in reports:
+        yield ControlReport(_intern(report.get("controlID")), _intern(report.get("name")),
+                            report.get("failedResources"), report.get("totalResources"))
+
+
+def _normalize_member(key, value):
+    """Yields the (section, records) pairs a top-level report member contributes."""
+    if key == "clusterAPIServerInfo":
+        yield "api_info", value
+    elif key == "summaryDetails":
+        if is_stream(value):
+            for member, controls in value:
+                if member == "controls" and is_stream(controls):
+                    yield "controls", (_control(control_id, data) for control_id, data in controls)
+        elif "controls" in value:
+            yield "controls", [_control(control_id, data) for control_id, data in value["controls"].items()]
+    elif key == "resources" and (is_stream(value) or isinstance(value, list)):
+        yield "resources", _resources(value)
+    elif key == "frameworks" and isinstance(value, list):
+        yield "frameworks", _frameworks(value)
+    elif key == "results":
+        if is_stream(value) or isinstance(value, list):
+            yield "results", _results(value)
+        else:
+            logger.warning("Unexpected results type: %s, skipping", type(value))
+            yield "results", ()
+    elif key == "controlReports":
+        if is_stream(value) or isinstance(value, list):
+            yield "control_reports", _control_reports(value)
+        elif isinstance(value, dict):
+            yield "control_reports", _control_reports(dict(report, controlID=control_id) for control_id, report in value.items())
+    elif key == "metadata":
+        if "clusterMetadata" in value:
+            yield "cluster_metadata", value["clusterMetadata"]
+        if "scanMetadata" in value:
+            yield "scan_metadata", value["scanMetadata"]
+
+
+def iter_sections(json_file, keys=None):
+    """
+    Streams a Kubescape report as normalized sections, in file order.
+
+    The resources, results and controlReports arrays and the summary controls are
+    decoded one element at a time, so memory stays bounded as long as the caller does
+    not keep the records. The summary controls come without their fix paths and
+    exceptions (see STREAM_OBJECTS).
+
+    Args:
+        json_file (str): Path to the Kubescape JSON output file.
+        keys (iterable): Optional top-level report keys to read, e.g. ("results",);
+                         the other members are skipped without being decoded into objects.
+
+    Yields:
+        tuple: (section, records) where section is a KubescapeReport field name and
+               records is a dict for api_info and the metadata sections, and an
+               iterable of records (lazy for the streamed sections) otherwise.
+
+    Raises:
+        FileNotFoundError: If json_file does not exist.
+        json.JSONDecodeError: If json_file is not a valid JSON object.
+    """
+    with open(json_file, 'r') as f:
+        for key, value in iter_members(metrics.reader(f), STREAM_KEYS, only=keys, objects=STREAM_OBJECTS):
+            yield from _normalize_member(key, value)
+
+
+def parse_report(json_file):
+    """Reads and normalizes a Kubescape report in one streaming pass; see iter_sections."""
+    with open(json_file, 'r') as f:
+        return read_report(f)
+
+
+def read_report(fp):
+    """Normalizes a Kubescape report read from an open text file, e.g. a scanner's stdout; see parse_report."""
+    report = KubescapeReport()
+    with metrics.stage("parse"):
+        for key, value in iter_members(metrics.reader(fp), STREAM_KEYS):
+            report.empty = False
+            for section, records in _normalize_member(key, value):
+                if not isinstance(records, dict):
+                    records = list(records)
+                    metrics.count(f"records.{section}", len(records))
+                setattr(report, section, records)
+    return report
+
+
+_last_loaded = (None, None)
+
+
+def load_report(json_file, cache_dir=None):
+    """
+    Returns the normalized KubescapeReport for a file, parsing it at most once.
+
+    The last report loaded is kept for as long as the file is unchanged, so several
+    renderers in one process share a single parse; across processes the opt-in
+    report_cache does the same.
+
+    Args:
+        json_file (str): Path to the Kubescape JSON output file.
+        cache_dir (str): Optional parsed-report cache directory (see report_cache.load_cached).
+
+    Returns:
+        KubescapeReport: The normalized report.
+
+    Raises:
+        FileNotFoundError: If json_file does not exist.
+        json.JSONDecodeError: If json_file is not a valid JSON object.
+    """
+    global _last_loaded
+    stat = os.stat(json_file)
+    key = (os.path.abspath(json_file), stat.st_mtime_ns, stat.st_size)
+    if _last_loaded[0] == key:
+        metrics.count("report_reuses")
+        return _last_loaded[1]
+    report = load_cached(json_file, "report", parse_report, cache_dir, encode=report_to_data, decode=report_from_data)
+    _last_loaded = (key, report)
+    return report
+
+
+def clear_loaded():
+    """Forgets the report load_report kept, so the next call loads its file again, e.g. between benchmark runs."""
+    global _last_loaded
+    _last_loaded = (None, None)
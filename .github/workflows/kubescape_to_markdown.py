@@ -1,136 +1,183 @@
+import argparse
+import io
 import json
+import os
 import sys
-from tabulate import tabulate
 
-def convert_kubescape_json_to_markdown(json_file_path):
+from findings_index import add_index_argument, index_report
+from kubescape_findings import load_report, na
+from markdown_table import TableSpool, format_row, write_header, write_table
+from report_cache import CACHE_DIR_ENV
+from report_metrics import add_arguments, configure, finish, metrics
+
+API_INFO_FIELDS = [
+    ("Major Version", 'major'),
+    ("Minor Version", 'minor'),
+    ("Git Version", 'gitVersion'),
+    ("Git Commit", 'gitCommit'),
+    ("Git Tree State", 'gitTreeState'),
+    ("Build Date", 'buildDate'),
+    ("Go Version", 'goVersion'),
+    ("Compiler", 'compiler'),
+    ("Platform", 'platform'),
+]
+ATTRIBUTE_HEADERS = ["Attribute", "Value"]
+CONTROLS_HEADERS = ["Control ID", "Name", "Status", "Compliance Score", "Category"]
+FIX_PATH_HEADERS = ["Control ID", "Resource ID", "Fix Path", "Value"]
+EXCEPTION_HEADERS = ["Control ID", "GUID", "Exception Name", "System Exception", "Policy Type"]
+
+
+def _write_section(out, title, headers, rows):
+    out.write(f"## {title}\n")
+    write_table(out, headers, rows)
+    out.write("\n")
+
+
+def write_report_markdown(report, out):
     """
-    Converts Kubescape JSON output to Markdown tables, including fix paths and exceptions.
+    Streams the Markdown tables for a normalized report to a file handle.
+
+    The summary controls are traversed once: each control's row is written as it is
+    visited while its fix paths and exceptions are spooled for the two tables that
+    follow.
+
+    Args:
+        report (KubescapeReport): The report, as returned by kubescape_findings.load_report.
+        out (file): Text file handle to write to.
+
+    Returns:
+        int: The number of sections written.
+    """
+    sections = 0
+
+    # 1. Cluster API Server Information Table
+    if report.api_info is not None:
+        api_info = report.api_info
+        _write_section(out, "Cluster API Server Information", ATTRIBUTE_HEADERS,
+                       ([label, api_info.get(key, 'N/A')] for label, key in API_INFO_FIELDS))
+        sections += 1
+
+    # 2.-4. Summary Details - Controls, Suggested Fix Paths and Exceptions
+    if report.controls is not None:
+        with TableSpool(FIX_PATH_HEADERS) as fix_paths, TableSpool(EXCEPTION_HEADERS) as exceptions:
+            out.write("## Summary Details - Controls\n")
+            write_header(out, CONTROLS_HEADERS)
+            for control in report.controls:
+                out.write(format_row([control.control_id, na(control.name), na(control.status),
+                                      na(control.compliance_score), na(control.category)]))
+                for fix_path in control.fix_paths:
+                    fix_paths.add([control.control_id, na(fix_path.resource_id), na(fix_path.path), na(fix_path.value)])
+                for exception in control.exceptions:
+                    exceptions.add([control.control_id, na(exception.guid), na(exception.name),
+                                    na(exception.system_exception), na(exception.policy_type)])
+            out.write("\n")
+            sections += 1
+            metrics.count("rows", len(report.controls) + fix_paths.rows + exceptions.rows)
+
+            for title, spool in (("Suggested Fix Paths", fix_paths), ("Exceptions", exceptions)):
+                if spool.rows:
+                    out.write(f"## {title}\n")
+                    spool.write_to(out)
+                    out.write("\n")
+                    sections += 1
+
+    # 5. Cluster Metadata Table
+    if report.cluster_metadata is not None:
+        _write_section(out, "Cluster Metadata", ATTRIBUTE_HEADERS,
+                       ([key, value] for key, value in report.cluster_metadata.items()))
+        sections += 1
+
+    # 6. Scan Metadata Table
+    if report.scan_metadata is not None:
+        scan_metadata = report.scan_metadata
+        _write_section(out, "Scan Metadata", ATTRIBUTE_HEADERS, [
+            ["Target Type", scan_metadata.get('targetType', 'N/A')],
+            ["Kubescape Version", scan_metadata.get('kubescapeVersion', 'N/A')],
+            ["Format Version", scan_metadata.get('formatVersion', 'N/A')],
+            ["Formats", ', '.join(scan_metadata.get('formats', ['N/A']))],  # Join list as string
+            ["Target Names", ', '.join(scan_metadata.get('targetNames', ['N/A']))],
+            ["Fail Threshold", scan_metadata.get('failThreshold', 'N/A')],
+        ])
+        sections += 1
+
+    return sections
+
+
+def write_kubescape_markdown(json_file_path, out, cache_dir=None):
+    """
+    Converts Kubescape JSON output to Markdown tables written straight to a file handle.
 
     Args:
         json_file_path (str): Path to the Kubescape JSON output file.
+        out (file): Text file handle to write to.
+        cache_dir (str): Optional parsed-report cache directory (see report_cache.load_cached).
 
     Returns:
-        str:  Markdown tables representing the Kubescape data,
-              or an error message.
+        str: An error message if nothing could be written, otherwise None.
     """
     try:
-        with open(json_file_path, 'r') as f:
-            data = json.load(f)
+        report = load_report(json_file_path, cache_dir)
     except FileNotFoundError:
         return f"Error: File not found at {json_file_path}"
     except json.JSONDecodeError:
         return f"Error: Invalid JSON in {json_file_path}"
     except Exception as e:
         return f"An unexpected error occurred: {e}"
+    return write_normalized_markdown(report, out)
 
-    if not data:
-        return "Error: Empty JSON file."
 
-    markdown_output = ""
+def write_normalized_markdown(report, out):
+    """
+    Writes the Markdown tables of an already parsed report; see write_kubescape_markdown.
 
-    # 1. Cluster API Server Information Table
-    if 'clusterAPIServerInfo' in data:
-        api_info = data['clusterAPIServerInfo']
-        api_table_headers = ["Attribute", "Value"]
-        api_table_data = [
-            ["Major Version", api_info.get('major', 'N/A')],
-            ["Minor Version", api_info.get('minor', 'N/A')],
-            ["Git Version", api_info.get('gitVersion', 'N/A')],
-            ["Git Commit", api_info.get('gitCommit', 'N/A')],
-            ["Git Tree State", api_info.get('gitTreeState', 'N/A')],
-            ["Build Date", api_info.get('buildDate', 'N/A')],
-            ["Go Version", api_info.get('goVersion', 'N/A')],
-            ["Compiler", api_info.get('compiler', 'N/A')],
-            ["Platform", api_info.get('platform', 'N/A')],
-        ]
-        markdown_output += "## Cluster API Server Information\n"
-        markdown_output += tabulate(api_table_data, headers=api_table_headers, tablefmt="github") + "\n\n"
-
-    # 2. Summary Details - Controls Table
-    if 'summaryDetails' in data and 'controls' in data['summaryDetails']:
-        controls = data['summaryDetails']['controls']
-        controls_table_headers = ["Control ID", "Name", "Status", "Compliance Score", "Category"]
-        controls_table_data = []
-        for control_id, control_data in controls.items():
-            status = control_data['statusInfo']['status']
-            compliance_score = control_data.get('complianceScore', 'N/A')
-            category_name = control_data['category']['name']
-            control_name = control_data['name']  # Get the control name.
-            controls_table_data.append([control_id, control_name, status, compliance_score, category_name])
-        markdown_output += "## Summary Details - Controls\n"
-        markdown_output += tabulate(controls_table_data, headers=controls_table_headers, tablefmt="github") + "\n\n"
-
-        # 3. Fix Paths Table (within Summary Details)
-        fix_paths = []
-        for control_id, control_data in controls.items():
-            if 'results' in control_data:
-                for result in control_data['results']:
-                    if 'fixPath' in result:
-                        resource_id = result.get('resourceID', 'N/A')  # Get resource ID
-                        fix_path_data = result['fixPath']
-                        path = fix_path_data.get('path', 'N/A')
-                        value = fix_path_data.get('value', 'N/A')
-                        fix_paths.append([control_id, resource_id, path, value])  # Include Control ID
-
-        if fix_paths:
-            fix_path_headers = ["Control ID", "Resource ID", "Fix Path", "Value"]
-            markdown_output += "## Suggested Fix Paths\n"
-            markdown_output += tabulate(fix_paths, headers=fix_path_headers, tablefmt="github") + "\n\n"
-
-        # 4. Exceptions Table (within Summary Details)
-        exceptions = []
-        for control_id, control_data in controls.items():
-             if 'exception' in control_data:
-                for exception_data in control_data['exception']:
-                    exception_name = exception_data.get('name', 'N/A')
-                    exception_guid = exception_data.get('guid', 'N/A')
-                    attributes = exception_data.get('attributes', {})
-                    system_exception = attributes.get('systemException', 'N/A')
-                    policy_type = exception_data.get('policyType', 'N/A')
-                    exceptions.append([control_id, exception_guid, exception_name, system_exception, policy_type])
-
-        if exceptions:
-            exception_headers = ["Control ID","GUID", "Exception Name", "System Exception", "Policy Type"]
-            markdown_output += "## Exceptions\n"
-            markdown_output += tabulate(exceptions, headers=exception_headers, tablefmt="github") + "\n\n"
-    
-    # 5. Cluster Metadata Table
-    if 'metadata' in data and 'clusterMetadata' in data['metadata']:
-        cluster_metadata = data['metadata']['clusterMetadata']
-        cluster_metadata_headers = ["Attribute", "Value"]
-        cluster_metadata_table_data = []
-        for key, value in cluster_metadata.items():
-            cluster_metadata_table_data.append([key, value])
-        markdown_output += "## Cluster Metadata\n"
-        markdown_output += tabulate(cluster_metadata_table_data, headers=cluster_metadata_headers, tablefmt="github") + "\n\n"
+    Args:
+        report (KubescapeReport): The report, e.g. as returned by kubescape_findings.load_report.
+        out (file): Text file handle to write to.
 
-    # 6. Scan Metadata Table
-    if 'metadata' in data and 'scanMetadata' in data['metadata']:
-        scan_metadata = data['metadata']['scanMetadata']
-        scan_metadata_headers = ["Attribute", "Value"]
-        scan_metadata_table_data = [
-            ["Target Type", scan_metadata.get('targetType', 'N/A')],
-            ["Kubescape Version", scan_metadata.get('kubescapeVersion', 'N/A')],
-            ["Format Version", scan_metadata.get('formatVersion', 'N/A')],
-            ["Formats", ', '.join(scan_metadata.get('formats', ['N/A']))],  # Join list as string
-            ["Target Names", ', '.join(scan_metadata.get('targetNames', ['N/A']))],
-            ["Fail Threshold", scan_metadata.get('failThreshold', 'N/A')],
-        ]
-        markdown_output += "## Scan Metadata\n"
-        markdown_output += tabulate(scan_metadata_table_data, headers=scan_metadata_headers, tablefmt="github") + "\n\n"
+    Returns:
+        str: An error message if nothing could be written, otherwise None.
+    """
+    if report.empty:
+        return "Error: Empty JSON file."
 
-    if not markdown_output:
+    with metrics.stage("render"):
+        sections = write_report_markdown(report, out)
+    if not sections:
         return "No suitable data found for table conversion."
 
-    return markdown_output
+    return None
 
 
+def convert_kubescape_json_to_markdown(json_file_path, cache_dir=None):
+    """
+    Converts Kubescape JSON output to Markdown tables, including fix paths and exceptions.
 
-if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python kubescape_to_markdown.py <path_to_results.json>")
-        sys.exit(1)
+    Args:
+        json_file_path (str): Path to the Kubescape JSON output file.
+        cache_dir (str): Optional parsed-report cache directory (see report_cache.load_cached).
 
-    json_file_path = sys.argv[1]
-    markdown_output = convert_kubescape_json_to_markdown(json_file_path)
-    print(markdown_output)
+    Returns:
+        str:  Markdown tables representing the Kubescape data,
+              or an error message.
+    """
+    out = io.StringIO()
+    error = write_kubescape_markdown(json_file_path, out, cache_dir)
+    return error or out.getvalue()
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert Kubescape JSON output to Markdown tables.")
+    parser.add_argument("json_file_path", help="Path to the Kubescape results.json")
+    parser.add_argument("--cache-dir", default=os.environ.get(CACHE_DIR_ENV),
+                        help=f"Reuse parsed reports from this directory (default: ${CACHE_DIR_ENV}, off if unset)")
+    add_index_argument(parser)
+    add_arguments(parser)
+    args = parser.parse_args()
+    configure(args)
+
+    error = write_kubescape_markdown(args.json_file_path, metrics.writer(sys.stdout), args.cache_dir)
+    print(error or "")
+    if args.index:
+        index_report(args.index, args.json_file_path, args.cluster)
+    finish(args, "kubescape_to_markdown")
@@ -0,0 +1,76 @@
+import shutil
+import tempfile
+
+# Rows are kept in memory up to this size, then spill to a temporary file.
+SPOOL_MAX_MEMORY = 1 << 20
+
+
+def format_row(cells):
+    """Formats one GitHub-flavoured Markdown table row, including its line break."""
+    return "| " + " | ".join(map(str, cells)) + " |\n"
+
+
+def write_header(out, headers):
+    """Writes the header and delimiter rows of a Markdown table."""
+    out.write(format_row(headers))
+    out.write(format_row(["---"] * len(headers)))
+
+
+def write_table(out, headers, rows):
+    """
+    Streams a Markdown table to a file handle, one row at a time.
+
+    Unlike tabulate there is no column-width pass: GitHub renders the table the
+    same without padding, and rows never have to be held in memory together.
+
+    Args:
+        out (file): Text file handle to write to.
+        headers (list): Column headers.
+        rows (iterable): Rows, each a sequence of cells; cells are formatted with str().
+
+    Returns:
+        int: The number of rows written.
+    """
+    write_header(out, headers)
+    count = 0
+    for row in rows:
+        out.write(format_row(row))
+        count += 1
+    return count
+
+
+class TableSpool:
+    """
+    Rows of a Markdown table buffered until the table can be written.
+
+    Lets one traversal fill several tables that must appear one after the other in
+    the output. Small tables stay in memory; large ones spill to a temporary file.
+    """
+
+    def __init__(self, headers):
+        self.headers = headers
+        self.rows = 0
+        self.file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY, mode="w+")
+
+    def add(self, row):
+        self.file.write(format_row(row))
+        self.rows += 1
+
+    def extend(self, rows):
+        for row in rows:
+            self.add(row)
+
+    def write_to(self, out):
+        """Writes the header and every buffered row to out."""
+        write_header(out, self.headers)
+        self.file.seek(0)
+        shutil.copyfileobj(self.file, out)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
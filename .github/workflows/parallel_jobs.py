@@ -0,0 +1,8 @@
+import os
+
+
+def default_jobs():
+    """Returns the number of CPU cores this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import zlib
+
+from report_metrics import metrics
+
+CACHE_DIR_ENV = "KUBESCAPE_REPORT_CACHE"
+CACHE_MAX_BYTES_ENV = "KUBESCAPE_REPORT_CACHE_MAX_BYTES"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Bump whenever the shape of a cached value changes so stale entries are never read back.
+CACHE_VERSION = "2"
+# Part of every entry's file name. The index of findings_index also records file_digest,
+# so a change of encoding is marked here rather than in CACHE_VERSION; entries written
+# as pickles by earlier versions are never read back and age out through evict().
+ENTRY_FORMAT = "json"
+
+logger = logging.getLogger("report_cache")
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """Returns the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256(CACHE_VERSION.encode())
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_entry(path, decode):
+    try:
+        with open(path, 'rb') as f:
+            value = decode(json.loads(zlib.decompress(f.read())))
+    except FileNotFoundError:
+        return None
+    # Whatever a corrupt or tampered entry decodes to, it is only data; one that does not
+    # have the expected shape is dropped like an unreadable one.
+    except (OSError, zlib.error, ValueError, TypeError, KeyError, IndexError, AttributeError, RecursionError) as e:
+        logger.warning("Ignoring unreadable cache entry %s: %s", path, e)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return None
+    os.utime(path)  # Mark as recently used for eviction.
+    return value
+
+
+def _write_entry(cache_dir, path, value, encode):
+    # Level 1 takes a sixth of the default level's time for entries within 20% of its size.
+    data = zlib.compress(json.dumps(encode(value), separators=(",", ":")).encode("utf-8"), 1)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        os.remove(tmp_path)
+        raise
+
+
+def evict(cache_dir, max_bytes):
+    """
+    Removes the least recently used cache entries until the cache fits in max_bytes.
+
+    Args:
+        cache_dir (str): The cache directory.
+        max_bytes (int): The size budget for all entries together.
+    """
+    entries = []
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            if entry.is_file() and entry.name.endswith(".cache"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def _identity(value):
+    return value
+
+
+def load_cached(json_file, kind, parse, cache_dir=None, max_bytes=None, encode=_identity, decode=_identity):
+    """
+    Returns parse(json_file), reusing the result of an earlier run on identical input.
+
+    The cache is opt-in: without cache_dir (or the KUBESCAPE_REPORT_CACHE environment
+    variable) parse is simply called. Entries are keyed on the SHA-256 of the file's
+    contents, stored as zlib-compressed JSON and evicted oldest-first once the cache
+    directory grows past max_bytes (KUBESCAPE_REPORT_CACHE_MAX_BYTES, default 256 MiB).
+
+    Entries are data only, never pickles, so a cache directory restored from elsewhere
+    (e.g. by actions/cache) cannot run code; encode and decode convert the parsed value
+    to and from plain JSON values.
+
+    Args:
+        json_file (str): Path to the report.
+        kind (str): Name of the parsed representation, so different parsers of the same
+                    file do not share entries.
+        parse (callable): Function that turns json_file into the parsed value.
+        cache_dir (str): Cache directory, created if missing.
+        max_bytes (int): Size budget for the cache directory.
+        encode (callable): Turns the parsed value into JSON-serializable data.
+        decode (callable): Rebuilds the parsed value from that data; may raise ValueError,
+                           TypeError, KeyError or IndexError on data of the wrong shape.
+
+    Returns:
+        object: The parsed value.
+    """
+    cache_dir = cache_dir or os.environ.get(CACHE_DIR_ENV)
+    if not cache_dir:
+        return parse(json_file)
+    if max_bytes is None:
+        max_bytes = int(os.environ.get(CACHE_MAX_BYTES_ENV, DEFAULT_MAX_BYTES))
+
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{kind}-{ENTRY_FORMAT}-{file_digest(json_file)}.cache")
+    with metrics.stage("read"):
+        value = _read_entry(path, decode)
+    if value is not None:
+        metrics.count("cache_hits")
+        return value
+
+    metrics.count("cache_misses")
+    value = parse(json_file)
+    try:
+        _write_entry(cache_dir, path, value, encode)
+        evict(cache_dir, max_bytes)
+    except OSError as e:
+        logger.warning("Could not write cache entry %s: %s", path, e)
+    return value
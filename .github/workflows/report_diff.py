@@ -0,0 +1,134 @@
+from collections import Counter
+from operator import attrgetter
+
+from kubescape_findings import iter_control_results, na
+from markdown_table import write_table
+
+# Longer or multi-line values are only reported as changed, not quoted.
+MAX_INLINE_VALUE = 80
+# TrivyFinding fields that read the same from text and JSON output; the two lay out
+# the description and code snippet differently.
+TRIVY_PORTABLE_FIELDS = ("namespace", "resource", "resource_type", "avd_id", "severity", "title")
+KUBESCAPE_DIFF_HEADERS = ["Resource ID", "Control ID", "Control Name", "Status", "Message", "Severity", "Category", "Remediation", "Namespace", "Name"]
+
+
+def kubescape_key(finding):
+    """Identifies a Kubescape ControlResult across scans."""
+    return (finding.resource_id, finding.control_id)
+
+
+def trivy_key(finding):
+    """Identifies a TrivyFinding across scans."""
+    return (finding.namespace, finding.resource, finding.avd_id)
+
+
+# The part of a TrivyFinding compared across scans read from different formats.
+trivy_portable = attrgetter(*TRIVY_PORTABLE_FIELDS)
+
+
+class FindingsDiff:
+    """The findings that appeared, disappeared or changed between a baseline scan and the current one."""
+
+    __slots__ = ("new", "resolved", "changed", "unchanged")
+
+    def __init__(self):
+        self.new = []
+        self.resolved = []
+        self.changed = []  # (baseline finding, current finding)
+        self.unchanged = 0
+
+    def __bool__(self):
+        return bool(self.new or self.resolved or self.changed)
+
+    def counts(self):
+        """Returns a one-line Markdown description of the diff."""
+        return (f"{len(self.new)} new, {len(self.resolved)} resolved, {len(self.changed)} changed, "
+                f"{self.unchanged} unchanged since the baseline scan.")
+
+
+def _occurrences(findings, key):
+    # The same check can legitimately fire more than once for a resource; numbering the
+    # occurrences keeps every finding addressable.
+    seen = Counter()
+    for finding in findings:
+        k = key(finding)
+        seen[k] += 1
+        yield k + (seen[k],), finding
+
+
+def diff_findings(baseline, current, key, compare=None):
+    """
+    Compares two scans with a hash index on the baseline.
+
+    Only the baseline is held in memory; the current findings are streamed past the
+    index, so the work is linear in both scans and the result is proportional to
+    what changed.
+
+    Args:
+        baseline (iterable): Findings of the baseline scan.
+        current (iterable): Findings of the current scan.
+        key (callable): Returns the identity of a finding, e.g. kubescape_key or trivy_key.
+        compare (callable): Optional; returns the part of a finding whose change counts,
+                            e.g. trivy_portable. By default the whole finding is compared.
+
+    Returns:
+        FindingsDiff: New and changed findings in current order, resolved ones in baseline order.
+    """
+    index = dict(_occurrences(baseline, key))
+    diff = FindingsDiff()
+    for k, finding in _occurrences(current, key):
+        previous = index.pop(k, None)
+        if previous is None:
+            diff.new.append(finding)
+        elif (previous != finding if compare is None else compare(previous) != compare(finding)):
+            diff.changed.append((previous, finding))
+        else:
+            diff.unchanged += 1
+    diff.resolved = list(index.values())
+    return diff
+
+
+def diff_kubescape_reports(baseline_report, report):
+    """Diffs the Results rows of two normalized Kubescape reports."""
+    return diff_findings(iter_control_results(baseline_report.results or ()),
+                         iter_control_results(report.results or ()), kubescape_key)
+
+
+def _inline(value):
+    text = str(na(value))
+    return text if "\n" not in text and len(text) <= MAX_INLINE_VALUE else None
+
+
+def describe_change(previous, current, fields=None):
+    """
+    Lists the fields that differ between two versions of a finding, e.g. 'status: passed → failed'.
+
+    Only the given fields are looked at, if any, e.g. TRIVY_PORTABLE_FIELDS.
+    """
+    changes = []
+    for field, old, new in zip(current._fields, previous, current):
+        if old != new and (fields is None or field in fields):
+            old_text, new_text = _inline(old), _inline(new)
+            if old_text is None or new_text is None:
+                changes.append(f"{field} changed")
+            else:
+                changes.append(f"{field}: {old_text} → {new_text}")
+    return "; ".join(changes)
+
+
+def write_kubescape_diff(diff, out):
+    """Writes a Kubescape Results diff as Markdown tables."""
+    out.write(f"\n## Results - Changes Since Baseline\n\n{diff.counts()}\n")
+    for title, findings in (("New", diff.new), ("Resolved", diff.resolved)):
+        out.write(f"\n### {title}\n\n")
+        if findings:
+            write_table(out, KUBESCAPE_DIFF_HEADERS, ([na(value) for value in finding] for finding in findings))
+        else:
+            out.write(f"No {title.lower()} findings.\n")
+    out.write("\n### Changed\n\n")
+    if diff.changed:
+        write_table(out, KUBESCAPE_DIFF_HEADERS + ["Changes"],
+                    ([na(value) for value in current] + [describe_change(previous, current)]
+                     for previous, current in diff.changed))
+    else:
+        out.write("No changed findings.\n")
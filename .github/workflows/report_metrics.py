@@ -0,0 +1,189 @@
+import json
+import logging
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Not available on Windows.
+    resource = None
+
+LOG_LEVEL_ENV = "REPORT_LOG_LEVEL"
+METRICS_FILE_ENV = "REPORT_METRICS_FILE"
+LOG_LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR"]
+DEFAULT_LOG_LEVEL = "WARNING"
+
+logger = logging.getLogger("report_metrics")
+
+
+class Metrics:
+    """
+    Per-stage timings and counters of one script run.
+
+    Stages are exclusive: time spent in a stage entered while another one is active,
+    e.g. "read" pulled lazily from inside "parse", counts toward the inner stage only,
+    so the stage times add up to the time measured.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.stages = {}
+        self.counters = {}
+        self._nested = []  # time spent in inner stages, one entry per active stage
+        self._started = time.perf_counter()
+
+    def _enter(self):
+        self._nested.append(0.0)
+        return time.perf_counter()
+
+    def _exit(self, name, start):
+        elapsed = time.perf_counter() - start
+        nested = self._nested.pop()
+        self.stages[name] = self.stages.get(name, 0.0) + elapsed - nested
+        if self._nested:
+            self._nested[-1] += elapsed
+
+    def stage(self, name):
+        """Returns a context manager timing its block as the named stage."""
+        return _Stage(self, name)
+
+    def timed(self, name, iterable):
+        """Yields the items of iterable, timing the work of producing each one as the named stage."""
+        iterator = iter(iterable)
+        while True:
+            start = self._enter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self._exit(name, start)
+            yield item
+
+    def reader(self, fp):
+        """Wraps a file so that its reads are timed as the "read" stage and counted in bytes_read."""
+        return _TimedReader(self, fp)
+
+    def writer(self, out):
+        """Wraps a text file so that its writes are timed as the "write" stage and counted in bytes_written."""
+        return _TimedWriter(self, out)
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def as_dict(self, script):
+        """Returns the metrics of the run as a JSON-serializable dict."""
+        return {
+            "script": script,
+            "total_seconds": round(time.perf_counter() - self._started, 6),
+            "stages": {name: round(seconds, 6) for name, seconds in self.stages.items()},
+            "counters": dict(self.counters),
+            "peak_rss_bytes": peak_rss_bytes(),
+        }
+
+
+class _Stage:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = self.metrics._enter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics._exit(self.name, self.start)
+
+
+class _TimedReader:
+    __slots__ = ("metrics", "fp")
+
+    def __init__(self, metrics, fp):
+        self.metrics = metrics
+        self.fp = fp
+
+    def read(self, size=-1):
+        start = self.metrics._enter()
+        try:
+            data = self.fp.read(size)
+        finally:
+            self.metrics._exit("read", start)
+        self.metrics.count("bytes_read", len(data))
+        return data
+
+
+class _TimedWriter:
+    __slots__ = ("metrics", "out")
+
+    def __init__(self, metrics, out):
+        self.metrics = metrics
+        self.out = out
+
+    def write(self, text):
+        start = self.metrics._enter()
+        try:
+            written = self.out.write(text)
+        finally:
+            self.metrics._exit("write", start)
+        self.metrics.count("bytes_written", len(text.encode("utf-8")))
+        return written
+
+    def flush(self):
+        self.out.flush()
+
+
+def peak_rss_bytes():
+    """Returns the peak resident set size of this process in bytes, or None where unknown."""
+    # On Linux, getrusage keeps the peak of the parent the process was forked from
+    # across exec; VmHWM starts afresh with the new program.
+    try:
+        with open("/proc/self/status", 'r') as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+# The metrics of the current run, shared by the scripts and the modules they use.
+metrics = Metrics()
+
+
+def add_arguments(parser):
+    """Adds the --log-level and --metrics-file options to a script's argument parser."""
+    parser.add_argument("--log-level", type=str.upper, choices=LOG_LEVELS,
+                        default=os.environ.get(LOG_LEVEL_ENV, DEFAULT_LOG_LEVEL).upper(),
+                        help=f"Diagnostics written to stderr (default: ${LOG_LEVEL_ENV} or {DEFAULT_LOG_LEVEL}); "
+                             "DEBUG also echoes the input")
+    parser.add_argument("--metrics-file", default=os.environ.get(METRICS_FILE_ENV),
+                        help=f"Write stage timings, counters and peak RSS as JSON here (default: ${METRICS_FILE_ENV})")
+
+
+def configure(args):
+    """Sets up logging to stderr at the requested level and starts a fresh set of metrics."""
+    logging.basicConfig(level=args.log_level, stream=sys.stderr, format="%(levelname)s %(name)s: %(message)s")
+    metrics.reset()
+
+
+def finish(args, script):
+    """Logs the run's metrics and writes them to the metrics file, if one was requested."""
+    data = metrics.as_dict(script)
+    logger.info("%s finished in %.3fs: stages %s, counters %s, peak RSS %s bytes",
+                script, data["total_seconds"], data["stages"], data["counters"], data["peak_rss_bytes"])
+    if args.metrics_file:
+        try:
+            with open(args.metrics_file, "w") as f:
+                json.dump(data, f, indent=2)
+        except OSError as e:
+            logger.warning("Could not write metrics file %s: %s", args.metrics_file, e)
+    return data
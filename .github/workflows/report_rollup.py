@@ -0,0 +1,157 @@
+import heapq
+from collections import Counter
+
+from kubescape_findings import iter_sections, na
+from markdown_table import write_table
+from report_metrics import metrics
+
+FAILED = "failed"
+# Worst resources listed by default.
+DEFAULT_TOP = 20
+# Rollups keyed by a field of each results entry: (table name, column header, Result field).
+RESULT_GROUPS = [
+    ("Failures by Namespace", "Namespace", "namespace"),
+    ("Failures by Severity", "Severity", "severity"),
+    ("Failures by Category", "Category", "category"),
+    ("Failures by Kind", "Kind", "kind"),
+]
+COUNT_HEADERS = ["Failed Controls", "Evaluated Controls"]
+CONTROL_HEADERS = ["Control ID", "Control Name"] + COUNT_HEADERS
+TOP_RESOURCE_HEADERS = ["Resource ID", "Kind", "Namespace", "Name"] + COUNT_HEADERS
+
+
+def _group_value(value):
+    # Values are counted and sorted as the tables print them, so a missing field, a
+    # category given as an object or a number among strings neither breaks the
+    # counters nor the sort.
+    return str(na(value))
+
+
+class Rollup:
+    """
+    Failure counts of a Kubescape report's Results rows, aggregated in one pass.
+
+    Memory grows with the number of distinct namespaces, controls, severities,
+    categories and kinds, not with the number of resources: per-group counters
+    plus a heap of at most `top` resources.
+    """
+
+    def __init__(self, top=DEFAULT_TOP):
+        self.top = top
+        self.resources = 0
+        self.evaluated = 0
+        self.failed = 0
+        # Result field -> (failed, evaluated) counters per value.
+        self.groups = {field: (Counter(), Counter()) for _, _, field in RESULT_GROUPS}
+        self.control_failed = Counter()
+        self.control_evaluated = Counter()
+        self.control_names = {}
+        # Min-heap of (failed, -position, resource fields): the root is the least bad
+        # resource kept, and of equally bad ones the last seen.
+        self._worst = []
+
+    def add(self, result):
+        """Counts the controls evaluated against one Result."""
+        control_failed, control_evaluated, control_names = self.control_failed, self.control_evaluated, self.control_names
+        failed = 0
+        for control in result.controls:
+            control_id = _group_value(control.control_id)
+            control_evaluated[control_id] += 1
+            if control.status == FAILED:
+                control_failed[control_id] += 1
+                failed += 1
+            if control_id not in control_names:
+                control_names[control_id] = na(control.name)
+        evaluated = len(result.controls)
+
+        # Namespace, severity, category and kind are per resource, so each is counted
+        # once per result rather than once per control.
+        if evaluated:
+            for field, (failed_counts, evaluated_counts) in self.groups.items():
+                value = _group_value(getattr(result, field))
+                evaluated_counts[value] += evaluated
+                if failed:
+                    failed_counts[value] += failed
+
+        if failed and self.top:
+            entry = (failed, -self.resources,
+                     (na(result.resource_id), na(result.kind), na(result.namespace), na(result.name), evaluated))
+            if len(self._worst) < self.top:
+                heapq.heappush(self._worst, entry)
+            elif entry > self._worst[0]:
+                heapq.heapreplace(self._worst, entry)
+
+        self.resources += 1
+        self.evaluated += evaluated
+        self.failed += failed
+
+    def add_results(self, results):
+        for result in results:
+            self.add(result)
+
+    def group_rows(self, field):
+        """Returns the rows of one RESULT_GROUPS table, most failures first."""
+        failed, evaluated = self.groups[field]
+        return [[value, failed[value], evaluated[value]] for value in sorted(evaluated, key=lambda v: (-failed[v], v))]
+
+    def control_rows(self):
+        """Returns the rows of the per-control table, most failures first."""
+        failed, evaluated = self.control_failed, self.control_evaluated
+        return [[control_id, self.control_names[control_id], failed[control_id], evaluated[control_id]]
+                for control_id in sorted(evaluated, key=lambda c: (-failed[c], c))]
+
+    def worst_resources(self):
+        """Returns the rows of the top resources table, most failed controls first."""
+        return [[resource_id, kind, namespace, name, failed, evaluated]
+                for failed, _, (resource_id, kind, namespace, name, evaluated) in sorted(self._worst, reverse=True)]
+
+
+def rollup_report(json_file, top=DEFAULT_TOP):
+    """
+    Aggregates a Kubescape report while streaming it; the Results rows are never built
+    and the other sections of the report are skipped.
+
+    Args:
+        json_file (str): Path to the Kubescape JSON output file.
+        top (int): Number of worst resources to keep.
+
+    Returns:
+        Rollup: The aggregated counts.
+
+    Raises:
+        FileNotFoundError: If json_file does not exist.
+        json.JSONDecodeError: If json_file is not a valid JSON object.
+    """
+    rollup = Rollup(top)
+    for section, records in metrics.timed("parse", iter_sections(json_file, keys=("results",))):
+        if section == "results":
+            with metrics.stage("aggregate"):
+                rollup.add_results(metrics.timed("parse", records))
+    metrics.count("resources", rollup.resources)
+    return rollup
+
+
+def _write_table(out, title, headers, rows):
+    out.write(f"\n## {title}\n\n")
+    if rows:
+        write_table(out, headers, rows)
+    else:
+        out.write("No data found for this table.\n")
+    metrics.count("rows", len(rows))
+
+
+def write_rollup(rollup, out):
+    """
+    Writes the rollups of a report as Markdown tables, in place of its per-finding tables.
+
+    Args:
+        rollup (Rollup): The aggregated counts.
+        out (file): Text file handle to write to.
+    """
+    out.write("\n## Failure Summary\n\n")
+    out.write(f"{rollup.failed} of {rollup.evaluated} control evaluations failed "
+              f"across {rollup.resources} resources.\n")
+    for title, header, field in RESULT_GROUPS:
+        _write_table(out, title, [header] + COUNT_HEADERS, rollup.group_rows(field))
+    _write_table(out, "Failures by Control", CONTROL_HEADERS, rollup.control_rows())
+    _write_table(out, f"Top {rollup.top} Resources by Failed Controls", TOP_RESOURCE_HEADERS, rollup.worst_resources())
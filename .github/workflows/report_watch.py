@@ -0,0 +1,283 @@
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+from collections import OrderedDict
+
+from batch_report import (KUBESCAPE, demote_headings, detect_tool, expand_inputs, failed_result,
+                          render_kubescape_report, render_trivy_findings, write_batch_report)
+from kubescape_findings import parse_report
+from report_cache import file_digest
+from report_metrics import add_arguments, configure, finish, metrics
+from step_summary import tool_shard_dir
+
+SHARD_DIR = tool_shard_dir("watch")
+DEFAULT_INTERVAL = 0.5
+DEFAULT_MEMORY_LIMIT = 512 * 1024 * 1024
+# Parsed reports measure 0.9-1.6 times the size of their file on the heap; they are
+# charged at twice that so the limit holds.
+PARSED_SIZE_FACTOR = 2
+# Rendered sections are kept in memory up to this share of the limit and spilled to
+# temporary files past it; the parsed reports get what the sections leave.
+SECTIONS_SHARE = 0.5
+
+logger = logging.getLogger("report_watch")
+
+
+class ParsedReports:
+    """
+    Least recently used parsed reports, keyed on the digest of the file they came from.
+
+    A file that is rewritten with contents seen before, e.g. a cluster whose scan did
+    not change, is rendered again without being parsed. Memory held elsewhere under the
+    same limit, e.g. rendered sections, is charged with reserve().
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MEMORY_LIMIT):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.reserved = 0
+        self.entries = OrderedDict()  # digest -> (parsed report, charged bytes)
+
+    def get(self, digest):
+        entry = self.entries.get(digest)
+        if entry is None:
+            return None
+        self.entries.move_to_end(digest)
+        return entry[0]
+
+    def put(self, digest, parsed, file_size):
+        size = file_size * PARSED_SIZE_FACTOR
+        if size + self.reserved > self.max_bytes:
+            return
+        if digest in self.entries:
+            self.bytes -= self.entries.pop(digest)[1]
+        self.entries[digest] = (parsed, size)
+        self.bytes += size
+        self._evict()
+
+    def reserve(self, size):
+        """Charges (or, when negative, releases) bytes held outside the LRU, evicting reports to make room."""
+        self.reserved += size
+        self._evict()
+
+    def _evict(self):
+        while self.entries and self.bytes + self.reserved > self.max_bytes:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.bytes -= evicted
+            metrics.count("lru_evictions")
+
+
+class _SpilledSection(dict):
+    """A rendered section whose markdown is read back from its spill file when looked up."""
+
+    def __missing__(self, key):
+        if key != "markdown":
+            raise KeyError(key)
+        with open(self["file"], 'r', encoding="utf-8") as f:
+            return f.read()
+
+
+class ReportWatcher:
+    """
+    Keeps a combined report of every file under some inputs up to date.
+
+    Each poll stats the files; only those whose mtime or size changed are hashed, and
+    only those whose contents changed are parsed and rendered. The other sections of the
+    report are reused as rendered, with their headings already demoted; they count
+    against memory_limit along with the parsed reports (see SECTIONS_SHARE).
+    """
+
+    def __init__(self, inputs, output, kubescape_format="md", memory_limit=DEFAULT_MEMORY_LIMIT, budget=None,
+                 shard_dir=SHARD_DIR, pdf_dir=None):
+        self.inputs = inputs
+        self.output = output
+        self.kubescape_format = kubescape_format
+        self.budget = budget
+        self.shard_dir = shard_dir
+        self.pdf_dir = pdf_dir
+        self.parsed = ParsedReports(memory_limit)
+        self.files = {}     # path -> (mtime_ns, size, digest)
+        self.sections = {}  # path -> render_file style result, or a _SpilledSection
+        self.section_bytes = 0
+        self.spill_dir = None
+        self.spilled = 0
+
+    def poll(self):
+        """
+        Checks the inputs once, re-rendering what changed and rewriting the report if anything did.
+
+        Returns:
+            tuple: (changed paths, removed paths).
+        """
+        paths = expand_inputs(self.inputs)
+        changed = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            known = self.files.get(path)
+            if known is not None and known[:2] == (stat.st_mtime_ns, stat.st_size):
+                continue
+            try:
+                digest = file_digest(path)
+            except OSError as e:
+                logger.warning("Could not read %s: %s", path, e)
+                continue
+            self.files[path] = (stat.st_mtime_ns, stat.st_size, digest)
+            if known is not None and known[2] == digest:
+                continue  # Touched or copied over with the same contents.
+            self.store(path, self.render(path, digest, stat.st_size))
+            changed.append(path)
+
+        removed = sorted(set(self.files) - set(paths))
+        for path in removed:
+            del self.files[path]
+            self.discard(path)
+        if changed or removed:
+            self.write_report()
+        return changed, removed
+
+    def store(self, path, result):
+        """Keeps a file's rendered section, spilling its markdown to disk when memory is short."""
+        self.discard(path)
+        size = len(result["markdown"])
+        if self.section_bytes + size <= self.parsed.max_bytes * SECTIONS_SHARE:
+            self.sections[path] = result
+            self.section_bytes += size
+            self.parsed.reserve(size)
+            return
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.TemporaryDirectory(prefix="report-watch-")
+        self.spilled += 1
+        spill_file = os.path.join(self.spill_dir.name, f"{self.spilled}.md")
+        with open(spill_file, "w", encoding="utf-8") as f:
+            f.write(result["markdown"])
+        self.sections[path] = _SpilledSection(path=path, tool=result["tool"], findings=result["findings"],
+                                              file=spill_file)
+        metrics.count("sections_spilled")
+
+    def discard(self, path):
+        """Forgets a file's rendered section."""
+        section = self.sections.pop(path, None)
+        if isinstance(section, _SpilledSection):
+            os.remove(section["file"])
+        elif section is not None:
+            size = len(section["markdown"])
+            self.section_bytes -= size
+            self.parsed.reserve(-size)
+
+    def _parse(self, path, tool):
+        if tool == KUBESCAPE:
+            # Not load_report: this LRU is the only cache, and nothing else pins a report.
+            return parse_report(path)
+        from scripts.trivy_summary import iter_findings
+
+        with open(path, 'r') as f:
+            return list(iter_findings(f))
+
+    def render(self, path, digest, size):
+        """
+        Renders one file's section, parsing it unless its contents are in the LRU.
+
+        A file that cannot be read, parsed or rendered, or whose PDF cannot be written,
+        gets an error section; it does not stop the watcher.
+        """
+        tool = "?"
+        try:
+            tool = detect_tool(path)
+            parsed = self.parsed.get(digest)
+            if parsed is None:
+                metrics.count("parses")
+                parsed = self._parse(path, tool)
+                self.parsed.put(digest, parsed, size)
+            else:
+                metrics.count("lru_hits")
+            with metrics.stage("render"):
+                if tool == KUBESCAPE:
+                    findings, markdown = render_kubescape_report(parsed, self.kubescape_format)
+                else:
+                    findings, markdown = render_trivy_findings(parsed)
+        except (OSError, UnicodeDecodeError, json.JSONDecodeError) as e:
+            return failed_result(path, f"Could not read or parse {path}: {e}")
+        except Exception as e:
+            logger.exception("Could not render %s", path)
+            return failed_result(path, f"Could not render {path}: {type(e).__name__}: {e}", tool)
+        if tool == KUBESCAPE and self.pdf_dir:
+            try:
+                self.write_pdf(path, parsed)
+            except Exception as e:
+                logger.exception("Could not write the PDF of %s", path)
+                return failed_result(path, f"Could not write the PDF of {path}: {type(e).__name__}: {e}", tool)
+        return {"path": path, "tool": tool, "findings": findings, "markdown": demote_headings(markdown)}
+
+    def write_pdf(self, path, report):
+        # Only the PDF of the file that changed is regenerated, from the report as parsed.
+        from generate_pdf_report import report_sections, write_table_pdf
+
+        os.makedirs(self.pdf_dir, exist_ok=True)
+        name = os.path.splitext(os.path.basename(path))[0]
+        write_table_pdf(report_sections(report), os.path.join(self.pdf_dir, f"{name}.pdf"), jobs=1)
+
+    def write_report(self):
+        """Rewrites the combined report from the rendered sections, replacing the old one atomically."""
+        results = [self.sections[path] for path in sorted(self.sections)]
+        directory = os.path.dirname(os.path.abspath(self.output))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f, metrics.stage("write"):
+                write_batch_report(results, f, self.budget, self.shard_dir, headings_demoted=True)
+            os.replace(tmp_path, self.output)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+
+def watch(watcher, interval=DEFAULT_INTERVAL, once=False):
+    """
+    Polls the watcher every interval seconds until interrupted, or once.
+
+    Files are best dropped into the directory with an atomic rename; one caught while
+    still being written is rendered as an error and picked up again once complete.
+    """
+    while True:
+        started = time.perf_counter()
+        changed, removed = watcher.poll()
+        elapsed = time.perf_counter() - started
+        metrics.count("polls")
+        if changed or removed:
+            logger.info("%d changed, %d removed, %d tracked; report updated in %.3fs", len(changed), len(removed),
+                        len(watcher.sections), elapsed)
+        if once:
+            return
+        time.sleep(max(0.0, interval - elapsed))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Watch report files and keep a combined Markdown report of them up to date.")
+    parser.add_argument("inputs", nargs="+", help="Report files, directories or glob patterns, re-expanded on every poll")
+    parser.add_argument("-o", "--output", required=True, help="Combined report, rewritten whenever an input changes")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL,
+                        help=f"Seconds between polls (default: {DEFAULT_INTERVAL})")
+    parser.add_argument("--once", action="store_true", help="Poll once and exit")
+    parser.add_argument("--kubescape-format", choices=["md", "tables"], default="md",
+                        help="md (kubescape_to_markdown.py) or tables (backup-python.py)")
+    parser.add_argument("--memory-limit", type=int, default=DEFAULT_MEMORY_LIMIT,
+                        help=f"Bytes of parsed reports kept in memory (default: {DEFAULT_MEMORY_LIMIT})")
+    parser.add_argument("--pdf-dir", help="Also keep a table PDF per Kubescape report here")
+    parser.add_argument("--summary-budget", type=int, help="Byte budget for the combined report; see step_summary.py")
+    parser.add_argument("--shard-dir", default=SHARD_DIR, help="Directory for clusters past the budget")
+    add_arguments(parser)
+    args = parser.parse_args()
+    configure(args)
+
+    watcher = ReportWatcher(args.inputs, args.output, args.kubescape_format, args.memory_limit, args.summary_budget,
+                            args.shard_dir, args.pdf_dir)
+    try:
+        watch(watcher, args.interval, args.once)
+    except KeyboardInterrupt:
+        pass
+    finish(args, "report_watch")
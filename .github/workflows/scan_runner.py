@@ -0,0 +1,297 @@
+import argparse
+import asyncio
+import codecs
+import io
+import json
+import logging
+import queue
+import shlex
+import sys
+import tempfile
+import time
+
+from batch_report import KUBESCAPE, TRIVY, write_batch_report
+from kubescape_findings import read_report
+from kubescape_to_markdown import write_normalized_markdown
+from markdown_table import SPOOL_MAX_MEMORY
+from report_metrics import add_arguments, configure, finish, metrics
+from scripts.trivy_summary import ISSUES_ANNOTATION, TrivyTextParser, format_finding
+from step_summary import tool_shard_dir
+
+SHARD_DIR = tool_shard_dir("scan")
+DEFAULT_KUBESCAPE_COMMAND = "kubescape scan framework nsa --format json --output /dev/stdout"
+DEFAULT_TRIVY_COMMAND = "trivy k8s --report all --scanners misconfig"
+READ_CHUNK = 1 << 16
+# Chunks of Kubescape output waiting for the parser thread; bounds memory when the
+# scanner writes faster than the report is parsed.
+QUEUE_CHUNKS = 64
+
+logger = logging.getLogger("scan_runner")
+
+
+class QueueReader:
+    """
+    File-like read() over text chunks put on a queue by another thread.
+
+    Lets the pull parser of kubescape_findings consume a scanner's output in a worker
+    thread while the event loop is still reading it.
+    """
+
+    def __init__(self, max_chunks=QUEUE_CHUNKS):
+        self.queue = queue.Queue(max_chunks)
+        self.buffer = ""
+        self.eof = False
+        self.discarding = False
+
+    def put(self, text):
+        """Adds a chunk of input, blocking while the queue is full; None marks the end."""
+        if not self.discarding:
+            self.queue.put(text)
+
+    def discard(self):
+        """Called by the consumer when it stops reading: drops queued and further input."""
+        self.discarding = True
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def read(self, size=-1):
+        while not self.eof and (size < 0 or len(self.buffer) < size):
+            chunk = self.queue.get()
+            if chunk is None:
+                self.eof = True
+            else:
+                self.buffer += chunk
+        if size < 0 or size >= len(self.buffer):
+            data, self.buffer = self.buffer, ""
+        else:
+            data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+class ScanResult:
+    """The outcome of one scanner run: its exit status, timings and rendered Markdown."""
+
+    def __init__(self, tool, command):
+        self.tool = tool
+        self.command = command
+        self.returncode = None
+        self.findings = None  # None when the output could not be parsed
+        self.markdown = ""
+        self.first_output = None  # seconds from launch to the first byte of output
+        self.seconds = None
+
+    def as_batch_result(self):
+        """Returns the result in the form batch_report.write_batch_report takes."""
+        return {"path": self.tool, "tool": self.tool, "findings": self.findings, "markdown": self.markdown}
+
+
+def _parse_kubescape(reader):
+    try:
+        return read_report(reader)
+    finally:
+        # Whether it failed or the report ended early, nothing more will be read.
+        reader.discard()
+
+
+async def _copy_output(process, result, started, on_text, raw):
+    decoder = codecs.getincrementaldecoder("utf-8")("replace")
+    while True:
+        data = await process.stdout.read(READ_CHUNK)
+        if result.first_output is None and data:
+            result.first_output = time.perf_counter() - started
+        text = decoder.decode(data, final=not data)
+        if raw is not None:
+            raw.write(text)
+        if text:
+            await on_text(text)
+        if not data:
+            return
+
+
+async def run_kubescape(command, raw_path=None):
+    """
+    Runs Kubescape and parses its JSON report from stdout while the scan is running.
+
+    The JSON is decoded by kubescape_findings.read_report in a worker thread, fed
+    through a QueueReader as the output arrives.
+
+    Args:
+        command (list): Command line printing the JSON report to stdout.
+        raw_path (str): Optional file to keep a copy of the output in, e.g. results.json.
+
+    Returns:
+        ScanResult: The result, with the Markdown of kubescape_to_markdown.py.
+    """
+    result = ScanResult(KUBESCAPE, command)
+    started = time.perf_counter()
+    try:
+        process = await asyncio.create_subprocess_exec(*command, stdout=asyncio.subprocess.PIPE)
+    except OSError as e:
+        result.markdown = f"Error: Could not run {shlex.join(command)}: {e}\n"
+        return result
+
+    reader = QueueReader()
+    loop = asyncio.get_running_loop()
+    parsed = loop.run_in_executor(None, _parse_kubescape, reader)
+
+    async def feed(text):
+        await loop.run_in_executor(None, reader.put, text)
+
+    raw = open(raw_path, "w") if raw_path else None
+    try:
+        await _copy_output(process, result, started, feed, raw)
+    finally:
+        await loop.run_in_executor(None, reader.put, None)
+        if raw is not None:
+            raw.close()
+    result.returncode = await process.wait()
+    result.seconds = time.perf_counter() - started
+
+    try:
+        report = await parsed
+        out = io.StringIO()
+        error = write_normalized_markdown(report, out)
+        if error:
+            out.write(f"{error}\n")
+        findings = sum(1 for entry in report.results or () for control in entry.controls if control.status == "failed")
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        result.markdown = f"Error: Could not parse the Kubescape output: {e}\n"
+        return result
+    except Exception as e:
+        # Valid JSON of an unexpected shape fails this scan's section, not the Trivy one.
+        logger.exception("Could not render the Kubescape output")
+        result.markdown = f"Error: Could not render the Kubescape output: {type(e).__name__}: {e}\n"
+        return result
+    result.findings = findings
+    result.markdown = out.getvalue()
+    return result
+
+
+async def run_trivy(command, raw_path=None):
+    """
+    Runs `trivy k8s --report all` and summarizes its text output line by line as it is printed.
+
+    Args:
+        command (list): Command line printing the text report to stdout.
+        raw_path (str): Optional file to keep a copy of the output in, e.g. trivy_k8s_output.txt.
+
+    Returns:
+        ScanResult: The result, with the Markdown of scripts/trivy_summary.py.
+    """
+    result = ScanResult(TRIVY, command)
+    started = time.perf_counter()
+    try:
+        process = await asyncio.create_subprocess_exec(*command, stdout=asyncio.subprocess.PIPE)
+    except OSError as e:
+        result.markdown = f"Error: Could not run {shlex.join(command)}: {e}\n"
+        return result
+
+    parser = TrivyTextParser()
+    findings = 0
+    pending = ""
+    # Sections wait here until both scans are done; large summaries spill to disk.
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY, mode="w+") as spool:
+        def write(completed):
+            nonlocal findings
+            for finding in completed:
+                spool.write(format_finding(finding))
+                findings += 1
+
+        async def feed(text):
+            nonlocal pending
+            lines = (pending + text).split("\n")
+            pending = lines.pop()
+            for line in lines:
+                write(parser.feed(line.rstrip("\r")))
+
+        raw = open(raw_path, "w") if raw_path else None
+        try:
+            await _copy_output(process, result, started, feed, raw)
+        finally:
+            if raw is not None:
+                raw.close()
+        if pending:
+            write(parser.feed(pending.rstrip("\r")))
+        write(parser.close())
+        result.returncode = await process.wait()
+        result.seconds = time.perf_counter() - started
+
+        if not findings:
+            spool.write("No misconfigurations found.\n" if result.first_output else
+                        "Trivy scan completed. No output from Trivy k8s.")
+        spool.seek(0)
+        result.markdown = spool.read()
+    result.findings = findings
+    return result
+
+
+async def run_scans(kubescape_command, trivy_command, kubescape_output=None, trivy_output=None):
+    """Runs both scanners concurrently; returns their ScanResults, Kubescape first."""
+    return await asyncio.gather(run_kubescape(kubescape_command, kubescape_output), run_trivy(trivy_command, trivy_output))
+
+
+def scan(kubescape_command, trivy_command, out, kubescape_output=None, trivy_output=None, budget=None,
+         shard_dir=SHARD_DIR):
+    """
+    Runs Kubescape and Trivy at the same time and writes their combined report once both finish.
+
+    Args:
+        kubescape_command (list): Command line printing the Kubescape JSON report to stdout.
+        trivy_command (list): Command line printing the Trivy text report to stdout.
+        out (file): Text file handle for the combined report (see batch_report.write_batch_report).
+        kubescape_output (str): Optional file to keep the raw Kubescape output in.
+        trivy_output (str): Optional file to keep the raw Trivy output in.
+        budget (int): Optional byte budget for out.
+        shard_dir (str): Directory for the shard files.
+
+    Returns:
+        list: The ScanResult of each scanner.
+    """
+    # The Kubescape parser times itself from its worker thread, its waits for output
+    # included as "read"; this stage gets the rest of the time spent on the scanners.
+    with metrics.stage("scan"):
+        results = asyncio.run(run_scans(kubescape_command, trivy_command, kubescape_output, trivy_output))
+    for result in results:
+        if result.returncode:
+            logger.warning("%s exited with status %s", shlex.join(result.command), result.returncode)
+        logger.info("%s: first output after %ss, finished after %ss, %s findings", result.tool,
+                    _seconds(result.first_output), _seconds(result.seconds), result.findings)
+        metrics.count(f"findings.{result.tool}", result.findings or 0)
+    with metrics.stage("write"):
+        write_batch_report([result.as_batch_result() for result in results], out, budget, shard_dir)
+    return results
+
+
+def _seconds(value):
+    return "N/A" if value is None else f"{value:.3f}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run Kubescape and Trivy concurrently and report both scans in one Markdown file.")
+    parser.add_argument("--kubescape-command", default=DEFAULT_KUBESCAPE_COMMAND,
+                        help=f"Command printing the Kubescape JSON report to stdout (default: {DEFAULT_KUBESCAPE_COMMAND})")
+    parser.add_argument("--trivy-command", default=DEFAULT_TRIVY_COMMAND,
+                        help=f"Command printing the Trivy text report to stdout (default: {DEFAULT_TRIVY_COMMAND})")
+    parser.add_argument("--kubescape-output", help="Also save the raw Kubescape output here, e.g. results.json")
+    parser.add_argument("--trivy-output", help="Also save the raw Trivy output here, e.g. trivy_k8s_output.txt")
+    parser.add_argument("-o", "--output", help="Write the combined report here instead of stdout")
+    parser.add_argument("--summary-budget", type=int, help="Byte budget for the combined report; see step_summary.py")
+    parser.add_argument("--shard-dir", default=SHARD_DIR, help="Directory for the scans past the budget")
+    add_arguments(parser)
+    args = parser.parse_args()
+    configure(args)
+
+    out = open(args.output, "w") if args.output else sys.stdout
+    try:
+        results = scan(shlex.split(args.kubescape_command), shlex.split(args.trivy_command), out,
+                       args.kubescape_output, args.trivy_output, args.summary_budget, args.shard_dir)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    if results[1].findings:
+        print(ISSUES_ANNOTATION)
+    finish(args, "scan_runner")
+    sys.exit(1 if any(result.findings is None for result in results) else 0)
@@ -1,129 +1,567 @@
+import argparse
+import contextlib
+import io
+import itertools
+import logging
 import os
 import sys
 import re
-import traceback
+from collections import namedtuple
 
-def process_trivy_results(trivy_output):
+# Shared report helpers live one directory up, next to the Kubescape scripts.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from findings_index import FindingsIndex, add_index_argument, trivy_row
+from json_stream import is_stream, iter_members
+from report_diff import TRIVY_PORTABLE_FIELDS, describe_change, diff_findings, trivy_key, trivy_portable
+from report_metrics import add_arguments, configure, finish, metrics
+from step_summary import DEFAULT_BUDGET, SUMMARY_BUDGET_ENV, BudgetedSummary, budget_from_env, tool_shard_dir
+
+SHARD_DIR = tool_shard_dir("trivy")
+
+# Block boundaries only count when they start a line (re.match); the per-line
+# detection of namespaces, resources and AVD checks searches anywhere (re.search).
+RESOURCE_PATTERN = re.compile(r"namespace:\s*(.*?),.*?([A-Za-z0-9_-]+(?:/[A-Za-z0-9_-]+)?)(?:\s+\((.*?)\))?:\s*(\d+-\d+|\d+)")
+NAMESPACE_PATTERN = re.compile(r"namespace:\s*(.*?),")
+AVD_PATTERN = re.compile(r"AVD-KSV-(\d+)\s*\((.*?)\):\s*(.*)")
+CODE_SNIPPET_PATTERN = re.compile(r"^\s*(\d+\s*[│┌└]\s*.*)")
+# Description lines that frame or locate a single finding: box-drawing rules and the
+# file:line range above its code snippet.
+RULE_PATTERN = re.compile(r"^\s*[═─]+\s*$")
+LOCATION_PATTERN = re.compile(r"^\s*\S+:\d+(?:-\d+)?\s*$")
+
+TrivyFinding = namedtuple(
+    "TrivyFinding",
+    ["namespace", "resource", "resource_type", "avd_id", "severity", "title", "description", "code_snippet"],
+)
+
+TEXT = "text"
+JSON = "json"
+AUTO = "auto"
+# Top-level arrays of `trivy k8s --format json` output: one entry per resource.
+# Older releases put the resources under Misconfigurations and Vulnerabilities.
+JSON_RESOURCE_KEYS = ("Resources", "Misconfigurations")
+JSON_STREAM_KEYS = JSON_RESOURCE_KEYS + ("Vulnerabilities",)
+AVD_PREFIX = "AVD-KSV-"
+# GitHub Actions workflow command flagging the step when anything was found.
+ISSUES_ANNOTATION = "::warning title=Trivy Scan Issues::Misconfigurations were found. Check the scan results for details."
+
+logger = logging.getLogger("trivy_summary")
+
+
+class TrivyTextParser:
+    """
+    Single-pass state machine over the lines of `trivy k8s --report all` text output.
+
+    Every line is looked at exactly once. The lines following an AVD match are buffered
+    only until the next line that starts a resource or AVD block, at which point all
+    findings opened since the previous boundary are completed in input order.
+    """
+
+    def __init__(self):
+        self.namespace = ""
+        self.resource = ""
+        self.resource_type = ""
+        self._window = []    # lines seen since the oldest open finding
+        self._snippets = []  # code snippet text (or None) for each line in _window
+        self._open = []      # (window offset, namespace, resource, resource type, avd id, severity, title)
+
+    def feed(self, line):
+        """
+        Consumes one line of Trivy output.
+
+        Args:
+            line (str): A single line, without its line terminator.
+
+        Returns:
+            list: The TrivyFinding records completed by this line, possibly empty.
+        """
+        completed = []
+        if self._open:
+            if RESOURCE_PATTERN.match(line) or AVD_PATTERN.match(line):
+                completed = self._flush()
+            else:
+                self._window.append(line)
+                code_match = CODE_SNIPPET_PATTERN.search(line)
+                self._snippets.append(code_match.group(1) if code_match else None)
+
+        namespace_match = NAMESPACE_PATTERN.search(line)
+        if namespace_match:
+            self.namespace = namespace_match.group(1).strip()
+            logger.debug("Found namespace: %s", self.namespace)
+
+        resource_match = RESOURCE_PATTERN.search(line)
+        if resource_match:
+            self.resource = resource_match.group(2).strip()
+            self.resource_type = (resource_match.group(3) or "").strip()
+            logger.debug("Found resource: %s, type: %s", self.resource, self.resource_type or "-")
+
+        avd_match = AVD_PATTERN.search(line)
+        if avd_match:
+            avd_id, severity, title = avd_match.groups()
+            severity = severity.strip().upper()
+            title = title.strip()
+            logger.debug("Found AVD: %s, Severity: %s, Title: %s", avd_id, severity, title)
+            self._open.append((len(self._window), self.namespace, self.resource, self.resource_type, avd_id, severity, title))
+
+        return completed
+
+    def close(self):
+        """Completes the findings still open at the end of the input and returns them."""
+        return self._flush()
+
+    def _flush(self):
+        findings = []
+        for start, namespace, resource, resource_type, avd_id, severity, title in self._open:
+            description = "\n".join(self._window[start:]).strip()
+            code_snippet = "\n".join(s for s in self._snippets[start:] if s is not None).strip()
+            findings.append(TrivyFinding(namespace, resource, resource_type, avd_id, severity, title, description, code_snippet))
+        self._window = []
+        self._snippets = []
+        self._open = []
+        return findings
+
+
+def iter_trivy_findings(lines):
+    """
+    Parses Trivy text output lazily.
+
+    Args:
+        lines (iterable): Lines of `trivy k8s --report all` output, e.g. an open file.
+
+    Yields:
+        TrivyFinding: Each misconfiguration, in the order it appears in the input.
+    """
+    parser = TrivyTextParser()
+    for line in lines:
+        yield from parser.feed(line.rstrip("\r\n"))
+    yield from parser.close()
+
+
+def _json_code_snippet(cause_metadata):
+    # Rebuilds the snippet the way the text report draws it: "132 ┌ content" ... "143 └ content".
+    lines = ((cause_metadata or {}).get("Code") or {}).get("Lines") or []
+    snippet = []
+    for line in lines:
+        if line.get("Truncated"):
+            continue
+        marker = "┌" if line.get("FirstCause") else "└" if line.get("LastCause") else "│"
+        snippet.append(f"{line.get('Number')} {marker} {line.get('Content', '')}".rstrip())
+    return "\n".join(snippet)
+
+
+def _json_resource_findings(resource):
+    """Yields a TrivyFinding for every failed misconfiguration of one resource entry."""
+    namespace = resource.get("Namespace") or ""
+    kind, name = resource.get("Kind") or "", resource.get("Name") or ""
+    resource_name = f"{kind.lower()}/{name}" if kind else name
+    for result in resource.get("Results") or []:
+        for misconfiguration in result.get("Misconfigurations") or []:
+            if misconfiguration.get("Status", "FAIL") != "FAIL":
+                continue
+            avd_id = misconfiguration.get("AVDID") or misconfiguration.get("ID") or ""
+            if avd_id.startswith(AVD_PREFIX):
+                avd_id = avd_id[len(AVD_PREFIX):]
+            description = misconfiguration.get("Description") or ""
+            if misconfiguration.get("PrimaryURL"):
+                description = f"{description}\n\nSee {misconfiguration['PrimaryURL']}".strip()
+            yield TrivyFinding(
+                namespace,
+                resource_name,
+                result.get("Type") or "",
+                avd_id,
+                (misconfiguration.get("Severity") or "").upper(),
+                misconfiguration.get("Message") or misconfiguration.get("Title") or "",
+                description,
+                _json_code_snippet(misconfiguration.get("CauseMetadata")),
+            )
+
+
+def iter_trivy_json_findings(fp, prefix=""):
+    """
+    Parses `trivy k8s --format json --report all` output as a stream, one resource at a time.
+
+    Args:
+        fp (file): Text file holding the JSON document, e.g. sys.stdin.
+        prefix (str): Input already read from fp while detecting its format.
+
+    Yields:
+        TrivyFinding: Each failed misconfiguration, in the order it appears in the input,
+                      with the same fields the text parser extracts.
+
+    Raises:
+        json.JSONDecodeError: If the input is not a well-formed JSON object.
+    """
+    for key, value in iter_members(metrics.reader(fp), JSON_STREAM_KEYS, prefix=prefix):
+        if key in JSON_RESOURCE_KEYS and (is_stream(value) or isinstance(value, list)):
+            for resource in value:
+                metrics.count("resources")
+                if isinstance(resource, dict):
+                    yield from _json_resource_findings(resource)
+
+
+def detect_format(fp):
+    """
+    Tells Trivy JSON output from text output by its first non-blank line.
+
+    Returns:
+        tuple: (TEXT or JSON, the lines consumed from fp while looking).
+    """
+    head = []
+    for line in fp:
+        head.append(line)
+        if line.strip():
+            break
+    if head and head[-1].lstrip().startswith("{"):
+        return JSON, head
+    return TEXT, head
+
+
+def iter_findings(fp, input_format=AUTO):
+    """
+    Parses Trivy output in either format.
+
+    Args:
+        fp (file): Text file with `trivy k8s --report all` output, as text or --format json.
+        input_format (str): TEXT, JSON or AUTO to detect it from the input.
+
+    Yields:
+        TrivyFinding: Each misconfiguration, in input order.
+    """
+    head = []
+    if input_format == AUTO:
+        if not hasattr(fp, "read"):
+            fp = iter(fp)
+        input_format, head = detect_format(fp)
+    yield from _iter_format(fp, input_format, head)
+
+
+def _iter_format(fp, input_format, head=()):
+    # head: lines already read from fp by detect_format.
+    if input_format == JSON:
+        return iter_trivy_json_findings(fp, "".join(head))
+    return iter_trivy_findings(itertools.chain(head, fp))
+
+
+def format_finding(finding):
+    """Formats a single TrivyFinding as a Markdown section."""
+    parts = [
+        f"### {finding.avd_id} ({finding.severity}): {finding.title}\n\n",
+        f"{finding.description}\n\n",
+        f"* **Namespace**: {finding.namespace}, **Resource**: {finding.resource}\n\n",
+    ]
+    if finding.resource_type:
+        parts.append(f"  **Resource Type**: {finding.resource_type}\n\n")
+    if finding.code_snippet:
+        parts.append("<details><summary>Code Snippet</summary>\n\n```yaml\n")
+        parts.append(finding.code_snippet)
+        parts.append("\n```\n</details>\n\n")
+    return "".join(parts)
+
+
+def _group_description(description):
+    """Returns the prose of a finding's description, without its rules, location and code snippet lines."""
+    lines = [line for line in description.splitlines()
+             if not (RULE_PATTERN.match(line) or LOCATION_PATTERN.match(line) or CODE_SNIPPET_PATTERN.match(line))]
+    return "\n".join(lines).strip()
+
+
+def group_findings(findings):
+    """
+    Groups findings by AVD check and severity, keeping only what locates each resource.
+
+    Args:
+        findings (iterable): TrivyFinding records.
+
+    Returns:
+        dict: (avd_id, severity), in order of first appearance, to [description, count,
+              {(namespace, resource type): [resource, ...]}]. The description is the prose of
+              the first finding's; per-resource titles, file locations and code snippets
+              are dropped and the namespaces, resource types and resources are interned.
+    """
+    groups = {}
+    for finding in findings:
+        key = (finding.avd_id, finding.severity)
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = [_group_description(finding.description), 0, {}]
+        group[1] += 1
+        location = (sys.intern(finding.namespace), sys.intern(finding.resource_type))
+        resources = group[2].get(location)
+        if resources is None:
+            resources = group[2][location] = []
+        resources.append(sys.intern(finding.resource))
+    return groups
+
+
+def format_finding_group(avd_id, severity, description, count, resources):
+    """Formats one entry of group_findings as a Markdown section listing the affected resources."""
+    parts = [f"### {avd_id} ({severity}): {count} resource{'' if count == 1 else 's'}\n\n"]
+    if description:
+        parts.append(f"{description}\n\n")
+    for (namespace, resource_type), names in resources.items():
+        location = f"{namespace} ({resource_type})" if resource_type else namespace
+        parts.append(f"* **{location}**: {', '.join(names)}\n")
+    parts.append("\n")
+    return "".join(parts)
+
+
+def process_trivy_results(trivy_output, group_by_check=False):
     """
     Processes the Trivy text output from k8s scan and formats it into a detailed Markdown report.
 
     Args:
-        trivy_output (str): The standard output from the Trivy k8s --report all command.
+        trivy_output (str): The standard output from the Trivy k8s --report all command,
+                            as text or with --format json.
+        group_by_check (bool): Emit each AVD check once with the resources it was found in
+                               (see group_findings) instead of a section per finding.
 
     Returns:
         tuple: (summary_string, has_issues)
             summary_string (str): A formatted string with the detailed summary of the scan.
             has_issues (bool): True if any misconfigurations were found, False otherwise.
     """
-    summary = ""
-    has_issues = False
-    
-    # Improved regex patterns
-    resource_pattern = r"namespace:\s*(.*?),.*?([A-Za-z0-9_-]+(?:/[A-Za-z0-9_-]+)?)(?:\s+\((.*?)\))?:\s*(\d+-\d+|\d+)"
-    avd_pattern = r"AVD-KSV-(\d+)\s*\((.*?)\):\s*(.*)"
-    code_snippet_pattern = r"^\s*(\d+\s*[│┌└]\s*.*)"
-    
-    print(f"Received Trivy output (length: {len(trivy_output)}):\n{trivy_output}")  # Debug
+    logger.debug("Received Trivy output (length: %d):\n%s", len(trivy_output), trivy_output)
 
     if not trivy_output:
         summary = "Trivy scan completed. No output from Trivy k8s."
-        print(summary)
+        logger.info(summary)
         return summary, False
 
-    lines = trivy_output.splitlines()
-    current_namespace = ""
-    current_resource = ""
-    resource_type = "" # Addded resource type
-
-    for i, line in enumerate(lines):
-        namespace_match = re.search(r"namespace:\s*(.*?),", line)
-        if namespace_match:
-            current_namespace = namespace_match.group(1).strip()
-            print(f"Found namespace: {current_namespace}")  # Debug
-
-        resource_match = re.search(resource_pattern, line)
-        if resource_match:
-            current_resource = resource_match.group(2).strip()
-            resource_type = resource_match.group(3).strip() # Capture resource type
-            if resource_type:
-                print(f"Found resource: {current_resource}, type: {resource_type}")
-            else:
-                print(f"Found resource: {current_resource}")
-            
-        avd_match = re.search(avd_pattern, line)
-        if avd_match:
-            has_issues = True
-            avd_id, severity, title = avd_match.groups()
-            severity = severity.strip().upper()
-            title = title.strip()
-            print(f"Found AVD: {avd_id}, Severity: {severity}, Title: {title}")  # Debug
-            summary += f"### {avd_id} ({severity}): {title}\n\n"
-
-            description_start = i + 1
-            description_end = i + 1
-            while description_end < len(lines) and not re.match(resource_pattern, lines[description_end]) and not re.match(avd_pattern, lines[description_end]):
-                description_end += 1
-            description = "\n".join(lines[description_start:description_end]).strip()
-            summary += f"{description}\n\n"
-            
-            summary += f"* **Namespace**: {current_namespace}, **Resource**: {current_resource}\n\n"
-            if resource_type:
-                 summary += f"  **Resource Type**: {resource_type}\n\n"
-
-            code_snippet = ""
-            code_start_line = i + 1
-            while code_start_line < len(lines):
-                code_match = re.search(code_snippet_pattern, lines[code_start_line])
-                if code_match:
-                    code_snippet += code_match.group(1) + "\n"
-                    code_start_line += 1
-                elif re.match(resource_pattern, lines[code_start_line]) or re.match(avd_pattern, lines[code_start_line]):
-                    break
-                else:
-                    code_start_line += 1
-            if code_snippet:
-                summary += "<details><summary>Code Snippet</summary>\n\n```yaml\n"
-                summary += code_snippet.strip()
-                summary += "\n```\n</details>\n\n"
-
-    if not has_issues:
+    if trivy_output.lstrip().startswith("{"):
+        findings = iter_trivy_json_findings(io.StringIO(trivy_output))
+    else:
+        with metrics.stage("read"):
+            lines = trivy_output.splitlines()
+        metrics.count("lines", len(lines))
+        findings = iter_trivy_findings(lines)
+    sections = []
+    findings = metrics.timed("parse", findings)
+    if group_by_check:
+        groups = group_findings(findings)
+        with metrics.stage("render"):
+            sections = [format_finding_group(avd_id, severity, *group) for (avd_id, severity), group in groups.items()]
+        finding_count = sum(count for _, count, _ in groups.values())
+    else:
+        for finding in findings:
+            with metrics.stage("render"):
+                sections.append(format_finding(finding))
+        finding_count = len(sections)
+    metrics.count("findings", finding_count)
+    has_issues = bool(sections)
+    if has_issues:
+        summary = "".join(sections)
+    else:
         summary = "No misconfigurations found.\n"
-        print("No issues found")
+        logger.info("No issues found")
 
-    print(f"Generated summary:\n{summary}")
+    logger.debug("Generated summary:\n%s", summary)
     return summary, has_issues
 
 
 
-def main():
+def write_trivy_diff(diff, summary, fields=None):
     """
-    Main function to process Trivy results and output a summary for GitHub Actions.
+    Writes the findings that differ from a baseline scan.
+
+    Args:
+        diff (FindingsDiff): Result of report_diff.diff_findings over TrivyFinding records.
+        summary (BudgetedSummary): The output.
+        fields (tuple): The fields the diff compared, if not all (see describe_change).
+    """
+    summary.write(f"## Trivy Changes Since Baseline\n\n{diff.counts()}\n\n")
+    for finding in diff.new:
+        summary.write(format_finding(finding), namespace=finding.namespace, header="## New Findings\n\n")
+    for previous, finding in diff.changed:
+        summary.write(f"*Changed*: {describe_change(previous, finding, fields)}\n\n" + format_finding(finding),
+                      namespace=finding.namespace, header="## Changed Findings\n\n")
+    for finding in diff.resolved:
+        summary.write(f"* {finding.avd_id} ({finding.severity}): {finding.title} - **Namespace**: {finding.namespace}, "
+                      f"**Resource**: {finding.resource}\n", namespace=finding.namespace, header="## Resolved Findings\n\n")
+
+
+def _observed(findings, on_finding):
+    for finding in findings:
+        on_finding(finding)
+        yield finding
+
+
+def write_trivy_summary(lines, out, budget=None, shard_dir=SHARD_DIR, baseline=None, input_format=TEXT,
+                        on_finding=None, group_by_check=False):
+    """
+    Streams the Markdown report for Trivy output to a file handle as findings are parsed.
 
     Args:
-        trivy_output (str): The standard output from the Trivy k8s command (passed as a command-line argument).
-    """
-    print(f"Python script started. GITHUB_STEP_SUMMARY: {os.environ.get('GITHUB_STEP_SUMMARY')}")  # Debug
-    trivy_output = sys.stdin.read() # Read from stdin
-
-    summary, has_issues = process_trivy_results(trivy_output)
-
-    if os.environ.get("GITHUB_STEP_SUMMARY"):
-        summary_file_path = os.environ["GITHUB_STEP_SUMMARY"]
-        print(f"Writing summary to: {summary_file_path}")  # Debug
-        try:
-            with open(summary_file_path, "a") as f:
-                f.write(summary)
-            print("Successfully wrote to GITHUB_STEP_SUMMARY")
-        except Exception as e:
-            print(f"Error writing to GITHUB_STEP_SUMMARY: {e}")
-            traceback.print_exc()
+        lines (iterable): Lines of `trivy k8s --report all` output, e.g. sys.stdin. Must be
+                          a file for the JSON and AUTO input formats.
+        out (file): Text file handle the report is written to.
+        budget (int): Byte budget for out; None for no limit. Findings past the budget
+                      go to per-namespace shard files (see step_summary.BudgetedSummary).
+        shard_dir (str): Directory for the shard files.
+        baseline (iterable): Lines of an earlier scan's output, in either format. When
+                             given, only the new, changed and resolved findings are written;
+                             across formats, only the fields in TRIVY_PORTABLE_FIELDS count.
+        input_format (str): TEXT, JSON or AUTO to detect the format of lines.
+        on_finding (callable): Called with every finding parsed from lines, e.g. to index it.
+        group_by_check (bool): Write each AVD check once with the resources it was found in
+                               (see group_findings); ignored with a baseline.
+
+    Returns:
+        bool: True if any misconfigurations were found, False otherwise.
+    """
+    line_count = 0
+
+    def counted(lines):
+        nonlocal line_count
+        for line in lines:
+            line_count += 1
+            yield line
+
+    head = []
+    if input_format == AUTO:
+        input_format, head = detect_format(lines)
+    summary = BudgetedSummary(out, budget, shard_dir)
+    if input_format == JSON:
+        findings = metrics.timed("parse", iter_trivy_json_findings(lines, "".join(head)))
     else:
-        print(summary)
+        findings = metrics.timed("parse", iter_trivy_findings(metrics.timed("read", counted(itertools.chain(head, lines)))))
+    if on_finding is not None:
+        findings = _observed(findings, on_finding)
+    finding_count = 0
+    if baseline is not None:
+        if not hasattr(baseline, "read"):
+            baseline = iter(baseline)
+        baseline_format, baseline_head = detect_format(baseline)
+        compare = fields = None
+        if baseline_format != input_format:
+            # Descriptions and snippets read differently from the two formats.
+            logger.info("Baseline is Trivy %s output, the scan %s; comparing %s only", baseline_format, input_format,
+                        ", ".join(TRIVY_PORTABLE_FIELDS))
+            compare, fields = trivy_portable, TRIVY_PORTABLE_FIELDS
+        diff = diff_findings(_iter_format(baseline, baseline_format, baseline_head), findings, trivy_key, compare)
+        with metrics.stage("write"):
+            write_trivy_diff(diff, summary, fields)
+        finding_count = len(diff.new) + len(diff.changed) + diff.unchanged
+        has_issues = bool(finding_count)
+    elif group_by_check:
+        groups = group_findings(findings)
+        finding_count = sum(count for _, count, _ in groups.values())
+        for (avd_id, severity), (description, count, resources) in groups.items():
+            with metrics.stage("render"):
+                section = format_finding_group(avd_id, severity, description, count, resources)
+            with metrics.stage("write"):
+                # A check spans namespaces, so past the budget it goes to the cluster-wide shard.
+                summary.write(section)
+        has_issues = bool(finding_count)
+    else:
+        for finding in findings:
+            finding_count += 1
+            with metrics.stage("render"):
+                section = format_finding(finding)
+            with metrics.stage("write"):
+                summary.write(section, namespace=finding.namespace)
+        has_issues = bool(finding_count)
+
+        if not line_count and input_format != JSON:
+            summary.write("Trivy scan completed. No output from Trivy k8s.")
+        elif not has_issues:
+            summary.write("No misconfigurations found.\n")
+            logger.info("No issues found")
+    with metrics.stage("write"):
+        summary.close()
+    if input_format != JSON:
+        metrics.count("lines", line_count)
+    metrics.count("findings", finding_count)
+    metrics.count("bytes_written", summary.bytes_written)
+    if summary.overflowed:
+        metrics.count("shard_bytes_written", summary.shard_bytes)
+        logger.warning("Step summary budget of %s bytes reached; remaining findings written to %s", budget, shard_dir)
+    return has_issues
+
+
+def add_summary_arguments(parser):
+    """Adds the options of summarize to an argument parser."""
+    parser.add_argument("--summary-budget", type=int, default=budget_from_env(),
+                        help=f"Maximum bytes appended to GITHUB_STEP_SUMMARY (default: ${SUMMARY_BUDGET_ENV} or {DEFAULT_BUDGET})")
+    parser.add_argument("--shard-dir", default=SHARD_DIR,
+                        help="Directory for the per-namespace files holding findings past the budget")
+    parser.add_argument("--baseline", help="Output of an earlier Trivy scan; report only what changed since")
+    parser.add_argument("--input-format", choices=[AUTO, TEXT, JSON], default=AUTO,
+                        help="Format of the Trivy output: text (--report all) or json (--format json); "
+                             "detected by default")
+    parser.add_argument("--group-by-check", action="store_true",
+                        help="Write each AVD check once with the list of affected resources, "
+                             "leaving out per-resource messages and code snippets")
+    add_index_argument(parser)
+
+
+def summarize(args, lines, summary_file_path=None):
+    """
+    Writes the summary of Trivy output as selected by the add_summary_arguments options.
+
+    Args:
+        args (argparse.Namespace): Parsed add_summary_arguments options.
+        lines (file): The Trivy output, e.g. sys.stdin.
+        summary_file_path (str): File the summary is appended to under args.summary_budget,
+                                 e.g. GITHUB_STEP_SUMMARY; None prints it in full to stdout.
+
+    Returns:
+        bool: True if any misconfigurations were found, False otherwise; None if the
+              summary could not be written, in which case nothing is indexed either.
+    """
+    scan = None
+    try:
+        with contextlib.ExitStack() as stack:
+            baseline = stack.enter_context(open(args.baseline, "r")) if args.baseline else None
+            on_finding = None
+            if args.index:
+                index = stack.enter_context(FindingsIndex(args.index))
+                # Commits the findings once the summary is written, rolls them back if it fails.
+                scan = stack.enter_context(index.begin_scan(args.cluster or "default", "trivy", source="stdin"))
+                on_finding = lambda finding: scan.add(trivy_row(finding))
+
+            if summary_file_path:
+                logger.info("Writing summary to: %s", summary_file_path)
+                with open(summary_file_path, "a") as f:
+                    has_issues = write_trivy_summary(lines, f, args.summary_budget, args.shard_dir, baseline,
+                                                     args.input_format, on_finding, args.group_by_check)
+                logger.info("Successfully wrote to %s", summary_file_path)
+            else:
+                has_issues = write_trivy_summary(lines, sys.stdout, baseline=baseline, input_format=args.input_format,
+                                                 on_finding=on_finding, group_by_check=args.group_by_check)
+    except Exception as e:
+        logger.exception("Could not summarize the Trivy output: %s", e)
+        return None
+    if scan is not None:
+        logger.info("Indexed %d findings in %s", scan.count, args.index)
+    return has_issues
+
+
+def main():
+    """
+    Main function to process Trivy results and output a summary for GitHub Actions.
+
+    Trivy output, text or JSON, is read from stdin. When GITHUB_STEP_SUMMARY is set the report is
+    appended to it under a byte budget, otherwise it is printed in full.
+    """
+    parser = argparse.ArgumentParser(description="Summarize `trivy k8s --report all` output read from stdin.")
+    add_summary_arguments(parser)
+    add_arguments(parser)
+    args = parser.parse_args()
+    if args.group_by_check and args.baseline:
+        parser.error("--group-by-check cannot be combined with --baseline")
+    configure(args)
+
+    logger.debug("Python script started. GITHUB_STEP_SUMMARY: %s", os.environ.get("GITHUB_STEP_SUMMARY"))
+    has_issues = summarize(args, sys.stdin, os.environ.get("GITHUB_STEP_SUMMARY"))
 
     if has_issues:
-        print("::warning title=Trivy Scan Issues::Misconfigurations were found. Check the scan results for details.")
+        print(ISSUES_ANNOTATION)
+    finish(args, "trivy_summary")
+    if has_issues is None:
+        sys.exit(1)
 
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,164 @@
+import hashlib
+import os
+import re
+from collections import OrderedDict
+
+# GitHub rejects step summaries larger than 1 MiB.
+DEFAULT_BUDGET = 1024 * 1024
+SUMMARY_BUDGET_ENV = "SUMMARY_BUDGET_BYTES"
+# Each tool writes its shards to a subdirectory of this one; see tool_shard_dir.
+DEFAULT_SHARD_DIR = "summary-shards"
+CLUSTER_WIDE = "(cluster-wide)"
+# Shard files not named after a namespace; see shard_file_name.
+CLUSTER_WIDE_SHARD = "_cluster-wide.md"
+INDEX_SHARD = "_index.md"
+# At most 63 characters, like a Kubernetes namespace, so file names stay short enough.
+PLAIN_NAME = re.compile(r"[a-z0-9.-]{1,63}")
+# Characters of an escaped namespace kept in its file name, ahead of the hash.
+MAX_ESCAPED_LENGTH = 64
+# Shard files kept open at once; the least recently used one is closed beyond that.
+MAX_OPEN_SHARDS = 64
+
+
+def budget_from_env(default=DEFAULT_BUDGET):
+    """Returns the summary budget in bytes from SUMMARY_BUDGET_BYTES, or default."""
+    value = os.environ.get(SUMMARY_BUDGET_ENV)
+    return int(value) if value else default
+
+
+def tool_shard_dir(tool):
+    """
+    Returns the default shard directory of a tool, under DEFAULT_SHARD_DIR.
+
+    Shard files are started afresh the first time a run writes them, so two steps of
+    one job sharing a directory would overwrite each other's shards and index.
+    """
+    return os.path.join(DEFAULT_SHARD_DIR, tool)
+
+
+def shard_file_name(namespace):
+    """
+    Returns the shard file name used for a namespace; no two namespaces share one.
+
+    Names a Kubernetes namespace could have (up to 63 lowercase letters, digits, "-" and
+    ".") are used as they are. Any other name is made safe and suffixed with a hash of
+    the original, under a "_" prefix that plain names cannot have. The two "_" names
+    without a hash are reserved for the cluster-wide shard and the rollup index.
+    """
+    if not namespace or namespace == CLUSTER_WIDE:
+        return CLUSTER_WIDE_SHARD
+    if PLAIN_NAME.fullmatch(namespace):
+        return f"{namespace}.md"
+    digest = hashlib.sha256(namespace.encode("utf-8")).hexdigest()[:12]
+    safe = re.sub(r"[^a-z0-9.-]", "_", namespace.lower())[:MAX_ESCAPED_LENGTH]
+    return f"_{safe}-{digest}.md"
+
+
+class BudgetedSummary:
+    """
+    Writes Markdown sections to a summary file without exceeding a byte budget.
+
+    Sections are written through to the summary as they arrive. As soon as one would
+    not fit (leaving room for the rollup), the writer switches over: that section and
+    every later one go to a per-namespace shard file under shard_dir instead, and
+    close() appends a rollup table saying how many sections of each namespace were
+    written where. Nothing is dropped.
+
+    A section may carry a header, e.g. a table's heading and header rows, that has
+    to precede it. The header is written once per destination whenever it changes,
+    so a table cut off by the budget continues with its header in each shard.
+    """
+
+    def __init__(self, out, budget=DEFAULT_BUDGET, shard_dir=DEFAULT_SHARD_DIR):
+        self.out = out
+        self.budget = budget
+        self.shard_dir = shard_dir
+        # Room kept free for the rollup table written by close().
+        self.reserve = min(64 * 1024, budget // 10) if budget is not None else 0
+        self.bytes_written = 0
+        self.shard_bytes = 0
+        self.overflowed = False
+        self._header = None
+        self._counts = OrderedDict()  # namespace -> [sections in summary, sections in shard]
+        self._shards = OrderedDict()  # namespace -> open shard file, least recently used first
+        self._shard_headers = {}      # namespace -> last header written to its shard
+
+    def write(self, text, namespace=None, header=None):
+        """
+        Writes one section.
+
+        Args:
+            text (str): The Markdown section.
+            namespace (str): Namespace the section belongs to; None for cluster-wide sections.
+            header (str): Text that must precede the section, such as a table header.
+        """
+        namespace = namespace or CLUSTER_WIDE
+        counts = self._counts.setdefault(namespace, [0, 0])
+        if not self.overflowed:
+            pending = text if header is None or header == self._header else header + text
+            size = len(pending.encode("utf-8"))
+            if self.budget is None or self.bytes_written + size + self.reserve <= self.budget:
+                self.out.write(pending)
+                self.bytes_written += size
+                self._header = header
+                counts[0] += 1
+                return
+            self.overflowed = True
+            os.makedirs(self.shard_dir, exist_ok=True)
+
+        shard = self._shard(namespace)
+        if header is not None and self._shard_headers.get(namespace) != header:
+            shard.write(header)
+            self.shard_bytes += len(header.encode("utf-8"))
+            self._shard_headers[namespace] = header
+        shard.write(text)
+        self.shard_bytes += len(text.encode("utf-8"))
+        counts[1] += 1
+
+    def _shard(self, namespace):
+        shard = self._shards.pop(namespace, None)
+        if shard is None:
+            if len(self._shards) >= MAX_OPEN_SHARDS:
+                _, oldest = self._shards.popitem(last=False)
+                oldest.close()
+            path = os.path.join(self.shard_dir, shard_file_name(namespace))
+            # Start each shard afresh the first time this run writes to it.
+            shard = open(path, "a" if namespace in self._shard_headers else "w")
+            self._shard_headers.setdefault(namespace, None)
+        self._shards[namespace] = shard
+        return shard
+
+    def rollup(self):
+        """Returns the Markdown rollup describing where each namespace's sections went."""
+        lines = [
+            "\n## Summary truncated\n\n",
+            f"The step summary reached its {self.budget}-byte budget. Sections that did not fit "
+            f"were written to per-namespace Markdown files in `{self.shard_dir}`.\n\n",
+            "| Namespace | In summary | In shard | Shard file |\n",
+            "| --- | --- | --- | --- |\n",
+        ]
+        for namespace, (inline, sharded) in self._counts.items():
+            shard = shard_file_name(namespace) if sharded else "-"
+            lines.append(f"| {namespace} | {inline} | {sharded} | {shard} |\n")
+        return "".join(lines)
+
+    def close(self):
+        """Closes the shard files and, if the budget was reached, writes the rollup."""
+        for shard in self._shards.values():
+            shard.close()
+        self._shards.clear()
+        if not self.overflowed:
+            return
+        rollup = self.rollup()
+        size = len(rollup.encode("utf-8"))
+        if self.bytes_written + size <= self.budget:
+            self.out.write(rollup)
+            self.bytes_written += size
+            return
+        # Too many namespaces for the reserved room: the rollup becomes a shard of its own.
+        index_path = os.path.join(self.shard_dir, INDEX_SHARD)
+        with open(index_path, "w") as f:
+            f.write(rollup)
+        note = f"\n## Summary truncated\n\nThe step summary reached its {self.budget}-byte budget; see `{index_path}` for where each namespace's sections were written.\n"
+        self.out.write(note)
+        self.bytes_written += len(note.encode("utf-8"))
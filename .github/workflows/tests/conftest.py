@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The scripts import each other by module name from the workflows directory, as they
+# do when the workflow runs them; the synthetic report writers live in benchmarks/.
+WORKFLOWS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(WORKFLOWS_DIR, "benchmarks"))
+sys.path.insert(0, WORKFLOWS_DIR)
@@ -0,0 +1,31 @@
+import io
+
+from kubescape_findings import Result, ResultControl
+from report_rollup import Rollup, write_rollup
+
+
+def _result(resource_id, category, severity="High", status="failed"):
+    controls = (ResultControl("C-0001", "Privileged container", status, ""),)
+    return Result(resource_id, "Deployment", "default", resource_id, severity, category, "", controls, ())
+
+
+def test_missing_and_odd_categories_are_counted_as_printed():
+    rollup = Rollup()
+    rollup.add_results([
+        _result("a", "Workload"),
+        _result("b", None),
+        _result("c", {"name": "Network", "id": "Cat-1"}),
+        _result("d", ["Workload", "Network"], severity=7),
+        _result("e", None, status="passed"),
+    ])
+
+    assert rollup.group_rows("category") == [
+        ["N/A", 1, 2],
+        ["Workload", 1, 1],
+        ["['Workload', 'Network']", 1, 1],
+        ["{'name': 'Network', 'id': 'Cat-1'}", 1, 1],
+    ]
+    assert rollup.group_rows("severity") == [["High", 3, 4], ["7", 1, 1]]
+    out = io.StringIO()
+    write_rollup(rollup, out)
+    assert "| N/A | 1 | 2 |\n" in out.getvalue()
@@ -0,0 +1,87 @@
+import io
+import os
+import sys
+import time
+
+from batch_report import render_file
+from scan_runner import scan
+from synthetic_reports import write_kubescape_report, write_trivy_report
+
+FAKE_SCANNER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fake_scanner.py")
+STARTUP_DELAY = 1.0
+
+
+def fake_scanner(output, *options):
+    return [sys.executable, FAKE_SCANNER, output, *options]
+
+
+def _reports(tmp_path, resources=50):
+    kubescape_file = os.path.join(tmp_path, "results.json")
+    trivy_file = os.path.join(tmp_path, "trivy.txt")
+    write_kubescape_report(kubescape_file, resources)
+    write_trivy_report(trivy_file, resources)
+    return kubescape_file, trivy_file
+
+
+def test_scanners_run_concurrently_and_parse_delayed_output(tmp_path):
+    kubescape_file, trivy_file = _reports(tmp_path)
+    slow = ("--startup-delay", str(STARTUP_DELAY), "--chunk-bytes", "2048", "--chunk-delay", "0.001")
+    out = io.StringIO()
+    started = time.perf_counter()
+    kubescape, trivy = scan(fake_scanner(kubescape_file, *slow), fake_scanner(trivy_file, *slow), out,
+                            shard_dir=str(tmp_path / "shards"))
+    elapsed = time.perf_counter() - started
+
+    # Run one after the other, the startup delays alone would add up to twice STARTUP_DELAY.
+    assert elapsed < 1.8 * STARTUP_DELAY
+    assert kubescape.first_output >= STARTUP_DELAY and trivy.first_output >= STARTUP_DELAY
+    for result, path in ((kubescape, kubescape_file), (trivy, trivy_file)):
+        expected = render_file((path, "md", None))
+        assert result.returncode == 0
+        assert (result.findings, result.markdown) == (expected["findings"], expected["markdown"])
+    assert f"| 1 | [kubescape](#cluster-1) | kubescape | {kubescape.findings} | kubescape |" in out.getvalue()
+
+
+def test_truncated_kubescape_output_is_an_error_row(tmp_path):
+    kubescape_file, trivy_file = _reports(tmp_path)
+    truncated = os.path.join(tmp_path, "truncated.json")
+    with open(kubescape_file, 'r') as f, open(truncated, "w") as t:
+        t.write(f.read()[:5000])
+    out = io.StringIO()
+    kubescape, trivy = scan(fake_scanner(truncated, "--exit-code", "1"), fake_scanner(trivy_file), out,
+                            shard_dir=str(tmp_path / "shards"))
+
+    assert kubescape.returncode == 1
+    assert kubescape.findings is None
+    assert kubescape.markdown.startswith("Error: Could not parse the Kubescape output:")
+    assert trivy.returncode == 0 and trivy.findings
+    assert "| 1 | [kubescape](#cluster-1) | kubescape | error | kubescape |" in out.getvalue()
+
+
+def test_kubescape_json_of_an_unexpected_shape_is_an_error_row(tmp_path):
+    _, trivy_file = _reports(tmp_path)
+    malformed = os.path.join(tmp_path, "malformed.json")
+    with open(malformed, "w") as f:
+        f.write('{"results": [{"controls": [1]}]}')
+    out = io.StringIO()
+    kubescape, trivy = scan(fake_scanner(malformed), fake_scanner(trivy_file), out, shard_dir=str(tmp_path / "shards"))
+
+    assert kubescape.returncode == 0
+    assert kubescape.findings is None
+    assert kubescape.markdown.startswith("Error: Could not render the Kubescape output: AttributeError:")
+    assert trivy.returncode == 0 and trivy.findings
+    assert "| 1 | [kubescape](#cluster-1) | kubescape | error | kubescape |" in out.getvalue()
+    assert f"| 2 | [trivy](#cluster-2) | trivy | {trivy.findings} | trivy |" in out.getvalue()
+
+
+def test_scanner_that_cannot_start_is_an_error_row(tmp_path):
+    _, trivy_file = _reports(tmp_path)
+    missing = os.path.join(tmp_path, "no-such-kubescape")
+    out = io.StringIO()
+    kubescape, trivy = scan([missing, "scan"], fake_scanner(trivy_file), out, shard_dir=str(tmp_path / "shards"))
+
+    assert kubescape.returncode is None
+    assert kubescape.findings is None
+    assert kubescape.markdown.startswith(f"Error: Could not run {missing} scan:")
+    assert trivy.returncode == 0 and trivy.findings
+    assert "| 1 | [kubescape](#cluster-1) | kubescape | error | kubescape |" in out.getvalue()
@@ -0,0 +1,276 @@
+import argparse
+import io
+import os
+import random
+import re
+import sqlite3
+
+import pytest
+
+import batch_report
+import scan_runner
+import scripts.trivy_summary as trivy_summary
+from scripts.trivy_summary import add_summary_arguments, process_trivy_results, summarize, write_trivy_summary
+from step_summary import DEFAULT_SHARD_DIR
+from synthetic_reports import write_trivy_json_report, write_trivy_report
+
+
+def baseline_process_trivy_results(trivy_output):
+    """
+    process_trivy_results as it was before the single-pass parser, less its debug prints.
+
+    The only other change is `or ""` on the resource type: the original raised
+    AttributeError on a resource line without a parenthesised type.
+    """
+    summary = ""
+    has_issues = False
+
+    resource_pattern = r"namespace:\s*(.*?),.*?([A-Za-z0-9_-]+(?:/[A-Za-z0-9_-]+)?)(?:\s+\((.*?)\))?:\s*(\d+-\d+|\d+)"
+    avd_pattern = r"AVD-KSV-(\d+)\s*\((.*?)\):\s*(.*)"
+    code_snippet_pattern = r"^\s*(\d+\s*[│┌└]\s*.*)"
+
+    if not trivy_output:
+        return "Trivy scan completed. No output from Trivy k8s.", False
+
+    lines = trivy_output.splitlines()
+    current_namespace = ""
+    current_resource = ""
+    resource_type = ""
+
+    for i, line in enumerate(lines):
+        namespace_match = re.search(r"namespace:\s*(.*?),", line)
+        if namespace_match:
+            current_namespace = namespace_match.group(1).strip()
+
+        resource_match = re.search(resource_pattern, line)
+        if resource_match:
+            current_resource = resource_match.group(2).strip()
+            resource_type = (resource_match.group(3) or "").strip()
+
+        avd_match = re.search(avd_pattern, line)
+        if avd_match:
+            has_issues = True
+            avd_id, severity, title = avd_match.groups()
+            severity = severity.strip().upper()
+            title = title.strip()
+            summary += f"### {avd_id} ({severity}): {title}\n\n"
+
+            description_start = i + 1
+            description_end = i + 1
+            while description_end < len(lines) and not re.match(resource_pattern, lines[description_end]) and not re.match(avd_pattern, lines[description_end]):
+                description_end += 1
+            description = "\n".join(lines[description_start:description_end]).strip()
+            summary += f"{description}\n\n"
+
+            summary += f"* **Namespace**: {current_namespace}, **Resource**: {current_resource}\n\n"
+            if resource_type:
+                summary += f"  **Resource Type**: {resource_type}\n\n"
+
+            code_snippet = ""
+            code_start_line = i + 1
+            while code_start_line < len(lines):
+                code_match = re.search(code_snippet_pattern, lines[code_start_line])
+                if code_match:
+                    code_snippet += code_match.group(1) + "\n"
+                    code_start_line += 1
+                elif re.match(resource_pattern, lines[code_start_line]) or re.match(avd_pattern, lines[code_start_line]):
+                    break
+                else:
+                    code_start_line += 1
+            if code_snippet:
+                summary += "<details><summary>Code Snippet</summary>\n\n```yaml\n"
+                summary += code_snippet.strip()
+                summary += "\n```\n</details>\n\n"
+
+    if not has_issues:
+        summary = "No misconfigurations found.\n"
+
+    return summary, has_issues
+
+
+RESOURCE_WITHOUT_TYPE = """\
+namespace: default, deployment/web: 1-20
+============================================================
+AVD-KSV-0001 (MEDIUM): Container 'web' of deployment 'web' should set 'securityContext.allowPrivilegeEscalation' to false
+════════════════════════════════════════
+A program inside the container can elevate its own privileges.
+────────────────────────────────────────
+ deployment-web.yaml:10-11
+────────────────────────────────────────
+  10 ┌       - image: nginx
+  11 └         name: web
+"""
+
+AVD_MID_LINE = """\
+namespace: kube-system, daemonset/proxy (kubernetes): 1-30
+Failures: 2
+AVD-KSV-0012 (high): Runs as root user
+Details mention AVD-KSV-0099 (LOW): inline, which is not a block boundary
+  14 │       runAsNonRoot: false
+ -> AVD-KSV-0020 (CRITICAL):   Indented check title
+namespace: kube-system, pod/etcd (kubernetes): 1
+AVD-KSV-0021 (LOW): Last one
+"""
+
+SNIPPET_THEN_BLANK_LINES = """\
+namespace: apps, statefulset/db (kubernetes): 5-9
+AVD-KSV-0030 (HIGH): Root file system is not read-only
+  5 ┌   containers:
+  6 └     - name: db
+
+
+Trailing prose after the snippet.
+
+  40 │ a later numbered line that still counts as snippet
+AVD-KSV-0031 (LOW): Default capabilities not dropped
+
+
+"""
+
+FIXTURES = {
+    "resource_without_type": RESOURCE_WITHOUT_TYPE,
+    "avd_mid_line": AVD_MID_LINE,
+    "snippet_then_blank_lines": SNIPPET_THEN_BLANK_LINES,
+    "no_findings": "namespace: default, service/api (kubernetes): 1-4\nTests: 10 (SUCCESSES: 10, FAILURES: 0)\n",
+    "empty": "",
+}
+
+# Line shapes mixed at random: boundaries that start a line, matches in the middle of
+# one, snippet lines, blank lines and prose.
+RANDOM_LINES = [
+    "namespace: ns-{n}, deployment/app-{n} (kubernetes): 1-{n}",
+    "namespace: ns-{n}, pod/app-{n}: {n}",
+    "  namespace: ns-{n}, job/late-{n} (kubernetes): 3",
+    "AVD-KSV-{n:04d} (high): Check {n}",
+    "AVD-KSV-{n:04d} (LOW):",
+    "see AVD-KSV-{n:04d} (MEDIUM): mid-line",
+    " {n} ┌ first: {n}",
+    " {n} │ middle",
+    "{n} └ last",
+    "────────────────",
+    "",
+    "   ",
+    "Plain description text {n}.",
+]
+
+
+def _random_output(rng):
+    return "\n".join(rng.choice(RANDOM_LINES).format(n=rng.randrange(100)) for _ in range(rng.randrange(40)))
+
+
+@pytest.mark.parametrize("name", sorted(FIXTURES))
+def test_matches_baseline(name):
+    assert process_trivy_results(FIXTURES[name]) == baseline_process_trivy_results(FIXTURES[name])
+
+
+def test_matches_baseline_on_random_output():
+    rng = random.Random(0)
+    for _ in range(500):
+        output = _random_output(rng)
+        assert process_trivy_results(output) == baseline_process_trivy_results(output), output
+
+
+def test_streaming_summary_matches(tmp_path):
+    for name, output in FIXTURES.items():
+        out = io.StringIO()
+        has_issues = write_trivy_summary(io.StringIO(output), out, shard_dir=str(tmp_path))
+        assert (out.getvalue(), has_issues) == baseline_process_trivy_results(output), name
+
+
+def test_text_output_against_json_baseline(tmp_path):
+    text_file, json_file = os.path.join(tmp_path, "scan.txt"), os.path.join(tmp_path, "baseline.json")
+    write_trivy_report(text_file, 20)
+    findings = write_trivy_json_report(json_file, 20)
+    with open(json_file, "r") as f:
+        baseline = f.read()
+    # One check changes severity between the scans; nothing else does.
+    with open(json_file, "w") as f:
+        f.write(baseline.replace('"Severity": "CRITICAL"', '"Severity": "LOW"', 1))
+
+    out = io.StringIO()
+    with open(text_file, "r") as lines, open(json_file, "r") as baseline_lines:
+        write_trivy_summary(lines, out, shard_dir=str(tmp_path), baseline=baseline_lines)
+    summary = out.getvalue()
+    assert f"0 new, 0 resolved, 1 changed, {findings - 1} unchanged" in summary
+    assert "*Changed*: severity: LOW → CRITICAL\n" in summary
+
+
+# Patterns tried against each line of text output; a single pass tries each at most this often per line.
+PER_LINE_PATTERNS = {"RESOURCE_PATTERN": 2, "AVD_PATTERN": 2, "NAMESPACE_PATTERN": 1, "CODE_SNIPPET_PATTERN": 1}
+
+
+class _CountingPattern:
+    def __init__(self, pattern, calls):
+        self.pattern = pattern
+        self.calls = calls
+
+    def match(self, line):
+        self.calls.append(line)
+        return self.pattern.match(line)
+
+    def search(self, line):
+        self.calls.append(line)
+        return self.pattern.search(line)
+
+
+def test_each_line_is_matched_a_bounded_number_of_times(tmp_path, monkeypatch):
+    calls = []
+    for name in PER_LINE_PATTERNS:
+        monkeypatch.setattr(trivy_summary, name, _CountingPattern(getattr(trivy_summary, name), calls))
+    for resources in (500, 2000):
+        path = os.path.join(tmp_path, f"trivy-{resources}.txt")
+        write_trivy_report(path, resources)
+        with open(path, "r") as f:
+            output = f.read()
+        del calls[:]
+        process_trivy_results(output)
+        # Rescanning earlier lines, e.g. for each finding, would grow with the input
+        # instead of staying under a constant number of attempts per line.
+        assert len(calls) <= sum(PER_LINE_PATTERNS.values()) * len(output.splitlines())
+
+
+def test_grouped_summary_keeps_only_the_description_prose():
+    output = RESOURCE_WITHOUT_TYPE + RESOURCE_WITHOUT_TYPE.replace("web", "api") + SNIPPET_THEN_BLANK_LINES
+    summary, has_issues = process_trivy_results(output, group_by_check=True)
+    assert has_issues
+    assert summary.startswith(
+        "### 0001 (MEDIUM): 2 resources\n\n"
+        "A program inside the container can elevate its own privileges.\n\n"
+        "* **default**: deployment/web, deployment/api\n\n"
+        "### 0030 (HIGH): 1 resource\n\n"
+        "Trailing prose after the snippet.\n\n"
+    )
+    for framing in ("═", "─", "deployment-web.yaml:10-11", "┌", "│"):
+        assert framing not in summary
+
+
+def _summary_args(*argv):
+    parser = argparse.ArgumentParser()
+    add_summary_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def test_failed_summary_is_not_indexed(tmp_path):
+    json_file = os.path.join(tmp_path, "scan.json")
+    write_trivy_json_report(json_file, 50)
+    with open(json_file, "r") as f:
+        truncated = f.read()[:-2000]
+    index_file = os.path.join(tmp_path, "findings.db")
+    args = _summary_args("--index", index_file, "--shard-dir", str(tmp_path / "shards"))
+
+    # Findings are parsed and indexed until the truncated JSON fails to decode.
+    assert summarize(args, io.StringIO(truncated), os.path.join(tmp_path, "summary.md")) is None
+    with sqlite3.connect(index_file) as connection:
+        assert connection.execute("SELECT COUNT(*) FROM scans").fetchone() == (0,)
+        assert connection.execute("SELECT COUNT(*) FROM findings").fetchone() == (0,)
+
+
+def test_missing_baseline_fails_the_summary(tmp_path):
+    args = _summary_args("--baseline", os.path.join(tmp_path, "missing.txt"))
+    assert summarize(args, io.StringIO(RESOURCE_WITHOUT_TYPE), os.path.join(tmp_path, "summary.md")) is None
+
+
+def test_default_shard_dir_is_not_shared_with_other_tools():
+    shard_dir = _summary_args().shard_dir
+    assert os.path.dirname(shard_dir) == DEFAULT_SHARD_DIR
+    assert shard_dir not in (batch_report.SHARD_DIR, scan_runner.SHARD_DIR)